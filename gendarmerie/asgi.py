@@ -5,6 +5,12 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Les vues AJAX de victimes sont asynchrones : servies par un serveur ASGI
+(uvicorn gendarmerie.asgi:application, ou gunicorn avec le worker
+uvicorn.workers.UvicornWorker), leur nombre de requêtes simultanées n'est
+plus borné par les threads du worker (l'ORM exécute le SQL dans un thread
+propre à chaque requête). Comparaison avec WSGI : manage.py bench_asgi.
 """
 
 import os
@@ -14,3 +20,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gendarmerie.settings")
 
 application = get_asgi_application()
+
+# Index des suggestions d'INCO chargé en fond dès le démarrage (victimes/inco.py)
+from victimes.inco import index  # noqa: E402
+
+index.demarrer()
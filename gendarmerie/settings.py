@@ -42,7 +42,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "victimes.metriques.MetriquesMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "victimes.replicas.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -87,6 +89,15 @@ DATABASES = {
     }
 }
 
+# Réplicas en lecture pour les rapports et tableaux de bord (voir victimes/replicas.py).
+# Exemple : DATABASES["replica"] = {...même base, hôte du réplica...}
+# puis DATABASES_REPLICAS = ["replica"]
+DATABASE_ROUTERS = ["victimes.replicas.RouteurReplicas"]
+DATABASES_REPLICAS = []
+REPLICA_RETARD_MAX = 5  # secondes de retard tolérées
+REPLICA_INTERVALLE_VERIFICATION = 5  # secondes entre deux mesures du retard
+REPLICA_DUREE_COLLANTE = 10  # secondes de lecture sur default après un POST
+
 #configuration base de données sqlite (pour tests uniquement)
 # DATABASES = {
 #     "default": {
@@ -205,3 +216,33 @@ LOGOUT_REDIRECT_URL = '/login/'
 # Fichiers uploadés (actes de décès)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+
+# Fichiers identiques stockés une seule fois (voir victimes/stockage.py)
+STORAGES = {
+    "default": {"BACKEND": "victimes.stockage.StockageDedupliquant"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Journal des actions : écriture tamponnée (voir victimes/journal.py)
+# En développement, chaque action est écrite immédiatement
+JOURNAL_SYNCHRONE = DEBUG
+JOURNAL_TAILLE_LOT = 50  # entrées par bulk_create
+JOURNAL_DELAI_MAX = 2.0  # secondes avant vidage forcé
+JOURNAL_REPERTOIRE_SECOURS = BASE_DIR / "journal_secours"
+JOURNAL_INTERVALLE_ORPHELINS = 60  # secondes entre deux recherches de fichiers de secours orphelins
+
+# Filtres de l'admin des membres servis depuis le cache (voir victimes/facettes.py)
+FACETTES_MEMBRES_DUREE = 600  # secondes
+
+# Cartes de la liste des victimes en cache, par version de fiche et par rôle (voir victimes/cartes.py)
+CARTES_VICTIMES_DUREE = 86400  # secondes
+
+# Suggestions d'INCO servies par un index en mémoire de chaque processus (voir victimes/inco.py)
+INCO_CHARGEMENT_EN_FOND = True  # chargement par un thread de fond au démarrage
+INCO_INTERVALLE_SYNCHRONISATION = 2  # secondes entre deux relectures des fiches modifiées
+INCO_RECHARGEMENT = 3600  # secondes entre deux rechargements complets
+
+# Métriques par vue exposées sur /metrics (voir victimes/metriques.py)
+METRIQUES_FICHIER = BASE_DIR / "metriques.sqlite3"  # base locale partagée par les processus
+METRIQUES_INTERVALLE = 5  # secondes entre deux envois d'un processus
+TEST_RUNNER = "victimes.lanceur_tests.LanceurTests"  # métriques des tests dans une base temporaire
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gendarmerie.settings")
 
 application = get_wsgi_application()
+
+# Index des suggestions d'INCO chargé en fond dès le démarrage (victimes/inco.py)
+from victimes.inco import index  # noqa: E402
+
+index.demarrer()
@@ -0,0 +1,63 @@
+"""
+Droits d'accès des agents aux familles.
+
+Un agent ne voit et ne modifie que les familles des victimes qu'il a
+créées. Plutôt que de rejoindre FicheVictime à chaque requête, Famille
+porte l'agent propriétaire en colonne indexée (`agent_proprietaire`),
+recalculée par les signaux de FicheVictime quand une victime est liée,
+déliée, supprimée ou change de créateur. Les rares familles dont les
+victimes ont été créées par plusieurs agents sont marquées
+`agents_multiples` et vérifiées sur FicheVictime.
+
+- `<Modele>.objects.visible_to(user)` : querysets filtrés (models.py) ;
+- `can_edit(user, objet)` : contrôle sur une famille, un membre ou une
+  fiche, mémorisé sur l'utilisateur le temps de la requête.
+
+Les rôles eux-mêmes restent vérifiés par `role_required`.
+"""
+from .models import Famille, FicheVictime, MembreFamille
+
+
+def agents_de(famille_id):
+    """Créateurs distincts (non nuls) des victimes de la famille, au plus deux."""
+    return list(
+        FicheVictime.objects.filter(famille_id=famille_id, cree_par__isnull=False)
+        .values_list('cree_par_id', flat=True)
+        .order_by('cree_par_id')
+        .distinct()[:2]
+    )
+
+
+def recalculer_proprietaires(famille_ids):
+    for famille_id in set(famille_ids) - {None}:
+        agents = agents_de(famille_id)
+        Famille.objects.filter(pk=famille_id).update(
+            agent_proprietaire_id=agents[0] if len(agents) == 1 else None,
+            agents_multiples=len(agents) > 1,
+        )
+
+
+def _peut_modifier_famille(user, famille):
+    if famille.agent_proprietaire_id == user.pk:
+        return True
+    if not famille.agents_multiples:
+        return False
+    memo = getattr(user, '_familles_modifiables', None)
+    if memo is None:
+        memo = user._familles_modifiables = {}
+    if famille.pk not in memo:
+        memo[famille.pk] = FicheVictime.objects.filter(famille=famille, cree_par=user).exists()
+    return memo[famille.pk]
+
+
+def can_edit(user, objet):
+    """L'utilisateur peut-il modifier cette famille, ce membre ou cette fiche victime ?"""
+    if user.role != 'agent':
+        return True
+    if isinstance(objet, Famille):
+        return _peut_modifier_famille(user, objet)
+    if isinstance(objet, MembreFamille):
+        return _peut_modifier_famille(user, objet.famille)
+    if isinstance(objet, FicheVictime):
+        return objet.cree_par_id == user.pk
+    return False
@@ -1,9 +1,29 @@
+import re
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
-from django.db.models import Q
-from datetime import date
-from .models import User, Famille, MembreFamille, FicheVictime, DemandeAide, JournalAction, DocumentVictime
+from .models import User, Famille, MembreFamille, FicheVictime, DemandeAide, JournalAction, DocumentVictime, intervalle_naissance
+from .exports import reponse_export
+from .facettes import facettes_membres
+from .journal import journaliser
+
+
+AGE_RECHERCHE = re.compile(r'^(\d{1,3})(?:-(\d{1,3}))?$')
+
+
+def action_export(quoi, format_export):
+    """Action d'administration exportant la sélection en flux."""
+    def exporter(modeladmin, request, queryset):
+        journaliser(
+            utilisateur=request.user,
+            action="Export de données",
+            details=f"Export {quoi} ({format_export}) depuis l'administration"
+        )
+        return reponse_export(queryset, quoi, format_export)
+    exporter.__name__ = f"exporter_{format_export}"
+    exporter.short_description = f"Exporter la sélection ({format_export.upper()})"
+    return exporter
+
 
 # Filtre personnalisé pour la ville avec toutes les villes de la base
 class VilleFilter(admin.SimpleListFilter):
@@ -11,9 +31,8 @@ class VilleFilter(admin.SimpleListFilter):
     parameter_name = 'ville'
 
     def lookups(self, request, model_admin):
-        # Récupérer toutes les villes uniques des membres de famille
-        villes = MembreFamille.objects.exclude(ville='').values_list('ville', flat=True).distinct().order_by('ville')
-        return [(ville, ville) for ville in villes if ville]
+        # Villes des membres et leurs effectifs, depuis le cache (voir facettes.py)
+        return [(ville, f"{ville} ({n})") for ville, n in facettes_membres()['ville']]
 
     def queryset(self, request, queryset):
         if self.value():
@@ -26,9 +45,8 @@ class LienParenteFilter(admin.SimpleListFilter):
     parameter_name = 'lien_parente'
 
     def lookups(self, request, model_admin):
-        # Récupérer tous les liens de parenté uniques
-        liens = MembreFamille.objects.exclude(lien_parente='').values_list('lien_parente', flat=True).distinct().order_by('lien_parente')
-        return [(lien, lien) for lien in liens if lien]
+        # Liens de parenté et leurs effectifs, depuis le cache (voir facettes.py)
+        return [(lien, f"{lien} ({n})") for lien, n in facettes_membres()['lien_parente']]
 
     def queryset(self, request, queryset):
         if self.value():
@@ -61,6 +79,7 @@ class MembreFamilleAdmin(admin.ModelAdmin):
     list_display = ("prenom", "nom", "get_age", "ville", "famille", "date_naissance", "lien_parente")
     search_fields = ("nom", "prenom", "ville", "lien_parente")
     list_filter = (VilleFilter, LienParenteFilter, "sexe")
+    actions = [action_export('membres', 'csv'), action_export('membres', 'xlsx')]
     ordering = ["-date_naissance"]  # Tri par défaut : plus jeunes en premier
     
     def get_age(self, obj):
@@ -71,36 +90,33 @@ class MembreFamilleAdmin(admin.ModelAdmin):
     get_age.short_description = "Âge"
     get_age.admin_order_field = "-date_naissance"  # Tri inversé : plus récent = plus jeune
     
-    # Recherche avancée par âge exact et ville
+    # Recherche par âge : "30" ou "30-40", éventuellement avec un nom ou une ville ("Kaya 6-18")
     def get_search_results(self, request, queryset, search_term):
-        queryset, use_distinct = super().get_search_results(request, queryset, search_term)
-        
-        # Si le terme de recherche est un nombre, filtrer par âge
-        if search_term.isdigit():
-            age_recherche = int(search_term)
-            today = date.today()
-            annee_naissance = today.year - age_recherche
-            
-            # Filtrer les membres nés dans l'année correspondante (avec marge d'un an)
-            queryset_age = self.model.objects.filter(
-                Q(date_naissance__year=annee_naissance) | 
-                Q(date_naissance__year=annee_naissance - 1)
-            )
-            queryset = queryset | queryset_age
-        
-        return queryset, use_distinct
+        termes = []
+        for terme in re.sub(r'(\d)\s*-\s*(\d)', r'\1-\2', search_term).split():
+            tranche = AGE_RECHERCHE.match(terme)
+            if tranche:
+                age_min = int(tranche.group(1))
+                age_max = int(tranche.group(2) or age_min)
+                # Intervalle exact de dates de naissance : servi par l'index, sans YEAR()
+                queryset = queryset.filter(**intervalle_naissance(min(age_min, age_max), max(age_min, age_max)))
+            else:
+                termes.append(terme)
+        return super().get_search_results(request, queryset, ' '.join(termes))
 
 @admin.register(FicheVictime)
 class FicheVictimeAdmin(admin.ModelAdmin):
     list_display = ("prenom", "nom", "grade", "date_deces", "famille", "cree_par")
     search_fields = ("nom", "prenom", "grade")
     list_filter = ("grade", "date_deces")
+    actions = [action_export('victimes', 'csv'), action_export('victimes', 'xlsx')]
 
 @admin.register(DemandeAide)
 class DemandeAideAdmin(admin.ModelAdmin):
     list_display = ("id", "famille", "type_demande", "statut", "cree_par", "valide_par", "date_creation", "date_validation")
     list_filter = ("type_demande", "statut")
     search_fields = ("famille__adresse", "famille__ville", "description")
+    actions = [action_export('demandes', 'csv'), action_export('demandes', 'xlsx')]
 
 @admin.register(JournalAction)
 class JournalActionAdmin(admin.ModelAdmin):
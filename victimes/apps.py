@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class VictimesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "victimes"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metriques import instrumenter_gabarits
+        instrumenter_gabarits()
@@ -0,0 +1,49 @@
+"""
+Cartes de la liste des victimes, rendues une fois puis servies depuis le cache.
+
+Le fragment HTML d'une carte ne dépend que de la fiche (photo, nom, sexe,
+date de création, famille liée) et du rôle de l'utilisateur (boutons
+proposés). Il est mis en cache sous une clé qui contient
+`FicheVictime.version`, incrémentée à chaque enregistrement de la fiche
+(save) et à chaque modification de sa famille (signals.py) : une carte
+modifiée change de clé, l'ancienne entrée expire d'elle-même
+(CARTES_VICTIMES_DUREE).
+
+Une page de la liste coûte un get_many pour toutes ses cartes, puis un
+set_many pour celles qui manquaient.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import FicheVictime
+
+GABARIT = 'victimes/victime_carte.html'
+# Champs lus par le gabarit de la carte
+CHAMPS = ('id', 'nom', 'prenom', 'sexe', 'photo', 'date_creation', 'famille_id', 'version')
+
+
+def cle_carte(victime, role):
+    return f"victimes:carte:{victime.pk}:{victime.version}:{role}"
+
+
+def cartes(victimes, role):
+    """Fragments HTML des cartes, dans l'ordre des fiches."""
+    cles = [cle_carte(victime, role) for victime in victimes]
+    fragments = cache.get_many(cles)
+    manquants = {
+        cle: render_to_string(GABARIT, {'victime': victime, 'role': role})
+        for cle, victime in zip(cles, victimes)
+        if cle not in fragments
+    }
+    if manquants:
+        cache.set_many(manquants, getattr(settings, 'CARTES_VICTIMES_DUREE', 86400))
+        fragments.update(manquants)
+    return [mark_safe(fragments[cle]) for cle in cles]
+
+
+def invalider_famille(famille_id):
+    """Change la clé des cartes des victimes de la famille (à appeler quand la famille change)."""
+    FicheVictime.objects.filter(famille_id=famille_id).update(version=F('version') + 1)
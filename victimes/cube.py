@@ -0,0 +1,156 @@
+"""
+Cube des demandes d'aide pour le rapport des familles aidées.
+
+La table `CelluleAide` compte les demandes par (mois de création, type,
+statut, ville de la famille, situation économique de la famille). Les
+signaux (signals.py) l'ajustent à chaque création, changement ou
+suppression de demande et quand une famille change de ville ou de
+situation. Toute coupe du rapport (pivot, exploration) est alors un
+GROUP BY sur quelques centaines de cellules au lieu d'une jointure
+DemandeAide / Famille.
+
+`manage.py cube_aides` reconstruit le cube ; `--verifier` le compare aux tables.
+"""
+from collections import Counter
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import CelluleAide, DemandeAide, Famille
+
+DIMENSIONS = ('mois', 'type_demande', 'statut', 'ville', 'situation_economique')
+LIBELLES_DIMENSIONS = {
+    'mois': "Mois",
+    'type_demande': "Type de demande",
+    'statut': "Statut",
+    'ville': "Ville",
+    'situation_economique': "Situation économique",
+}
+# Exploration : dimension proposée après avoir fixé celle de la ligne
+DIMENSION_SUIVANTE = {
+    'mois': 'type_demande',
+    'type_demande': 'ville',
+    'ville': 'situation_economique',
+    'situation_economique': 'statut',
+    'statut': 'mois',
+}
+_CHOIX = {
+    'type_demande': dict(DemandeAide.TYPE_CHOICES),
+    'statut': dict(DemandeAide.STATUT_CHOICES),
+    'situation_economique': dict(Famille.SITUATION_ECONOMIQUE_CHOICES),
+}
+
+
+def mois_de(date_creation):
+    return timezone.localtime(date_creation).date().replace(day=1)
+
+
+def cle_cellule(date_creation, type_demande, statut, ville, situation_economique):
+    return (mois_de(date_creation), type_demande, statut, ville or '', situation_economique or '')
+
+
+def libelle(dimension, valeur):
+    if dimension == 'mois':
+        return f"{valeur:%m/%Y}"
+    if dimension == 'ville' and not valeur:
+        return "(sans ville)"
+    return _CHOIX.get(dimension, {}).get(valeur, valeur)
+
+
+def valeur_filtre(dimension, texte):
+    """Valeur d'un filtre reçu en paramètre GET (mois au format AAAA-MM), ou None si invalide."""
+    if dimension != 'mois':
+        return texte
+    try:
+        annee, mois = (int(partie) for partie in texte.split('-'))
+        return date(annee, mois, 1)
+    except ValueError:
+        return None
+
+
+# Construction et vérification
+def recompter():
+    """Cellules recalculées à partir des tables : {cle: nb_demandes}."""
+    cellules = Counter()
+    lignes = DemandeAide.objects.values_list(
+        'date_creation', 'type_demande', 'statut', 'famille__ville', 'famille__situation_economique'
+    ).order_by()
+    for ligne in lignes.iterator(chunk_size=5000):
+        cellules[cle_cellule(*ligne)] += 1
+    return cellules
+
+
+def reconstruire():
+    cellules = recompter()
+    with transaction.atomic():
+        CelluleAide.objects.all().delete()
+        CelluleAide.objects.bulk_create(
+            [CelluleAide(**dict(zip(DIMENSIONS, cle)), nb_demandes=n) for cle, n in cellules.items()],
+            batch_size=1000,
+        )
+    return cellules
+
+
+def ecarts():
+    """Cellules dont le compte diffère des tables : {cle: (cube, reel)}."""
+    reel = recompter()
+    cube = {
+        tuple(ligne[:-1]): ligne[-1]
+        for ligne in CelluleAide.objects.values_list(*DIMENSIONS, 'nb_demandes')
+    }
+    return {
+        cle: (cube.get(cle, 0), reel.get(cle, 0))
+        for cle in set(reel) | set(cube)
+        if cube.get(cle, 0) != reel.get(cle, 0)
+    }
+
+
+def ajuster(deltas):
+    """Applique des variations {cle: delta} aux cellules (dans la transaction courante)."""
+    for cle, delta in deltas.items():
+        if not delta:
+            continue
+        cellule = dict(zip(DIMENSIONS, cle))
+        if not CelluleAide.objects.filter(**cellule).update(nb_demandes=F('nb_demandes') + delta):
+            _, cree = CelluleAide.objects.get_or_create(**cellule, defaults={'nb_demandes': delta})
+            if not cree:
+                CelluleAide.objects.filter(**cellule).update(nb_demandes=F('nb_demandes') + delta)
+
+
+def deplacer_famille(famille_id, avant, apres):
+    """Déplace les demandes d'une famille qui change de ville ou de situation économique."""
+    deltas = Counter()
+    for date_creation, type_demande, statut in DemandeAide.objects.filter(famille_id=famille_id).values_list(
+        'date_creation', 'type_demande', 'statut'
+    ):
+        deltas[cle_cellule(date_creation, type_demande, statut, *avant)] -= 1
+        deltas[cle_cellule(date_creation, type_demande, statut, *apres)] += 1
+    ajuster(deltas)
+
+
+# Lecture
+def pivot(lignes, colonnes=None, filtres=None):
+    """
+    Tableau croisé du nombre de demandes : une requête GROUP BY sur le cube.
+    Retourne {'lignes': [...], 'colonnes': [...], 'valeurs': {(l, c): n},
+    'totaux_lignes', 'totaux_colonnes', 'total'}.
+    """
+    cellules = CelluleAide.objects.filter(nb_demandes__gt=0, **(filtres or {}))
+    axes = [lignes] + ([colonnes] if colonnes and colonnes != lignes else [])
+    resultat = {'lignes': [], 'colonnes': [], 'valeurs': {}, 'totaux_lignes': Counter(),
+                'totaux_colonnes': Counter(), 'total': 0}
+    for ligne in cellules.values(*axes).annotate(n=Sum('nb_demandes')).order_by(*axes):
+        cle_ligne = ligne[lignes]
+        cle_colonne = ligne[colonnes] if len(axes) > 1 else None
+        if cle_ligne not in resultat['lignes']:
+            resultat['lignes'].append(cle_ligne)
+        if cle_colonne not in resultat['colonnes']:
+            resultat['colonnes'].append(cle_colonne)
+        resultat['valeurs'][cle_ligne, cle_colonne] = ligne['n']
+        resultat['totaux_lignes'][cle_ligne] += ligne['n']
+        resultat['totaux_colonnes'][cle_colonne] += ligne['n']
+        resultat['total'] += ligne['n']
+    resultat['colonnes'].sort(key=lambda valeur: (valeur is None, valeur))
+    return resultat
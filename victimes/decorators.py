@@ -1,13 +1,61 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.core.exceptions import PermissionDenied
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
 
 def role_required(roles):
     def decorator(view_func):
-        def _wrapped_view(request, *args, **kwargs):
-            if not request.user.is_authenticated:
+        def _verifier(request, user):
+            if not user.is_authenticated:
                 from django.shortcuts import redirect
                 return redirect('login')
-            if request.user.role not in roles:
+            if user.role not in roles:
                 raise PermissionDenied
+            return None
+
+        # Vue asynchrone : l'utilisateur est chargé par request.auser(),
+        # request.user (paresseux, synchrone) ne doit pas être évalué
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_view(request, *args, **kwargs):
+                request.user = await request.auser()
+                refus = _verifier(request, request.user)
+                if refus is not None:
+                    return refus
+                return await view_func(request, *args, **kwargs)
+            return _wrapped_view
+
+        def _wrapped_view(request, *args, **kwargs):
+            refus = _verifier(request, request.user)
+            if refus is not None:
+                return refus
             return view_func(request, *args, **kwargs)
         return _wrapped_view
     return decorator
+
+
+def condition_etag(etag_func):
+    """
+    Équivalent de django.views.decorators.http.condition(etag_func=...) pour une
+    vue asynchrone : `condition` appelle etag_func de façon synchrone, ce qui
+    interdit l'accès à la base depuis la boucle d'événements. Ici etag_func
+    (synchrone) est exécutée dans un thread.
+    """
+    etag_asynchrone = sync_to_async(etag_func)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            etag = await etag_asynchrone(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            if etag and request.method in ('GET', 'HEAD'):
+                response.headers.setdefault('ETag', etag)
+            return response
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,143 @@
+"""
+Résolution des fiches victimes en double (même INCO).
+
+Deux fiches sont en double quand leurs INCO sont égaux une fois les
+espaces de début et de fin retirés et la casse ignorée : la contrainte
+d'unicité de `matricule` ne les distingue pas sur toutes les bases
+(« GN-0042 » et « gn-0042 » passent sous SQLite ou PostgreSQL, pas sous
+MySQL). Les doublons sont trouvés en une requête fenêtrée ; dans chaque
+groupe la fiche la plus ancienne (plus petit id) est conservée.
+
+Pour chaque lot de groupes, dans une transaction :
+
+- les documents des fiches supprimées sont rattachés à la fiche conservée
+  (un UPDATE) ;
+- la fiche conservée sans famille reprend celle de la première fiche
+  supprimée qui en a une (un UPDATE) ; une autre famille reste en base,
+  avec ses membres et demandes, et est signalée dans le rapport ;
+- les termes de recherche (des deux index) puis les fiches supprimées sont
+  effacés en trois DELETE, sans les signaux par fiche : le snapshot
+  statistique et les agents propriétaires des familles touchées sont
+  ajustés une fois par lot.
+
+Les fichiers (photos, actes) des fiches supprimées restent dans le stockage.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When, Window
+from django.db.models.functions import RowNumber, Trim, Upper
+
+from . import acces, statistiques
+from .models import DocumentVictime, FicheVictime, TermeRecherche, TermeRechercheVictime
+
+TAILLE_LOT = 500
+CHAMPS = ('pk', 'matricule', 'nom', 'prenom', 'famille_id', 'cree_par_id', 'date_creation')
+
+
+def cle_inco():
+    return Upper(Trim('matricule'))
+
+
+def groupes_doublons():
+    """
+    Fiches en double, en une requête : [(cle, [fiche, ...]), ...] où chaque
+    fiche est un dict de CHAMPS, la fiche conservée en premier.
+    """
+    fiches = (
+        FicheVictime.objects
+        .annotate(
+            cle=cle_inco(),
+            nb=Window(Count('pk'), partition_by=[cle_inco()]),
+            rang=Window(RowNumber(), partition_by=[cle_inco()], order_by=[F('pk').asc()]),
+        )
+        .filter(nb__gt=1)
+        .order_by('cle', 'rang')
+        .values('cle', *CHAMPS)
+    )
+    groupes = []
+    for fiche in fiches:
+        cle = fiche.pop('cle')
+        if not groupes or groupes[-1][0] != cle:
+            groupes.append((cle, []))
+        groupes[-1][1].append(fiche)
+    return groupes
+
+
+def _remplacement(champ, correspondances):
+    """Expression CASE : nouvelle valeur de `champ` selon son ancienne valeur."""
+    return Case(
+        *(When(**{champ: ancien}, then=Value(nouveau)) for ancien, nouveau in correspondances.items()),
+        output_field=IntegerField(),
+    )
+
+
+def plan(cle, fiches):
+    """Ce que la résolution fera pour un groupe (sans rien modifier)."""
+    conservee, *perdantes = fiches
+    famille_reprise = None
+    if conservee['famille_id'] is None:
+        famille_reprise = next((f['famille_id'] for f in perdantes if f['famille_id']), None)
+    famille_finale = conservee['famille_id'] or famille_reprise
+    return {
+        'inco': cle,
+        'matricules': [f['matricule'] for f in fiches],
+        'conservee': conservee['pk'],
+        'supprimees': [f['pk'] for f in perdantes],
+        'famille_reprise': famille_reprise,
+        'familles_detachees': sorted({
+            f['famille_id'] for f in perdantes if f['famille_id'] and f['famille_id'] != famille_finale
+        }),
+    }
+
+
+@transaction.atomic
+def resoudre_lot(groupes):
+    """Résout un lot de groupes ; retourne les plans appliqués avec le nombre de documents déplacés."""
+    plans = [plan(cle, fiches) for cle, fiches in groupes]
+    survivante = {pk: p['conservee'] for p in plans for pk in p['supprimees']}
+
+    documents = Counter(
+        DocumentVictime.objects.filter(victime_id__in=survivante).values_list('victime_id', flat=True).order_by()
+    )
+    if documents:
+        DocumentVictime.objects.filter(victime_id__in=survivante).update(
+            victime_id=_remplacement('victime_id', survivante)
+        )
+    familles_reprises = {p['conservee']: p['famille_reprise'] for p in plans if p['famille_reprise']}
+    if familles_reprises:
+        FicheVictime.objects.filter(pk__in=familles_reprises).update(
+            famille_id=_remplacement('pk', familles_reprises), version=F('version') + 1,
+        )
+
+    # Suppression ensembliste : les signaux de FicheVictime ne sont pas déclenchés
+    for perdantes in (
+        TermeRechercheVictime.objects.filter(victime_id__in=survivante),
+        TermeRecherche.objects.filter(type_objet='victime', objet_id__in=survivante),
+        FicheVictime.objects.filter(pk__in=survivante),
+    ):
+        perdantes._raw_delete(perdantes.db)
+
+    deltas = Counter({'victimes.avec_famille': len(familles_reprises)})
+    familles = set(familles_reprises.values())
+    for _, fiches in groupes:
+        for fiche in fiches[1:]:
+            deltas['victimes.total'] -= 1
+            deltas[statistiques.cle_mois(fiche['date_creation'])] -= 1
+            if fiche['cree_par_id']:
+                deltas[statistiques.cle_victimes_agent(fiche['cree_par_id'])] -= 1
+            if fiche['famille_id']:
+                deltas['victimes.avec_famille'] -= 1
+                familles.add(fiche['famille_id'])
+    statistiques.ajuster(deltas)
+    acces.recalculer_proprietaires(familles)
+
+    for p in plans:
+        p['documents_deplaces'] = sum(documents[pk] for pk in p['supprimees'])
+    return plans
+
+
+def resoudre(groupes, taille_lot=TAILLE_LOT):
+    """Résout les groupes par lots (une transaction par lot) ; génère les plans appliqués."""
+    for depart in range(0, len(groupes), taille_lot):
+        yield from resoudre_lot(groupes[depart:depart + taille_lot])
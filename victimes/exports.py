@@ -0,0 +1,241 @@
+"""
+Exports CSV et XLSX en flux des fiches victimes, membres de famille et
+demandes d'aide.
+
+Les lignes sont lues par lots successifs sur la clé primaire (keyset) et
+écrites au fur et à mesure dans une StreamingHttpResponse : la mémoire
+utilisée ne dépend pas du nombre de lignes exportées. Le classeur XLSX
+est produit sans dépendance, en écrivant l'archive zip en flux.
+"""
+import csv
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import DemandeAide, FicheVictime, MembreFamille
+
+TAILLE_LOT = 2000
+
+# Export -> (modèle, colonnes (en-tête, champ ou chemin de relation))
+EXPORTS = {
+    'victimes': (FicheVictime, [
+        ("INCO", 'matricule'),
+        ("Nom", 'nom'),
+        ("Prénom", 'prenom'),
+        ("Statut", 'statut_victime'),
+        ("Grade", 'grade'),
+        ("Sexe", 'sexe'),
+        ("Date de naissance", 'date_naissance'),
+        ("Date de décès", 'date_deces'),
+        ("Lieu de décès", 'lieu_deces'),
+        ("Famille", 'famille__nom_famille'),
+        ("Ville de la famille", 'famille__ville'),
+        ("Téléphone de la famille", 'famille__telephone'),
+        ("Créée par", 'cree_par__username'),
+        ("Date de création", 'date_creation'),
+    ]),
+    'membres': (MembreFamille, [
+        ("Nom", 'nom'),
+        ("Prénom", 'prenom'),
+        ("Relation", 'relation_victime'),
+        ("Sexe", 'sexe'),
+        ("Date de naissance", 'date_naissance'),
+        ("Ville", 'ville'),
+        ("Téléphone", 'telephone'),
+        ("Famille", 'famille__nom_famille'),
+        ("Ville de la famille", 'famille__ville'),
+    ]),
+    'demandes': (DemandeAide, [
+        ("N°", 'id'),
+        ("Famille", 'famille__nom_famille'),
+        ("Ville", 'famille__ville'),
+        ("Type", 'type_demande'),
+        ("Statut", 'statut'),
+        ("Description", 'description'),
+        ("Créée par", 'cree_par__username'),
+        ("Date de création", 'date_creation'),
+        ("Validée par", 'valide_par__username'),
+        ("Date de décision", 'date_validation'),
+    ]),
+}
+
+FORMATS = ('csv', 'xlsx')
+
+
+def exports_visibles(user, quoi):
+    """Queryset exportable par l'utilisateur (mêmes restrictions que les listes), ou None."""
+    if quoi == 'demandes':
+        return None if user.role == 'agent' else DemandeAide.objects.all()
+    return EXPORTS[quoi][0].objects.visible_to(user)
+
+
+def _libelles(model, champs):
+    """Libellés des champs à choix : valeur stockée -> libellé affiché."""
+    libelles = {}
+    for champ in champs:
+        if '__' not in champ:
+            choix = model._meta.get_field(champ).choices
+            if choix:
+                libelles[champ] = dict(choix)
+    return libelles
+
+
+def lignes(queryset, quoi, taille_lot=TAILLE_LOT):
+    """Valeurs des lignes à exporter, lues par lots de `taille_lot` sur la clé primaire."""
+    model, colonnes = EXPORTS[quoi]
+    champs = [champ for _, champ in colonnes]
+    libelles = _libelles(model, champs)
+    queryset = queryset.order_by('pk').values_list('pk', *champs)
+    dernier = None
+    while True:
+        lot = list((queryset.filter(pk__gt=dernier) if dernier is not None else queryset)[:taille_lot])
+        for pk, *valeurs in lot:
+            yield [
+                libelles[champ].get(valeur, valeur) if champ in libelles else valeur
+                for champ, valeur in zip(champs, valeurs)
+            ]
+        if len(lot) < taille_lot:
+            return
+        dernier = lot[-1][0]
+
+
+def _texte(valeur):
+    if valeur is None:
+        return ''
+    if isinstance(valeur, datetime):
+        return timezone.localtime(valeur).strftime('%Y-%m-%d %H:%M') if timezone.is_aware(valeur) else valeur.strftime('%Y-%m-%d %H:%M')
+    if isinstance(valeur, date):
+        return valeur.isoformat()
+    return str(valeur)
+
+
+# Début de cellule interprété comme une formule par les tableurs (injection CSV)
+_DEBUTS_FORMULE = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _cellule_csv(valeur):
+    texte = _texte(valeur)
+    # Les textes saisis sont préfixés d'une apostrophe : le tableur les affiche tels quels
+    if isinstance(valeur, str) and texte.startswith(_DEBUTS_FORMULE):
+        return "'" + texte
+    return texte
+
+
+class _Echo:
+    """Fichier factice : csv.writer renvoie directement la ligne écrite."""
+
+    def write(self, valeur):
+        return valeur
+
+
+def flux_csv(entetes, rangees):
+    # Point-virgule et BOM : ouverture directe dans Excel en français
+    ecrivain = csv.writer(_Echo(), delimiter=';')
+    yield '\ufeff' + ecrivain.writerow(entetes)
+    for rangee in rangees:
+        yield ecrivain.writerow([_cellule_csv(valeur) for valeur in rangee])
+
+
+class _TamponZip:
+    """Flux non positionnable dans lequel zipfile écrit ; vidé à chaque lot."""
+
+    def __init__(self):
+        self._morceaux = []
+
+    def write(self, donnees):
+        self._morceaux.append(bytes(donnees))
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        donnees = b''.join(self._morceaux)
+        self._morceaux = []
+        return donnees
+
+
+_CARACTERES_INTERDITS = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+_XLSX_FICHIERS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _cellule(valeur):
+    if isinstance(valeur, bool) or not isinstance(valeur, (int, float)):
+        texte = escape(_texte(valeur).translate(_CARACTERES_INTERDITS))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{texte}</t></is></c>'
+    return f'<c><v>{valeur}</v></c>'
+
+
+def flux_xlsx(entetes, rangees, feuille='Export', lignes_par_morceau=500):
+    tampon = _TamponZip()
+    with zipfile.ZipFile(tampon, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for nom, contenu in _XLSX_FICHIERS.items():
+            archive.writestr(nom, contenu)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(feuille[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as xml:
+            xml.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            xml.write(('<row>' + ''.join(_cellule(e) for e in entetes) + '</row>').encode('utf-8'))
+            morceau = []
+            for rangee in rangees:
+                morceau.append('<row>' + ''.join(_cellule(v) for v in rangee) + '</row>')
+                if len(morceau) >= lignes_par_morceau:
+                    xml.write(''.join(morceau).encode('utf-8'))
+                    morceau = []
+                    yield tampon.vider()
+            xml.write(''.join(morceau).encode('utf-8'))
+            xml.write(b'</sheetData></worksheet>')
+    yield tampon.vider()
+
+
+def reponse_export(queryset, quoi, format_export):
+    """StreamingHttpResponse contenant l'export `quoi` du queryset au format demandé."""
+    entetes = [entete for entete, _ in EXPORTS[quoi][1]]
+    rangees = lignes(queryset, quoi)
+    nom_fichier = f"{quoi}-{timezone.localdate():%Y%m%d}.{format_export}"
+    if format_export == 'xlsx':
+        reponse = StreamingHttpResponse(
+            flux_xlsx(entetes, rangees, feuille=quoi.capitalize()),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    else:
+        reponse = StreamingHttpResponse(flux_csv(entetes, rangees), content_type='text/csv; charset=utf-8')
+    reponse['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+    return reponse
@@ -0,0 +1,44 @@
+"""
+Valeurs proposées par les filtres Ville et Lien de parenté de l'admin des
+membres de famille, avec le nombre de membres pour chacune (facettes).
+
+Les deux agrégats (un GROUP BY par champ) sont calculés une fois puis
+servis depuis le cache ; les signaux de MembreFamille (signals.py)
+invalident l'entrée quand un membre est créé, supprimé ou change de ville
+ou de lien de parenté. L'import en masse, qui contourne les signaux,
+l'invalide lui-même.
+
+Avec le cache local par défaut, l'invalidation ne vaut que pour le
+processus courant : les autres se mettent à jour à l'expiration
+(FACETTES_MEMBRES_DUREE). Configurer un cache partagé (CACHES) pour une
+invalidation immédiate sur tous les processus.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import MembreFamille
+
+CHAMPS_FACETTES = ('ville', 'lien_parente')
+CLE_CACHE = 'victimes:facettes_membres'
+
+
+def facettes_membres():
+    """{champ: [(valeur, nombre de membres), ...]} trié par valeur, valeurs vides exclues."""
+    facettes = cache.get(CLE_CACHE)
+    if facettes is None:
+        facettes = {
+            champ: list(
+                MembreFamille.objects.exclude(**{champ: ''})
+                .values_list(champ)
+                .annotate(n=Count('pk'))
+                .order_by(champ)
+            )
+            for champ in CHAMPS_FACETTES
+        }
+        cache.set(CLE_CACHE, facettes, getattr(settings, 'FACETTES_MEMBRES_DUREE', 600))
+    return facettes
+
+
+def invalider():
+    cache.delete(CLE_CACHE)
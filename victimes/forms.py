@@ -66,6 +66,22 @@ class FicheVictimeForm(forms.ModelForm):
                 raise forms.ValidationError(f"L'INCO '{matricule}' existe déjà dans la base de données.")
         return matricule
 
+    def _verifier_formats(self, champ):
+        fichiers = self.cleaned_data.get(champ) or []
+        if not isinstance(fichiers, (list, tuple)):
+            fichiers = [fichiers]
+        for fichier in fichiers:
+            # Type détecté d'après le contenu par TeleversementDirect (None si inconnu)
+            if getattr(fichier, 'type_detecte', True) is None:
+                raise forms.ValidationError(f"« {fichier.name} » : format non reconnu (PDF, JPEG, PNG ou TIFF attendu).")
+        return self.cleaned_data.get(champ)
+
+    def clean_actes_deces(self):
+        return self._verifier_formats('actes_deces')
+
+    def clean_rapports_medicaux(self):
+        return self._verifier_formats('rapports_medicaux')
+
 class DemandeAideForm(forms.ModelForm):
     class Meta:
         model = DemandeAide
@@ -0,0 +1,258 @@
+"""
+Import en masse de registres historiques (fiches victimes, familles, membres).
+
+Chaque enregistrement décrit une victime et, facultativement, sa famille et
+les membres de celle-ci :
+
+- JSONL : un objet par ligne, avec les champs de FicheVictime, un objet
+  "famille" (champs de Famille) et une liste "membres" (champs de MembreFamille) ;
+- CSV : une ligne par victime ; les colonnes "famille_<champ>" décrivent la
+  famille et la colonne "membres" contient la liste des membres en JSON.
+
+Les lignes sont validées sans requête (champs du modèle, INCO comparé à
+l'ensemble des INCO existants chargé une fois, sans les espaces de bord ni
+la casse), puis insérées par lots avec bulk_create, un lot par transaction. Les lignes rejetées sont écrites avec
+leur motif dans un fichier de rejets ; le numéro de la dernière ligne
+traitée par un lot validé est conservé dans un fichier de reprise pour
+relancer l'import après une interruption.
+"""
+import csv
+import json
+import os
+import re
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+
+from . import recherche_globale
+from .doublons import cle_inco
+from .facettes import invalider as invalider_facettes
+from .models import Famille, FicheVictime, MembreFamille
+from .recherche import cle_recherche, indexer_victimes
+
+TAILLE_LOT = 1000
+_DATE_FR = re.compile(r'^(\d{2})/(\d{2})/(\d{4})$')
+
+
+def _champs_importables(model, exclus=()):
+    return {
+        champ.name
+        for champ in model._meta.concrete_fields
+        if champ.editable and not champ.primary_key and champ.name not in exclus
+        and not isinstance(champ, (models.ForeignKey, models.FileField))
+    }
+
+
+CHAMPS_VICTIME = _champs_importables(FicheVictime)
+CHAMPS_FAMILLE = _champs_importables(Famille)
+CHAMPS_MEMBRE = _champs_importables(MembreFamille)
+
+
+def lire_enregistrements(chemin):
+    """Génère (numéro de ligne, enregistrement) sans charger le fichier en mémoire."""
+    with open(chemin, encoding='utf-8-sig', newline='') as fichier:
+        if chemin.lower().endswith('.csv'):
+            for numero, ligne in enumerate(csv.DictReader(fichier), start=2):
+                yield numero, _depuis_csv(ligne)
+        else:
+            for numero, ligne in enumerate(fichier, start=1):
+                if ligne.strip():
+                    try:
+                        yield numero, json.loads(ligne)
+                    except json.JSONDecodeError as exc:
+                        yield numero, {'_erreur': f"JSON invalide : {exc}"}
+
+
+def _depuis_csv(ligne):
+    enregistrement = {}
+    famille = {}
+    for colonne, valeur in ligne.items():
+        if colonne is None or valeur in (None, ''):
+            continue
+        if colonne == 'membres':
+            try:
+                enregistrement['membres'] = json.loads(valeur)
+            except json.JSONDecodeError:
+                enregistrement['_erreur'] = "Colonne membres : JSON invalide"
+        elif colonne.startswith('famille_'):
+            famille[colonne[len('famille_'):]] = valeur
+        else:
+            enregistrement[colonne] = valeur
+    if famille:
+        enregistrement['famille'] = famille
+    return enregistrement
+
+
+def _valeurs(model, donnees, champs, quoi):
+    if not isinstance(donnees, dict):
+        raise ValidationError(f"{quoi} : objet attendu")
+    inconnus = set(donnees) - champs
+    if inconnus:
+        raise ValidationError(f"{quoi} : champ(s) inconnu(s) {', '.join(sorted(inconnus))}")
+    valeurs = {}
+    for champ, valeur in donnees.items():
+        if isinstance(valeur, str):
+            valeur = valeur.strip()
+            # jj/mm/aaaa -> ISO pour les seuls champs date (le texte libre est gardé tel quel)
+            date_fr = _DATE_FR.match(valeur) if isinstance(model._meta.get_field(champ), models.DateField) else None
+            if date_fr:
+                valeur = f"{date_fr.group(3)}-{date_fr.group(2)}-{date_fr.group(1)}"
+        valeurs[champ] = valeur
+    return valeurs
+
+
+def _construire(model, donnees, champs, quoi, exclus):
+    instance = model(**_valeurs(model, donnees, champs, quoi))
+    try:
+        # Sans requête : ni unicité ni clés étrangères (vérifiées par lot)
+        instance.full_clean(exclude=exclus, validate_unique=False, validate_constraints=False)
+    except ValidationError as exc:
+        details = '; '.join(f"{champ} : {' '.join(erreurs)}" for champ, erreurs in exc.message_dict.items())
+        raise ValidationError(f"{quoi} : {details}")
+    return instance
+
+
+def _cle_inco(matricule):
+    """Équivalent Python de doublons.cle_inco (TRIM retire les seuls espaces)."""
+    return matricule.strip(' ').upper()
+
+
+class ImportVictimes:
+    """Valide et insère des enregistrements par lots ; voir le docstring du module."""
+
+    def __init__(self, cree_par=None, taille_lot=TAILLE_LOT, rejets=None):
+        self.cree_par = cree_par
+        self.taille_lot = taille_lot
+        self.rejets = rejets
+        # INCO normalisés comme doublons.cle_inco : la contrainte d'unicité ignore la casse sous MySQL
+        self.matricules = set(
+            FicheVictime.objects.annotate(cle=cle_inco()).values_list('cle', flat=True).iterator(chunk_size=10000)
+        )
+        self.nb_lignes = self.nb_importees = self.nb_rejetees = 0
+        self.nb_familles = self.nb_membres = 0
+        self.derniere_ligne = 0
+        self._lot = []
+        self._rejets_lot = []
+        self._debut = time.perf_counter()
+
+    def valider(self, donnees):
+        """Retourne (victime, famille ou None, membres) ou lève ValidationError."""
+        if '_erreur' in donnees:
+            raise ValidationError(donnees['_erreur'])
+        donnees = dict(donnees)
+        famille_donnees = donnees.pop('famille', None)
+        membres_donnees = donnees.pop('membres', None) or []
+        victime = _construire(FicheVictime, donnees, CHAMPS_VICTIME, "Victime",
+                              exclus=['famille', 'cree_par', 'photo', 'acte_deces'])
+        if _cle_inco(victime.matricule) in self.matricules:
+            raise ValidationError(f"INCO déjà existant : {victime.matricule}")
+        if not isinstance(membres_donnees, list):
+            raise ValidationError("Membres : liste attendue")
+        famille = None
+        if famille_donnees:
+            famille_donnees = dict(famille_donnees)
+            if 'nom' in famille_donnees:
+                famille_donnees.setdefault('nom_famille', famille_donnees.pop('nom'))
+            famille_donnees.setdefault('nom_famille', victime.nom)
+            famille = _construire(Famille, famille_donnees, CHAMPS_FAMILLE, "Famille", exclus=[])
+        if membres_donnees and famille is None:
+            raise ValidationError("Membres fournis sans famille")
+        membres = [
+            _construire(MembreFamille, membre, CHAMPS_MEMBRE, f"Membre {i}", exclus=['famille'])
+            for i, membre in enumerate(membres_donnees, start=1)
+        ]
+        return victime, famille, membres
+
+    def ajouter(self, numero, donnees):
+        """Valide une ligne ; insère le lot en cours quand il est plein. Retourne True si un lot a été écrit."""
+        self.nb_lignes += 1
+        self.derniere_ligne = numero
+        try:
+            victime, famille, membres = self.valider(donnees)
+        except ValidationError as exc:
+            self.rejeter(numero, donnees, ' '.join(exc.messages))
+            return False
+        self.matricules.add(_cle_inco(victime.matricule))
+        self._lot.append((victime, famille, membres))
+        if len(self._lot) >= self.taille_lot:
+            self.ecrire_lot()
+            return True
+        return False
+
+    def rejeter(self, numero, donnees, motif):
+        # Écrit avec le lot : une reprise ne duplique pas les rejets
+        self._rejets_lot.append({'ligne': numero, 'motif': motif, 'donnees': donnees})
+
+    def ecrire_lot(self):
+        """Insère le lot en cours (une transaction) et écrit ses rejets."""
+        lot, self._lot = self._lot, []
+        rejets, self._rejets_lot = self._rejets_lot, []
+        if lot:
+            self._inserer(lot)
+        self.nb_rejetees += len(rejets)
+        if self.rejets is not None:
+            for rejet in rejets:
+                self.rejets.write(json.dumps(rejet, ensure_ascii=False, default=str) + '\n')
+            self.rejets.flush()
+
+    def _inserer(self, lot):
+        with transaction.atomic():
+            familles = [famille for _, famille, _ in lot if famille is not None]
+            for famille in familles:
+                # Nouvelle famille : sa seule victime est créée par cet import
+                famille.agent_proprietaire = self.cree_par
+            if connection.features.can_return_rows_from_bulk_insert:
+                Famille.objects.bulk_create(familles, batch_size=500)
+            else:
+                # MySQL ne renvoie pas les clés d'un INSERT groupé et Famille n'a
+                # pas de clé naturelle pour les relire : une insertion par famille
+                for famille in familles:
+                    famille.save()
+            victimes = []
+            membres = []
+            for victime, famille, membres_famille in lot:
+                victime.famille = famille
+                victime.cree_par = self.cree_par
+                victime.cle_recherche = cle_recherche(victime)
+                victimes.append(victime)
+                for membre in membres_famille:
+                    membre.famille = famille
+                    membres.append(membre)
+            FicheVictime.objects.bulk_create(victimes, batch_size=500)
+            MembreFamille.objects.bulk_create(membres, batch_size=500)
+            if membres:
+                invalider_facettes()
+            # bulk_create contourne FicheVictime.save() et les signaux : index de recherche
+            # à construire (clés relues par INCO, unique, car MySQL ne les renvoie pas ;
+            # membres relus par famille, toutes créées par ce lot)
+            victimes = list(
+                FicheVictime.objects.filter(matricule__in=[v.matricule for v in victimes])
+                .only('pk', 'matricule', 'nom', 'prenom', 'cle_recherche', 'grade', 'lieu_deces')
+            )
+            indexer_victimes(victimes, maj_cle=False)
+            recherche_globale.indexer('victime', victimes)
+            recherche_globale.indexer('famille', familles)
+            recherche_globale.indexer('membre', MembreFamille.objects.filter(famille__in=familles))
+        self.nb_importees += len(victimes)
+        self.nb_familles += len(familles)
+        self.nb_membres += len(membres)
+
+    def lignes_par_seconde(self):
+        duree = time.perf_counter() - self._debut
+        return self.nb_lignes / duree if duree else 0.0
+
+
+def lire_reprise(chemin):
+    try:
+        with open(chemin, encoding='utf-8') as fichier:
+            return json.load(fichier)['derniere_ligne']
+    except FileNotFoundError:
+        return 0
+
+
+def ecrire_reprise(chemin, derniere_ligne):
+    temporaire = f"{chemin}.tmp"
+    with open(temporaire, 'w', encoding='utf-8') as fichier:
+        json.dump({'derniere_ligne': derniere_ligne}, fichier)
+    os.replace(temporaire, chemin)
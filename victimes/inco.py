@@ -0,0 +1,305 @@
+"""
+Suggestions d'INCO pendant la saisie (avant la création d'une fiche).
+
+Chaque processus garde en mémoire la liste triée des INCO compacts
+("GN-0042" -> "gn0042", comme le terme compact de recherche.py) et, dans
+un tableau parallèle, la clé primaire de la fiche. Une suggestion est une
+recherche dichotomique (bisect) du préfixe saisi puis la lecture des
+entrées suivantes : quelques microsecondes, quel que soit le nombre de
+fiches. Seule la vérification des fiches retenues (une requête par clé
+primaire) passe par la base.
+
+Tenue à jour :
+
+- l'index est chargé par un thread de fond au démarrage du processus
+  (wsgi.py, asgi.py) ou à la première suggestion ; en attendant, les
+  suggestions sont lues dans `TermeRechercheVictime` ;
+- les enregistrements et suppressions du processus le modifient
+  directement (signals.py) ;
+- les écritures des autres processus, et celles en masse qui contournent
+  les signaux, sont relues sur `date_modification` au plus toutes les
+  INCO_INTERVALLE_SYNCHRONISATION secondes ;
+- les entrées périmées (fiche supprimée ailleurs, INCO modifié,
+  transaction annulée) sont écartées à la lecture, en comparant l'INCO en
+  base au préfixe ; un rechargement complet en fond les élimine toutes les
+  INCO_RECHARGEMENT secondes.
+
+Les agents voient l'existence de tous les INCO (comme le contrôle de
+doublon du formulaire), mais le nom et le lien seulement pour leurs
+propres fiches.
+"""
+import bisect
+import logging
+import threading
+import time
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+
+from .recherche import LONGUEUR_MAX_TERME, bornes_prefixe, decouper
+
+logger = logging.getLogger(__name__)
+
+LIMITE = 10
+LIMITE_MAX = 20
+# Entrées lues en plus de la limite, pour compenser celles écartées à la lecture
+SURPLUS = 5
+TAILLE_LOT = 20000
+# Recouvrement des synchronisations (horloges des serveurs, transactions en cours)
+MARGE = timedelta(seconds=10)
+# Fiches relues au-delà desquelles l'index est reconstruit par tranches plutôt qu'entrée par entrée
+SEUIL_FUSION = 50
+
+
+def _parametre(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+def cle_inco(matricule):
+    """INCO compact normalisé ("GN-0042" -> "gn0042")."""
+    return ''.join(decouper(matricule))[:LONGUEUR_MAX_TERME]
+
+
+def _position(cles, pks, cle, pk):
+    """Position de (cle, pk), ou de son insertion ; et si l'entrée existe."""
+    i = bisect.bisect_left(cles, cle)
+    while i < len(cles) and cles[i] == cle and pks[i] < pk:
+        i += 1
+    return i, i < len(cles) and cles[i] == cle and pks[i] == pk
+
+
+def _fusionner(cles, pks, entrees):
+    """
+    Listes (cles, pks) avec les entrées triées `entrees` en plus, reconstruites
+    par tranches (copies en C) plutôt que par une insertion par entrée, qui
+    décale à chaque fois toute la fin de liste.
+    """
+    positions = []
+    for cle, pk in entrees:
+        i, present = _position(cles, pks, cle, pk)
+        if not present:
+            positions.append((i, cle, pk))
+    if not positions:
+        return cles, pks
+    nouvelles_cles, nouveaux_pks = [], array('q')
+    debut = 0
+    for i, cle, pk in positions:
+        nouvelles_cles += cles[debut:i]
+        nouvelles_cles.append(cle)
+        nouveaux_pks += pks[debut:i]
+        nouveaux_pks.append(pk)
+        debut = i
+    nouvelles_cles += cles[debut:]
+    nouveaux_pks += pks[debut:]
+    return nouvelles_cles, nouveaux_pks
+
+
+class IndexInco:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._cles = None
+        self._pks = array('q')
+        # Incrémentée à chaque modification des listes (voir synchroniser)
+        self._version = 0
+        self._depuis = None
+        self._charge_le = None
+        self._synchronise_le = 0.0
+        self._thread = None
+
+    @property
+    def pret(self):
+        return self._cles is not None
+
+    def __len__(self):
+        return len(self._cles or ())
+
+    def vider(self):
+        with self._verrou:
+            self._remplacer(None, array('q'))
+            self._depuis, self._charge_le = None, None
+
+    # Chargement
+    def charger(self):
+        """Construit l'index à partir de la base et remplace l'index courant."""
+        from .models import FicheVictime
+
+        depuis = timezone.now()
+        entrees = []
+        dernier = 0
+        while True:
+            lot = list(
+                FicheVictime.objects.filter(pk__gt=dernier).order_by('pk').values_list('pk', 'matricule')[:TAILLE_LOT]
+            )
+            if not lot:
+                break
+            entrees.extend((cle_inco(matricule), pk) for pk, matricule in lot)
+            dernier = lot[-1][0]
+        entrees.sort()
+        cles = [cle for cle, _ in entrees]
+        pks = array('q', (pk for _, pk in entrees))
+        with self._verrou:
+            self._remplacer(cles, pks)
+            self._depuis, self._charge_le = depuis, time.monotonic()
+        # Écritures faites pendant le chargement
+        self.synchroniser(forcer=True)
+
+    def demarrer(self):
+        """Lance le chargement dans un thread de fond (synchrone si INCO_CHARGEMENT_EN_FOND est faux)."""
+        if not _parametre('INCO_CHARGEMENT_EN_FOND', True):
+            self.charger()
+            return
+        with self._verrou:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._charger_en_fond, name='inco-chargement', daemon=True)
+            self._thread.start()
+
+    def _charger_en_fond(self):
+        debut = time.perf_counter()
+        try:
+            self.charger()
+            logger.info("Index des INCO : %d fiches chargées en %.1fs", len(self), time.perf_counter() - debut)
+        except Exception:
+            logger.exception("Chargement de l'index des INCO impossible")
+        finally:
+            connections.close_all()
+
+    def synchroniser(self, forcer=False):
+        """Ajoute les fiches créées ou modifiées depuis la dernière synchronisation (autres processus)."""
+        from .models import FicheVictime
+
+        maintenant = time.monotonic()
+        with self._verrou:
+            if not self.pret:
+                return
+            if not forcer and maintenant - self._synchronise_le < _parametre('INCO_INTERVALLE_SYNCHRONISATION', 2):
+                return
+            self._synchronise_le = maintenant
+            depuis = self._depuis
+        debut = timezone.now()
+        modifiees = FicheVictime.objects.filter(date_modification__gte=depuis - MARGE).values_list('pk', 'matricule')
+        entrees = sorted((cle_inco(matricule), pk) for pk, matricule in modifiees)
+        if len(entrees) > SEUIL_FUSION:
+            # Écriture en masse : fusion hors du verrou sur une copie, remplacée si l'index
+            # n'a pas changé entre-temps (sinon, relue à la prochaine synchronisation)
+            with self._verrou:
+                if not self.pret:
+                    return
+                version, cles, pks = self._version, list(self._cles), array('q', self._pks)
+            cles, pks = _fusionner(cles, pks, entrees)
+            with self._verrou:
+                if self._version == version:
+                    self._remplacer(cles, pks)
+                    self._depuis = max(self._depuis, debut)
+        else:
+            with self._verrou:
+                if not self.pret:
+                    return
+                for cle, pk in entrees:
+                    self._ajouter(cle, pk)
+                self._depuis = max(self._depuis, debut)
+        if maintenant - self._charge_le > _parametre('INCO_RECHARGEMENT', 3600):
+            self._charge_le = maintenant
+            self.demarrer()
+
+    # Mises à jour
+    def _remplacer(self, cles, pks):
+        self._cles, self._pks = cles, pks
+        self._version += 1
+
+    def _ajouter(self, cle, pk):
+        i, present = _position(self._cles, self._pks, cle, pk)
+        if not present:
+            self._cles.insert(i, cle)
+            self._pks.insert(i, pk)
+            self._version += 1
+
+    def _retirer(self, cle, pk):
+        i, present = _position(self._cles, self._pks, cle, pk)
+        if present:
+            del self._cles[i]
+            del self._pks[i]
+            self._version += 1
+
+    def ajouter(self, pk, matricule, ancien=None):
+        """Fiche enregistrée (`ancien` : INCO avant modification)."""
+        with self._verrou:
+            if not self.pret:
+                return
+            if ancien is not None and ancien != matricule:
+                self._retirer(cle_inco(ancien), pk)
+            self._ajouter(cle_inco(matricule), pk)
+
+    def retirer(self, pk, matricule):
+        with self._verrou:
+            if self.pret:
+                self._retirer(cle_inco(matricule), pk)
+
+    # Lecture
+    def candidats(self, prefixe, nombre):
+        """[(INCO compact, pk), ...] des `nombre` premières entrées commençant par `prefixe`."""
+        with self._verrou:
+            i = bisect.bisect_left(self._cles, prefixe)
+            entrees = list(zip(self._cles[i:i + nombre], self._pks[i:i + nombre]))
+        return [(cle, pk) for cle, pk in entrees if cle.startswith(prefixe)]
+
+
+index = IndexInco()
+
+
+def _candidats_base(prefixe, nombre):
+    """Candidats lus dans l'index de recherche des fiches, tant que l'index mémoire n'est pas chargé."""
+    from .models import FicheVictime, TermeRechercheVictime
+
+    # Les termes de nom et prénom partagent l'index : on en lit davantage
+    victimes = set(
+        TermeRechercheVictime.objects.filter(terme__range=bornes_prefixe(prefixe))
+        .order_by('terme')
+        .values_list('victime_id', flat=True)[:nombre * 20]
+    )
+    entrees = sorted(
+        (cle_inco(matricule), pk)
+        for pk, matricule in FicheVictime.objects.filter(pk__in=victimes).values_list('pk', 'matricule')
+    )
+    return [(cle, pk) for cle, pk in entrees if cle.startswith(prefixe)][:nombre]
+
+
+def suggestions(user, texte, limite=LIMITE):
+    """INCO commençant par `texte`, dans l'ordre, avec le nom des fiches visibles par l'utilisateur."""
+    from .models import FicheVictime
+
+    prefixe = cle_inco(texte)
+    if not prefixe:
+        return []
+    limite = max(1, min(limite, LIMITE_MAX))
+    if index.pret:
+        index.synchroniser()
+        candidats = index.candidats(prefixe, limite + SURPLUS)
+    else:
+        index.demarrer()
+        candidats = index.candidats(prefixe, limite + SURPLUS) if index.pret else _candidats_base(prefixe, limite + SURPLUS)
+    fiches = {
+        fiche['pk']: fiche
+        for fiche in FicheVictime.objects.filter(pk__in=[pk for _, pk in candidats]).values(
+            'pk', 'matricule', 'nom', 'prenom', 'cree_par_id'
+        )
+    }
+    resultats = []
+    for cle, pk in candidats:
+        fiche = fiches.get(pk)
+        # Fiche supprimée ou INCO modifié par un autre processus
+        if fiche is None or cle_inco(fiche['matricule']) != cle:
+            continue
+        visible = user.role != 'agent' or fiche['cree_par_id'] == user.pk
+        resultats.append({
+            'matricule': fiche['matricule'],
+            'nom': f"{fiche['prenom']} {fiche['nom']}" if visible else None,
+            'url': reverse('victime_details_ajax', args=[pk]) if visible else None,
+        })
+        if len(resultats) == limite:
+            break
+    return resultats
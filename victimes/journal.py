@@ -0,0 +1,316 @@
+"""
+Écriture tamponnée du journal des actions.
+
+Les vues appellent `journaliser(...)` au lieu de `JournalAction.objects.create`.
+Chaque entrée est ajoutée à un fichier de secours local (une ligne JSON),
+puis gardée en mémoire ; le tampon est écrit en base par `bulk_create` quand
+il atteint JOURNAL_TAILLE_LOT entrées ou quand la plus ancienne a plus de
+JOURNAL_DELAI_MAX secondes. Le vidage a lieu en fin de requête (signal
+request_finished, après l'envoi de la réponse) ou par un thread de fond.
+
+Chaque entrée est forcée sur le disque (fsync) avant d'être acceptée.
+Après un arrêt brutal, les fichiers de secours des processus disparus sont
+rejoués par un autre processus, au premier vidage puis au plus toutes les
+JOURNAL_INTERVALLE_ORPHELINS secondes (ou par `manage.py journal_vider`).
+Chaque fichier est d'abord réclamé par un renommage atomique
+(`rejeu-<pid>-journal-….jsonl`) : deux processus ne peuvent pas rejouer le
+même ; un fichier réclamé par un processus arrêté avant la fin du rejeu est
+repris par un autre.
+
+Les entrées ajoutées et écrites, les échecs et la durée des vidages sont
+aussi cumulés dans les métriques partagées par les processus (metriques.py) :
+`etat()` ne décrit que le tampon du processus courant.
+
+Avec JOURNAL_SYNCHRONE, chaque entrée est écrite immédiatement (mode
+utilisé en développement et par les tests).
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metriques
+
+logger = logging.getLogger(__name__)
+
+# Préfixe d'un fichier de secours réclamé pour être rejoué
+PREFIXE_REJEU = 'rejeu'
+
+
+def _parametre(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+def _synchroniser_repertoire(repertoire):
+    """Rend durable la création d'un fichier dans `repertoire` (POSIX)."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    descripteur = os.open(repertoire, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descripteur)
+    finally:
+        os.close(descripteur)
+
+
+def _processus_actif(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lire_secours(chemin):
+    """
+    Entrées d'un fichier de secours. Une dernière ligne incomplète (processus
+    arrêté en pleine écriture) est ignorée ; une ligne illisible ailleurs lève
+    une erreur et le fichier est conservé.
+    """
+    with open(chemin, encoding='utf-8') as fichier:
+        lignes = [ligne for ligne in fichier if ligne.strip()]
+    lot = []
+    for numero, ligne in enumerate(lignes, 1):
+        try:
+            lot.append(json.loads(ligne))
+        except json.JSONDecodeError:
+            if numero < len(lignes):
+                raise
+            logger.warning("Journal : dernière ligne incomplète ignorée dans %s", chemin)
+    return lot
+
+
+class TamponJournal:
+    def __init__(self, repertoire=None, taille_lot=None, delai_max=None):
+        self.repertoire = str(repertoire or _parametre('JOURNAL_REPERTOIRE_SECOURS', settings.BASE_DIR / 'journal_secours'))
+        self.taille_lot = taille_lot or _parametre('JOURNAL_TAILLE_LOT', 50)
+        self.delai_max = delai_max or _parametre('JOURNAL_DELAI_MAX', 2.0)
+        self._verrou = threading.Lock()
+        self._verrou_vidage = threading.Lock()
+        self._entrees = []
+        self._plus_ancienne = None
+        self._segment = None
+        self._fichier = None
+        self._numero_segment = 0
+        self._segments_en_attente = []
+        self._orphelins_verifies_le = None
+        self._thread = None
+        # Indicateurs exposés par etat()
+        self.nb_vidages = 0
+        self.nb_entrees_ecrites = 0
+        self.nb_echecs = 0
+        self.derniere_duree_ms = 0.0
+        self.duree_max_ms = 0.0
+
+    # Fichiers de secours
+    def _chemin_segment(self, pid, numero):
+        return os.path.join(self.repertoire, f"journal-{pid}-{numero}.jsonl")
+
+    def _ouvrir_segment(self):
+        os.makedirs(self.repertoire, exist_ok=True)
+        self._segment = self._chemin_segment(os.getpid(), self._numero_segment)
+        self._fichier = open(self._segment, 'a', encoding='utf-8')
+        _synchroniser_repertoire(self.repertoire)
+
+    def _fermer_segment(self):
+        segment = self._segment
+        if self._fichier is not None:
+            self._fichier.close()
+        self._fichier = None
+        self._segment = None
+        self._numero_segment += 1
+        return segment
+
+    # API
+    def ajouter(self, utilisateur_id, action, details=''):
+        entree = {
+            'utilisateur_id': utilisateur_id,
+            'action': action,
+            'details': details,
+            'date_action': timezone.now().isoformat(),
+        }
+        with self._verrou:
+            if self._fichier is None:
+                self._ouvrir_segment()
+            self._fichier.write(json.dumps(entree, ensure_ascii=False) + '\n')
+            self._fichier.flush()
+            os.fsync(self._fichier.fileno())
+            self._entrees.append(entree)
+            if self._plus_ancienne is None:
+                self._plus_ancienne = time.monotonic()
+        metriques.registre.incrementer('journal_entrees_ajoutees_total')
+        self._demarrer_thread()
+
+    def profondeur(self):
+        return len(self._entrees)
+
+    def doit_vider(self):
+        if not self._entrees:
+            return False
+        if len(self._entrees) >= self.taille_lot:
+            return True
+        return time.monotonic() - self._plus_ancienne >= self.delai_max
+
+    def vider(self, force=True):
+        """Écrit le tampon en base. Retourne le nombre d'entrées écrites."""
+        if not force and not self.doit_vider():
+            return 0
+        # Un seul vidage à la fois ; les autres appels repartent immédiatement
+        if not self._verrou_vidage.acquire(blocking=force):
+            return 0
+        try:
+            maintenant = time.monotonic()
+            if (self._orphelins_verifies_le is None
+                    or maintenant - self._orphelins_verifies_le >= _parametre('JOURNAL_INTERVALLE_ORPHELINS', 60)):
+                self._orphelins_verifies_le = maintenant
+                try:
+                    self._rejouer_orphelins()
+                except Exception:
+                    logger.exception("Échec de la récupération des fichiers de secours du journal")
+            with self._verrou:
+                lot, self._entrees = self._entrees, []
+                self._plus_ancienne = None
+                segments = self._segments_en_attente
+                self._segments_en_attente = []
+                if self._segment is not None:
+                    segments.append(self._fermer_segment())
+            if not lot:
+                return 0
+            debut = time.perf_counter()
+            try:
+                self._ecrire(lot)
+            except Exception:
+                self.nb_echecs += 1
+                metriques.registre.incrementer('journal_echecs_total')
+                logger.exception("Échec d'écriture du journal (%d entrées conservées)", len(lot))
+                with self._verrou:
+                    self._entrees = lot + self._entrees
+                    self._plus_ancienne = self._plus_ancienne or time.monotonic()
+                    self._segments_en_attente = segments + self._segments_en_attente
+                return 0
+            duree_ms = (time.perf_counter() - debut) * 1000
+            for segment in segments:
+                try:
+                    os.remove(segment)
+                except FileNotFoundError:
+                    pass
+            self.nb_vidages += 1
+            self.nb_entrees_ecrites += len(lot)
+            self.derniere_duree_ms = duree_ms
+            self.duree_max_ms = max(self.duree_max_ms, duree_ms)
+            metriques.registre.incrementer('journal_entrees_ecrites_total', len(lot))
+            metriques.registre.observer_duree('journal_vidage_duree_secondes', duree_ms / 1000)
+            logger.debug("Journal : %d entrées écrites en %.1f ms (reste %d)", len(lot), duree_ms, self.profondeur())
+            return len(lot)
+        finally:
+            self._verrou_vidage.release()
+
+    def etat(self):
+        return {
+            'profondeur': self.profondeur(),
+            'nb_vidages': self.nb_vidages,
+            'nb_entrees_ecrites': self.nb_entrees_ecrites,
+            'nb_echecs': self.nb_echecs,
+            'derniere_duree_ms': round(self.derniere_duree_ms, 2),
+            'duree_max_ms': round(self.duree_max_ms, 2),
+        }
+
+    # Écriture en base
+    @staticmethod
+    def _instances(lot):
+        from .models import JournalAction
+        return [
+            JournalAction(
+                utilisateur_id=entree['utilisateur_id'],
+                action=entree['action'][:255],
+                details=entree['details'],
+                date_action=parse_datetime(entree['date_action']),
+            )
+            for entree in lot
+        ]
+
+    def _ecrire(self, lot):
+        from .models import JournalAction, User
+        # Utilisateur supprimé entre-temps : on garde l'entrée sans auteur
+        auteurs = {entree['utilisateur_id'] for entree in lot if entree['utilisateur_id']}
+        existants = set(User.objects.filter(pk__in=auteurs).values_list('pk', flat=True)) if auteurs else set()
+        for entree in lot:
+            if entree['utilisateur_id'] not in existants:
+                entree['utilisateur_id'] = None
+        with transaction.atomic():
+            JournalAction.objects.bulk_create(self._instances(lot), batch_size=500)
+
+    def _rejouer_orphelins(self):
+        """Réécrit les fichiers de secours laissés par des processus arrêtés."""
+        chemins = glob.glob(os.path.join(self.repertoire, 'journal-*-*.jsonl'))
+        chemins += glob.glob(os.path.join(self.repertoire, f'{PREFIXE_REJEU}-*-journal-*.jsonl'))
+        for chemin in sorted(chemins):
+            nom = os.path.basename(chemin)
+            try:
+                if nom.startswith(f'{PREFIXE_REJEU}-'):
+                    # Déjà réclamé : repris si le rejeu n'a pas abouti (processus arrêté, ou ce processus)
+                    pid, origine = nom[len(PREFIXE_REJEU) + 1:].split('-', 1)
+                    pid = int(pid)
+                    if pid != os.getpid() and _processus_actif(pid):
+                        continue
+                else:
+                    origine = nom
+                    pid = int(nom.split('-')[1])
+                    if pid == os.getpid() or _processus_actif(pid):
+                        continue
+            except (IndexError, ValueError):
+                continue
+            reclame = os.path.join(self.repertoire, f"{PREFIXE_REJEU}-{os.getpid()}-{origine}")
+            # Un fichier illisible ou une écriture en échec n'empêche pas de rejouer les suivants
+            try:
+                if chemin != reclame:
+                    try:
+                        os.rename(chemin, reclame)
+                    except FileNotFoundError:
+                        # Réclamé par un autre processus
+                        continue
+                lot = _lire_secours(reclame)
+                if lot:
+                    self._ecrire(lot)
+                    self.nb_entrees_ecrites += len(lot)
+                    metriques.registre.incrementer('journal_entrees_ecrites_total', len(lot))
+                os.remove(reclame)
+                logger.info("Journal : %d entrées récupérées depuis %s", len(lot), chemin)
+            except Exception:
+                logger.exception("Échec de la récupération du fichier de secours %s", chemin)
+
+    # Vidage périodique
+    def _demarrer_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._boucle, name='journal-vidage', daemon=True)
+        self._thread.start()
+
+    def _boucle(self):
+        while True:
+            time.sleep(self.delai_max)
+            try:
+                self.vider(force=False)
+            finally:
+                connections.close_all()
+
+
+tampon = TamponJournal()
+atexit.register(tampon.vider)
+
+
+def journaliser(utilisateur, action, details=''):
+    """Enregistre une action dans le journal (tamponnée sauf en mode synchrone)."""
+    from .models import JournalAction
+    if _parametre('JOURNAL_SYNCHRONE', False):
+        return JournalAction.objects.create(utilisateur=utilisateur, action=action, details=details)
+    tampon.ajouter(getattr(utilisateur, 'pk', None), action, details)
@@ -0,0 +1,28 @@
+"""
+Lanceur des tests (TEST_RUNNER) : les métriques des requêtes faites par les
+tests sont envoyées dans une base temporaire, pas dans METRIQUES_FICHIER.
+"""
+import os
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from . import metriques
+
+
+class LanceurTests(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._repertoire_metriques = tempfile.TemporaryDirectory()
+        self._reglages_metriques = override_settings(
+            METRIQUES_FICHIER=os.path.join(self._repertoire_metriques.name, 'metriques.sqlite3'),
+        )
+        self._reglages_metriques.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        # Cumuls restants envoyés ici : l'envoi de fin de processus (atexit) n'a plus rien à écrire
+        metriques.registre.envoyer()
+        self._reglages_metriques.disable()
+        self._repertoire_metriques.cleanup()
+        super().teardown_test_environment(**kwargs)
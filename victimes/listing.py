@@ -0,0 +1,174 @@
+"""
+Requêtes de listing optimisées.
+
+Chaque page est servie avec un nombre constant de requêtes : les compteurs
+sont annotés par sous-requêtes et les aperçus (victimes, premiers membres,
+premières demandes) sont préchargés en une requête par relation.
+La pagination se fait par curseur (keyset) : sur la clé primaire pour les
+familles, sur (date_action, id) pour le journal des actions et sur
+(date_creation, id) pour les fiches victimes.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .cartes import CHAMPS as CHAMPS_CARTE
+from .models import Famille, MembreFamille, FicheVictime, DemandeAide, JournalAction
+
+TAILLE_PAGE_FAMILLES = 50
+TAILLE_PAGE_JOURNAL = 100
+TAILLE_PAGE_VICTIMES = 48
+NB_MEMBRES_APERCU = 3
+NB_DEMANDES_APERCU = 2
+_EPOQUE = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+PK_MAX = 2 ** 63 - 1
+
+
+def _compteur(model, champ_famille):
+    """Sous-requête COUNT(*) corrélée sur la famille courante."""
+    sous_requete = (
+        model.objects.filter(**{champ_famille: OuterRef('pk')})
+        .order_by()
+        .values(champ_famille)
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    return Coalesce(Subquery(sous_requete, output_field=IntegerField()), 0)
+
+
+def familles_visibles(user):
+    """Familles visibles par l'utilisateur (les agents ne voient que celles de leurs victimes)."""
+    return Famille.objects.visible_to(user)
+
+
+def familles_pour_liste(familles):
+    """Ajoute compteurs et aperçus préchargés à un queryset de familles."""
+    return familles.annotate(
+        nb_victimes=_compteur(FicheVictime, 'famille'),
+        nb_membres=_compteur(MembreFamille, 'famille'),
+        nb_demandes=_compteur(DemandeAide, 'famille'),
+    ).prefetch_related(
+        Prefetch(
+            'victimes',
+            queryset=FicheVictime.objects.only('id', 'famille_id', 'prenom', 'nom').order_by('id'),
+        ),
+        Prefetch(
+            'membres',
+            queryset=MembreFamille.objects.only('id', 'famille_id', 'prenom', 'nom').order_by('id')[:NB_MEMBRES_APERCU],
+            to_attr='membres_apercu',
+        ),
+        Prefetch(
+            'demandes',
+            queryset=DemandeAide.objects.only('id', 'famille_id', 'type_demande', 'statut').order_by('id')[:NB_DEMANDES_APERCU],
+            to_attr='demandes_apercu',
+        ),
+    )
+
+
+def page_familles(user, apres=None, taille=TAILLE_PAGE_FAMILLES):
+    """
+    Retourne (familles, curseur_suivant) pour une page de la liste des familles.
+
+    `apres` est l'identifiant de la dernière famille de la page précédente ;
+    `curseur_suivant` vaut None s'il n'y a plus de page.
+    """
+    familles = familles_visibles(user).order_by('pk')
+    if apres:
+        familles = familles.filter(pk__gt=apres)
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    page = list(familles_pour_liste(familles)[:taille + 1])
+    curseur_suivant = None
+    if len(page) > taille:
+        page = page[:taille]
+        curseur_suivant = page[-1].pk
+    return page, curseur_suivant
+
+
+# Journal des actions
+def debut_du_jour(texte):
+    """Début (aware, fuseau courant) du jour AAAA-MM-JJ, ou None si invalide."""
+    try:
+        jour = parse_date(texte or '')
+    except ValueError:
+        return None
+    if jour is None:
+        return None
+    return timezone.make_aware(datetime(jour.year, jour.month, jour.day))
+
+
+def filtrer_journal(utilisateur_id=None, role=None, date_debut=None, date_fin=None):
+    """
+    Filtres du journal exprimés en plages sur (utilisateur, date_action),
+    servis par les index et l'élagage des partitions (pas de cast __date).
+    """
+    actions = JournalAction.objects.all()
+    if utilisateur_id:
+        actions = actions.filter(utilisateur_id=utilisateur_id)
+    if role:
+        actions = actions.filter(utilisateur__role=role)
+    debut = debut_du_jour(date_debut)
+    if debut:
+        actions = actions.filter(date_action__gte=debut)
+    fin = debut_du_jour(date_fin)
+    if fin:
+        actions = actions.filter(date_action__lt=fin + timedelta(days=1))
+    return actions
+
+
+def encoder_curseur(moment, pk):
+    """Curseur opaque d'une position (horodatage, id) d'un parcours décroissant."""
+    ecart = moment - _EPOQUE
+    microsecondes = (ecart.days * 86400 + ecart.seconds) * 1000000 + ecart.microseconds
+    return f"{microsecondes}-{pk}"
+
+
+def decoder_curseur(curseur):
+    """Position (horodatage, id) d'un curseur ; None s'il est invalide (page de départ)."""
+    try:
+        microsecondes, pk = (int(partie) for partie in curseur.split('-'))
+        moment = _EPOQUE + timedelta(microseconds=microsecondes)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+    # Hors des bornes d'un BigAutoField, le moteur refuserait le paramètre
+    if not 0 < pk <= PK_MAX:
+        return None
+    return moment, pk
+
+
+def page_journal(actions, curseur=None, taille=TAILLE_PAGE_JOURNAL):
+    """
+    Retourne (actions, curseur_suivant) : une page du journal, de la plus
+    récente à la plus ancienne, à partir du curseur de la page précédente.
+    """
+    actions = actions.order_by('-date_action', '-pk')
+    position = decoder_curseur(curseur) if curseur else None
+    if position:
+        date_action, pk = position
+        actions = actions.filter(Q(date_action__lt=date_action) | Q(date_action=date_action, pk__lt=pk))
+    page = list(actions.select_related('utilisateur')[:taille + 1])
+    curseur_suivant = None
+    if len(page) > taille:
+        page = page[:taille]
+        curseur_suivant = encoder_curseur(page[-1].date_action, page[-1].pk)
+    return page, curseur_suivant
+
+
+def page_victimes(victimes, curseur=None, taille=TAILLE_PAGE_VICTIMES):
+    """
+    Retourne (victimes, curseur_suivant) : une page de fiches, de la plus
+    récente à la plus ancienne, avec les seuls champs lus par les cartes.
+    """
+    victimes = victimes.order_by('-date_creation', '-pk').only(*CHAMPS_CARTE)
+    position = decoder_curseur(curseur) if curseur else None
+    if position:
+        date_creation, pk = position
+        victimes = victimes.filter(Q(date_creation__lt=date_creation) | Q(date_creation=date_creation, pk__lt=pk))
+    page = list(victimes[:taille + 1])
+    curseur_suivant = None
+    if len(page) > taille:
+        page = page[:taille]
+        curseur_suivant = encoder_curseur(page[-1].date_creation, page[-1].pk)
+    return page, curseur_suivant
@@ -0,0 +1,116 @@
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from victimes.models import TRANCHES_AGE, Famille, MembreFamille
+
+VILLES = ['Ouagadougou', 'Bobo-Dioulasso', 'Koudougou', 'Ouahigouya', 'Kaya', 'Fada N\'Gourma', 'Dori', 'Banfora']
+
+
+class _Annulation(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare les filtres d'âge en base (intervalles de date_naissance) au calcul Python de MembreFamille.age"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nb', type=int, default=2000000, help="Nombre de membres synthétiques à générer")
+        parser.add_argument('--repetitions', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        try:
+            # Les données synthétiques sont créées dans une transaction annulée à la fin
+            with transaction.atomic():
+                self._generer(options['nb'], rng)
+                self._mesurer(options['repetitions'])
+                raise _Annulation
+        except _Annulation:
+            pass
+
+    def _generer(self, nb, rng):
+        debut = time.perf_counter()
+        nb_familles = max(1, nb // 5)
+        Famille.objects.bulk_create(
+            [Famille(nom_famille=f"BENCH-{i:07d}", ville=rng.choice(VILLES)) for i in range(nb_familles)],
+            batch_size=5000,
+        )
+        # bulk_create ne renvoie pas toujours les clés (MySQL) : on les relit
+        familles = list(Famille.objects.filter(nom_famille__startswith='BENCH-').values_list('pk', flat=True))
+        aujourd_hui = date.today()
+        taille_lot = 10000
+        for depart in range(0, nb, taille_lot):
+            MembreFamille.objects.bulk_create([
+                MembreFamille(
+                    famille_id=rng.choice(familles),
+                    nom='Bench',
+                    prenom=f"M{i}",
+                    ville=rng.choice(VILLES),
+                    relation_victime='enfant',
+                    date_naissance=aujourd_hui - timedelta(days=rng.randrange(0, 90 * 365)),
+                )
+                for i in range(depart, min(depart + taille_lot, nb))
+            ])
+        self.stdout.write(f"{nb} membres ({nb_familles} familles) générés en {time.perf_counter() - debut:.1f}s")
+
+    def _chronometrer(self, fonction, repetitions):
+        durees = []
+        resultat = None
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            resultat = fonction()
+            durees.append((time.perf_counter() - debut) * 1000)
+        return resultat, statistics.median(durees), max(durees)
+
+    def _comparer(self, nom, python, base, repetitions):
+        res_p, med_p, max_p = self._chronometrer(python, repetitions)
+        res_b, med_b, max_b = self._chronometrer(base, repetitions)
+        coherent = "OK" if res_p == res_b else "ÉCART"
+        self.stdout.write(
+            f"{nom:32} Python: médiane {med_p:9.1f} ms (max {max_p:9.1f}) | "
+            f"base: médiane {med_b:8.1f} ms (max {max_b:8.1f}) [{coherent}]"
+        )
+
+    def _mesurer(self, repetitions):
+        membres = MembreFamille.objects.all()
+
+        def enfants_python():
+            return sum(
+                1 for m in membres.filter(ville='Koudougou').only('date_naissance').iterator(chunk_size=10000)
+                if m.age is not None and 6 <= m.age <= 18
+            )
+
+        def enfants_base():
+            return membres.filter(ville='Koudougou').age_between(6, 18).count()
+
+        self._comparer("6-18 ans à Koudougou", enfants_python, enfants_base, repetitions)
+
+        def tranches_python():
+            comptes = Counter()
+            for m in membres.only('date_naissance').iterator(chunk_size=10000):
+                if m.age is not None:
+                    comptes[max(borne for borne in TRANCHES_AGE if borne <= m.age)] += 1
+            return [comptes[borne] for borne in TRANCHES_AGE]
+
+        def tranches_base():
+            return list(membres.age_buckets().values())
+
+        self._comparer("Histogramme des âges", tranches_python, tranches_base, repetitions)
+
+        # Recherche de l'admin des membres (une requête sur l'intervalle de naissance)
+        modele_admin = admin.site._registry[MembreFamille]
+        for saisie in ['30', '30-40', 'Koudougou 6-18']:
+            def recherche():
+                resultats, _ = modele_admin.get_search_results(None, membres, saisie)
+                return resultats.count(), list(resultats.order_by('-date_naissance')[:100])
+
+            _, med, maxi = self._chronometrer(recherche, repetitions)
+            self.stdout.write(f"Recherche admin {saisie!r:16} médiane {med:8.1f} ms (max {maxi:8.1f})")
@@ -0,0 +1,224 @@
+import asyncio
+import io
+import logging
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from victimes.metriques import registre
+from victimes.models import FicheVictime, User
+
+
+def _ligne(mesure):
+    if mesure is None:
+        return f"{'-':>8} {'-':>9} {'-':>9}"
+    return f"{mesure['debit']:8.1f} {mesure['mediane_ms']:9.1f} {mesure['p95_ms']:9.1f}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge d'une vue AJAX dans ce processus : même application servie par le "
+        "gestionnaire ASGI (une boucle d'événements) et par le gestionnaire WSGI avec un nombre "
+        "fixe de threads (comme un worker gunicorn --threads), à concurrence croissante"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrence', default='1,4,8,16,32,64',
+                            help="Nombres de clients simultanés, séparés par des virgules")
+        parser.add_argument('--requetes', type=int, default=400, help="Requêtes par palier")
+        parser.add_argument('--threads', type=int, default=4, help="Threads du worker WSGI")
+        parser.add_argument('--latence-sql', type=float, default=5.0,
+                            help="Aller-retour simulé vers la base, en ms, ajouté à chaque requête SQL")
+        parser.add_argument('--seuil-p95', type=float, default=250.0,
+                            help="Latence p95 (ms) sous laquelle un palier est tenu")
+        parser.add_argument('--utilisateur', help="Nom de l'utilisateur connecté (un admin par défaut)")
+        parser.add_argument('--url', help="Chemin à charger (détails d'une victime par défaut)")
+
+    def handle(self, *args, **options):
+        paliers = sorted({int(n) for n in options['concurrence'].split(',') if n})
+        if not paliers or paliers[0] < 1:
+            raise CommandError("--concurrence : entiers positifs attendus")
+        if options['utilisateur']:
+            user = User.objects.filter(username=options['utilisateur']).first()
+        else:
+            admins = User.objects.filter(role='admin', is_active=True).order_by('username')
+            user = admins.filter(username__startswith='syn_admin_').first() or admins.first()
+        if user is None:
+            raise CommandError("Aucun utilisateur pour se connecter")
+        chemin = options['url']
+        if not chemin:
+            victime = FicheVictime.objects.visible_to(user).exclude(famille=None).order_by('pk').first()
+            if victime is None:
+                raise CommandError("Aucune fiche victime (voir generer_donnees)")
+            chemin = reverse('victime_details_ajax', args=[victime.pk])
+
+        latence = options['latence_sql'] / 1000
+
+        def attente(execute, sql, params, many, context):
+            time.sleep(latence)
+            return execute(sql, params, many, context)
+
+        def ralentir(sender, connection, **kwargs):
+            # Connexion (ré)ouverte dans un thread de requête
+            if attente not in connection.execute_wrappers:
+                connection.execute_wrappers.append(attente)
+
+        journal_requetes = logging.getLogger('django.request')
+        niveau = journal_requetes.level
+        journal_requetes.setLevel(logging.CRITICAL)
+        if latence:
+            connection_created.connect(ralentir)
+        try:
+            with tempfile.TemporaryDirectory() as dossier, override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                METRIQUES_FICHIER=Path(dossier) / 'metriques.sqlite3',
+            ):
+                client = Client()
+                client.force_login(user)
+                cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+                asgi, wsgi = ASGIHandler(), WSGIHandler()
+                self.stdout.write(
+                    f"{chemin} ({user.username}), {options['requetes']} requêtes par palier, "
+                    f"WSGI {options['threads']} threads, latence SQL simulée {options['latence_sql']} ms\n"
+                )
+                self.stdout.write(f"{'clients':>8} | {'ASGI req/s':>8} {'méd. ms':>9} {'p95 ms':>9} | "
+                                  f"{'WSGI req/s':>8} {'méd. ms':>9} {'p95 ms':>9}")
+                tenus = {'ASGI': None, 'WSGI': None}
+                for clients in paliers:
+                    mesures = {
+                        'ASGI': self._asgi(asgi, chemin, cookie, clients, options['requetes']),
+                        'WSGI': self._wsgi(wsgi, chemin, cookie, clients, options['requetes'], options['threads']),
+                    }
+                    self.stdout.write(f"{clients:8} | {_ligne(mesures['ASGI'])} | {_ligne(mesures['WSGI'])}")
+                    for nom, mesure in mesures.items():
+                        if mesure['erreurs']:
+                            self.stderr.write(f"{nom} : {mesure['erreurs']} réponse(s) en erreur à {clients} clients")
+                        if mesure['p95_ms'] <= options['seuil_p95'] and not mesure['erreurs']:
+                            tenus[nom] = (clients, mesure)
+                registre.envoyer()
+        finally:
+            connection_created.disconnect(ralentir)
+            journal_requetes.setLevel(niveau)
+
+        self.stdout.write(f"\nCapacité à latence égale (p95 ≤ {options['seuil_p95']:.0f} ms) :")
+        for nom, tenu in tenus.items():
+            if tenu is None:
+                self.stdout.write(f"  {nom} : aucun palier tenu")
+            else:
+                clients, mesure = tenu
+                self.stdout.write(f"  {nom} : {clients} clients simultanés, {mesure['debit']:.1f} req/s")
+
+    def _resultat(self, durees, statuts, ecoule):
+        durees.sort()
+        return {
+            'debit': len(durees) / ecoule,
+            'mediane_ms': statistics.median(durees) * 1000,
+            'p95_ms': durees[min(len(durees) - 1, int(0.95 * len(durees)))] * 1000,
+            'erreurs': sum(1 for statut in statuts if statut != 200),
+        }
+
+    def _asgi(self, application, chemin, cookie, clients, nb_requetes):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': chemin, 'raw_path': chemin.encode(),
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+
+        async def requete():
+            corps_envoye = False
+            statut = None
+
+            async def receive():
+                nonlocal corps_envoye
+                if not corps_envoye:
+                    corps_envoye = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Le client reste connecté : attente jusqu'à l'annulation par Django
+                await asyncio.Event().wait()
+
+            async def send(message):
+                nonlocal statut
+                if message['type'] == 'http.response.start':
+                    statut = message['status']
+
+            await application(dict(scope), receive, send)
+            return statut
+
+        async def charge():
+            restantes = nb_requetes
+            durees, statuts = [], []
+
+            async def client():
+                nonlocal restantes
+                while restantes > 0:
+                    restantes -= 1
+                    debut = time.perf_counter()
+                    statuts.append(await requete())
+                    durees.append(time.perf_counter() - debut)
+
+            debut = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(clients)))
+            return self._resultat(durees, statuts, time.perf_counter() - debut)
+
+        return asyncio.run(charge())
+
+    def _wsgi(self, application, chemin, cookie, clients, nb_requetes, nb_threads):
+        verrou = threading.Lock()
+        restantes = [nb_requetes]
+        durees, statuts = [], []
+
+        def requete():
+            statut = []
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': chemin, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            reponse = application(environ, lambda etat, entetes, exc_info=None: statut.append(int(etat.split()[0])))
+            try:
+                for _ in reponse:
+                    pass
+            finally:
+                reponse.close()
+            return statut[0]
+
+        def client():
+            while True:
+                with verrou:
+                    if restantes[0] <= 0:
+                        return
+                    restantes[0] -= 1
+                debut = time.perf_counter()
+                # Les clients en surnombre attendent (dans l'ordre) un thread libre du worker
+                statut = worker.submit(requete).result()
+                duree = time.perf_counter() - debut
+                with verrou:
+                    statuts.append(statut)
+                    durees.append(duree)
+
+        with ThreadPoolExecutor(max_workers=nb_threads) as worker:
+            debut = time.perf_counter()
+            fils = [threading.Thread(target=client) for _ in range(clients)]
+            for fil in fils:
+                fil.start()
+            for fil in fils:
+                fil.join()
+        return self._resultat(durees, statuts, time.perf_counter() - debut)
@@ -0,0 +1,162 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from victimes import inco, recherche_globale
+from victimes.models import FicheVictime, TermeRecherche, TermeRechercheVictime, User
+from victimes.recherche import cle_recherche, rechercher_victimes, termes_victime
+
+NOMS = ['Ouédraogo', 'Sawadogo', 'Kaboré', 'Compaoré', 'Traoré', 'Zongo', 'Ilboudo', 'Kiemdé', 'Sanou', 'Dabiré']
+PRENOMS = ['Aminata', 'Issouf', 'Mariam', 'Boukary', 'Salif', 'Fatimata', 'Adama', 'Élise', 'Gérald', 'Hamidou']
+
+
+class _Annulation(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la recherche indexée des fiches victimes à l'ancienne recherche icontains, "
+        "ou mesure la recherche globale (--globale) ou les suggestions d'INCO (--inco) sur les données en base"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nb', type=int, default=100000, help="Nombre de fiches synthétiques à générer")
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--globale', action='store_true',
+                            help="Mesure recherche_globale.rechercher par rôle (données de generer_donnees)")
+        parser.add_argument('--inco', action='store_true',
+                            help="Mesure inco.suggestions (percentiles) sur les INCO en base")
+
+    def handle(self, *args, **options):
+        if options['globale']:
+            self._mesurer_globale(options['repetitions'])
+            return
+        if options['inco']:
+            rng = random.Random(options['seed'])
+            try:
+                # Base complétée jusqu'à --nb fiches, dans une transaction annulée à la fin
+                with transaction.atomic():
+                    manquantes = options['nb'] - FicheVictime.objects.count()
+                    if manquantes > 0:
+                        self._generer(manquantes, rng)
+                    self._mesurer_inco(options['repetitions'], rng)
+                    raise _Annulation
+            except _Annulation:
+                inco.index.vider()
+            return
+        rng = random.Random(options['seed'])
+        try:
+            # Les fiches synthétiques sont créées dans une transaction annulée à la fin
+            with transaction.atomic():
+                self._generer(options['nb'], rng)
+                self._mesurer(options['repetitions'])
+                raise _Annulation
+        except _Annulation:
+            pass
+
+    def _generer(self, nb, rng):
+        debut = time.perf_counter()
+        taille_lot = 5000
+        for depart in range(0, nb, taille_lot):
+            lot = []
+            for i in range(depart, min(depart + taille_lot, nb)):
+                victime = FicheVictime(
+                    nom=rng.choice(NOMS),
+                    prenom=rng.choice(PRENOMS),
+                    matricule=f"BENCH-{i:07d}",
+                )
+                victime.cle_recherche = cle_recherche(victime)
+                lot.append(victime)
+            FicheVictime.objects.bulk_create(lot)
+            # bulk_create ne renvoie pas toujours les clés (MySQL) : on les relit
+            pks = dict(FicheVictime.objects.filter(
+                matricule__in=[v.matricule for v in lot]
+            ).values_list('matricule', 'pk'))
+            TermeRechercheVictime.objects.bulk_create(
+                [
+                    TermeRechercheVictime(victime_id=pks[v.matricule], terme=terme)
+                    for v in lot
+                    for terme in termes_victime(v)
+                ],
+                batch_size=5000,
+            )
+        self.stdout.write(f"{nb} fiches générées en {time.perf_counter() - debut:.1f}s")
+
+    def _chronometrer(self, fonction, repetitions):
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            fonction()
+            durees.append((time.perf_counter() - debut) * 1000)
+        return statistics.median(durees), max(durees)
+
+    def _mesurer(self, repetitions):
+        for saisie in ['dedougou', 'Kiemde', 'ouedr ami', 'BENCH-00420']:
+            def ancienne():
+                list(FicheVictime.objects.filter(
+                    Q(matricule__icontains=saisie) | Q(nom__icontains=saisie) | Q(prenom__icontains=saisie)
+                ).order_by('-date_creation')[:50])
+
+            def indexee():
+                list(rechercher_victimes(FicheVictime.objects.all(), saisie).order_by('-date_creation')[:50])
+
+            med_a, max_a = self._chronometrer(ancienne, repetitions)
+            med_i, max_i = self._chronometrer(indexee, repetitions)
+            self.stdout.write(
+                f"{saisie!r:16} icontains: médiane {med_a:8.2f} ms (max {max_a:8.2f}) | "
+                f"index: médiane {med_i:8.2f} ms (max {max_i:8.2f})"
+            )
+
+    def _mesurer_globale(self, repetitions):
+        self.stdout.write(f"{TermeRecherche.objects.count()} termes indexés")
+        for role in ('agent', 'assistant', 'admin'):
+            utilisateurs = User.objects.filter(role=role, is_active=True).order_by('username')
+            user = utilisateurs.filter(username__startswith=f"syn_{role}_").first() or utilisateurs.first()
+            if user is None:
+                continue
+            for saisie in ['ouedraogo', 'Kiemdé Aminata', 'SYN-0000420', 'dedougou', 'fournitures', 'o']:
+                med, maxi = self._chronometrer(lambda: recherche_globale.rechercher(user, saisie), repetitions)
+                self.stdout.write(f"{role:10} {saisie!r:18} médiane {med:8.2f} ms (max {maxi:8.2f})")
+
+    def _mesurer_inco(self, repetitions, rng):
+        debut = time.perf_counter()
+        inco.index.charger()
+        self.stdout.write(f"{len(inco.index)} INCO chargés en {time.perf_counter() - debut:.1f}s")
+        matricules = list(FicheVictime.objects.order_by('?').values_list('matricule', flat=True)[:200])
+        if not matricules:
+            return
+        for role in ('agent', 'admin'):
+            utilisateurs = User.objects.filter(role=role, is_active=True).order_by('username')
+            user = utilisateurs.filter(username__startswith=f"syn_{role}_").first() or utilisateurs.first()
+            if user is None:
+                continue
+            # Saisie progressive : chaque préfixe d'un INCO tiré au hasard
+            saisies = [
+                matricule[:longueur]
+                for matricule in rng.sample(matricules, min(len(matricules), repetitions * 5))
+                for longueur in range(1, len(matricule) + 1)
+            ]
+            durees = []
+            for saisie in saisies:
+                depart = time.perf_counter()
+                inco.suggestions(user, saisie)
+                durees.append((time.perf_counter() - depart) * 1000)
+            durees.sort()
+            centile = lambda p: durees[min(len(durees) - 1, int(p * len(durees)))]
+            self.stdout.write(
+                f"{role:10} {len(saisies)} saisies : médiane {centile(0.5):.2f} ms, "
+                f"p99 {centile(0.99):.2f} ms, max {durees[-1]:.2f} ms"
+            )
+        depart = time.perf_counter()
+        for i in range(1000):
+            inco.index.ajouter(-i - 1, f"BENCH-{i:07d}")
+        for i in range(1000):
+            inco.index.retirer(-i - 1, f"BENCH-{i:07d}")
+        par_fiche = (time.perf_counter() - depart) * 1000 / 1000
+        self.stdout.write(f"ajout + retrait en mémoire : {par_fiche:.3f} ms par fiche")
@@ -0,0 +1,217 @@
+import json
+import logging
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from victimes import urls
+from victimes.metriques import registre
+from victimes.models import (
+    DemandeAide, DocumentVictime, Famille, FicheVictime, JournalAction, MembreFamille, User,
+)
+
+ROLES = ('agent', 'assistant', 'responsable', 'admin')
+# Vues qui ne se mesurent pas en GET
+IGNOREES = {'logout', 'login'}
+MODELES = (User, FicheVictime, Famille, MembreFamille, DemandeAide, DocumentVictime, JournalAction)
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class _CompteurSql:
+    """Compte les requêtes SQL de toutes les connexions (connection.queries est vidé à chaque requête HTTP)."""
+
+    def __init__(self):
+        self.nb = 0
+        self._pile = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.nb += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        for connexion in connections.all():
+            self._pile.enter_context(connexion.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc):
+        self._pile.close()
+
+
+def _utilisateur(role):
+    """Utilisateur synthétique du rôle (le plus chargé), sinon le premier actif."""
+    utilisateurs = User.objects.filter(role=role, is_active=True).order_by('username')
+    return utilisateurs.filter(username__startswith=f"syn_{role}_").first() or utilisateurs.first()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la latence et le nombre de requêtes SQL de chaque URL de victimes/urls.py "
+        "pour chaque rôle, sur les données en base (voir generer_donnees), et écrit un rapport JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repetitions', type=int, default=5)
+        parser.add_argument('--roles', default=','.join(ROLES))
+        parser.add_argument('--urls', help="Noms d'URL à mesurer, séparés par des virgules (toutes par défaut)")
+        parser.add_argument('--exclure', default='', help="Noms d'URL à ignorer, séparés par des virgules")
+        parser.add_argument('--sortie', help="Fichier JSON où écrire le rapport")
+        parser.add_argument('--comparer', help="Rapport JSON d'un autre commit à comparer")
+        parser.add_argument('--seuil', type=float, default=20.0,
+                            help="Hausse de la médiane (en %%) signalée comme régression")
+
+    def handle(self, *args, **options):
+        roles = [role for role in options['roles'].split(',') if role]
+        inconnus = set(roles) - set(ROLES)
+        if inconnus:
+            raise CommandError(f"Rôle(s) inconnu(s) : {', '.join(sorted(inconnus))}")
+        choisies = set(filter(None, (options['urls'] or '').split(',')))
+        exclues = IGNOREES | set(filter(None, options['exclure'].split(',')))
+        motifs = [
+            motif for motif in urls.urlpatterns
+            if isinstance(motif, URLPattern) and motif.name not in exclues
+            and (not choisies or motif.name in choisies)
+        ]
+
+        rapport = {
+            'commit': _commit(),
+            'date': timezone.now().isoformat(timespec='seconds'),
+            'base': connection.vendor,
+            'repetitions': options['repetitions'],
+            'volumes': {modele.__name__: modele.objects.count() for modele in MODELES},
+            'resultats': {},
+        }
+        # Mesures hors des métriques de production (voir metriques.py) ; les 403
+        # attendus (rôle non autorisé) ne sont pas journalisés
+        journal_requetes = logging.getLogger('django.request')
+        niveau = journal_requetes.level
+        journal_requetes.setLevel(logging.CRITICAL)
+        try:
+            with tempfile.TemporaryDirectory() as dossier, override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                METRIQUES_FICHIER=Path(dossier) / 'metriques.sqlite3',
+            ):
+                for role in roles:
+                    user = _utilisateur(role)
+                    if user is None:
+                        self.stderr.write(f"Aucun utilisateur {role} : rôle ignoré")
+                        continue
+                    client = Client(raise_request_exception=False)
+                    client.force_login(user)
+                    arguments = self._arguments(user)
+                    for motif in motifs:
+                        kwargs = {nom: arguments.get(nom) for nom in motif.pattern.converters}
+                        if None in kwargs.values():
+                            self.stderr.write(f"{motif.name}[{role}] : pas de données pour {sorted(kwargs)}")
+                            continue
+                        url = reverse(motif.name, kwargs=kwargs)
+                        resultat = self._mesurer(client, url, options['repetitions'])
+                        rapport['resultats'][f"{motif.name}[{role}]"] = resultat
+                        self.stdout.write(
+                            f"{motif.name + '[' + role + ']':44} {resultat['statut']} "
+                            f"médiane {resultat['mediane_ms']:8.1f} ms  p95 {resultat['p95_ms']:8.1f} ms  "
+                            f"{resultat['requetes']:4} requêtes  {resultat['octets']} octets"
+                        )
+                registre.envoyer()
+        finally:
+            journal_requetes.setLevel(niveau)
+
+        if options['sortie']:
+            with open(options['sortie'], 'w', encoding='utf-8') as fichier:
+                json.dump(rapport, fichier, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {options['sortie']}"))
+        if options['comparer']:
+            with open(options['comparer'], encoding='utf-8') as fichier:
+                self._comparer(json.load(fichier), rapport, options['seuil'])
+
+    def _arguments(self, user):
+        """Valeurs des paramètres d'URL : objets visibles par l'utilisateur."""
+        familles = Famille.objects.visible_to(user).order_by('pk')
+        famille = familles.filter(membres__isnull=False).first() or familles.first()
+        victimes = FicheVictime.objects.visible_to(user).order_by('pk')
+        victime = (famille and victimes.filter(famille=famille).first()) or victimes.first()
+        demande = DemandeAide.objects.order_by('pk')
+        demande = demande.filter(famille=famille).first() or demande.first()
+        return {
+            'pk': famille and famille.pk,
+            'famille_id': famille and famille.pk,
+            'victime_id': victime and victime.pk,
+            'demande_id': demande and demande.pk,
+            'user_id': user.pk,
+            'quoi': 'victimes',
+            'format_export': 'csv',
+        }
+
+    def _requete(self, client, url):
+        reponse = client.get(url)
+        # Les exports en flux ne sont produits qu'à la lecture
+        taille = sum(len(morceau) for morceau in reponse.streaming_content) if reponse.streaming else len(reponse.content)
+        return reponse.status_code, taille
+
+    def _mesurer(self, client, url, repetitions):
+        # Premier passage (non chronométré) : compte des requêtes, caches chauds
+        with _CompteurSql() as requetes:
+            statut, taille = self._requete(client, url)
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            self._requete(client, url)
+            durees.append((time.perf_counter() - debut) * 1000)
+        durees.sort()
+        return {
+            'url': url,
+            'statut': statut,
+            'requetes': requetes.nb,
+            'octets': taille,
+            'mediane_ms': round(statistics.median(durees), 2),
+            'p95_ms': round(durees[min(len(durees) - 1, int(0.95 * len(durees)))], 2),
+            'max_ms': round(durees[-1], 2),
+        }
+
+    def _comparer(self, ancien, nouveau, seuil):
+        self.stdout.write(f"\nComparaison {ancien.get('commit')} -> {nouveau.get('commit')}")
+        # Les mesures elles-mêmes ajoutent quelques entrées au journal (connexions, exports)
+        volumes_avant, volumes_apres = ancien.get('volumes', {}), nouveau.get('volumes', {})
+        if any(
+            abs(volumes_apres.get(nom, 0) - n) > max(1, n // 100)
+            for nom, n in volumes_avant.items()
+        ) or set(volumes_avant) != set(volumes_apres):
+            self.stdout.write(self.style.WARNING("Volumes différents : comparaison indicative"))
+        regressions = 0
+        for cle in sorted(set(ancien['resultats']) & set(nouveau['resultats'])):
+            avant, apres = ancien['resultats'][cle], nouveau['resultats'][cle]
+            variation = (apres['mediane_ms'] - avant['mediane_ms']) / avant['mediane_ms'] * 100 if avant['mediane_ms'] else 0.0
+            requetes = apres['requetes'] - avant['requetes']
+            regression = variation > seuil or requetes > 0 or apres['statut'] != avant['statut']
+            regressions += regression
+            ligne = (
+                f"{cle:44} {avant['mediane_ms']:8.1f} -> {apres['mediane_ms']:8.1f} ms ({variation:+6.1f} %)  "
+                f"requêtes {avant['requetes']} -> {apres['requetes']}"
+            )
+            self.stdout.write(self.style.ERROR(ligne + "  RÉGRESSION") if regression else ligne)
+        absentes = set(ancien['resultats']) ^ set(nouveau['resultats'])
+        if absentes:
+            self.stdout.write(f"{len(absentes)} mesure(s) présente(s) dans un seul des rapports")
+        if regressions:
+            self.stdout.write(self.style.ERROR(f"{regressions} régression(s)"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Aucune régression"))
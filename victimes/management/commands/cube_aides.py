@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from victimes import cube
+
+
+class Command(BaseCommand):
+    help = "Reconstruit le cube des demandes d'aide ou le vérifie contre les tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verifier', action='store_true',
+                            help="Compare le cube aux tables sans rien modifier")
+
+    def handle(self, *args, **options):
+        if options['verifier']:
+            differences = cube.ecarts()
+            if not differences:
+                self.stdout.write(self.style.SUCCESS("Cube cohérent avec les tables."))
+                return
+            for cle, (dans_cube, reel) in sorted(differences.items()):
+                self.stdout.write(f"{' / '.join(str(d) for d in cle)}: cube={dans_cube} réel={reel}")
+            raise CommandError(f"{len(differences)} cellule(s) incohérente(s)")
+
+        cellules = cube.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"Cube reconstruit ({len(cellules)} cellules)."))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from victimes import synthetique
+from victimes.models import FicheVictime
+
+
+class Command(BaseCommand):
+    help = "Génère un jeu de données synthétique et déterministe (10k, 100k ou 1M fiches victimes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--echelle', choices=sorted(synthetique.ECHELLES), default='10k')
+        parser.add_argument('--nb', type=int, help="Nombre de fiches victimes (remplace --echelle)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--purger', action='store_true',
+                            help="Supprime d'abord les données synthétiques existantes")
+
+    def handle(self, *args, **options):
+        nb = options['nb'] or synthetique.ECHELLES[options['echelle']]
+        debut = time.perf_counter()
+        if options['purger']:
+            synthetique.purger()
+            self.stdout.write(f"Données synthétiques supprimées en {time.perf_counter() - debut:.1f}s")
+        elif FicheVictime.objects.filter(matricule__startswith='SYN-').exists():
+            raise CommandError("Des données synthétiques existent déjà : relancer avec --purger")
+
+        debut = time.perf_counter()
+
+        def progression(fait):
+            self.stdout.write(f"  {fait}/{nb} fiches ({time.perf_counter() - debut:.0f}s)")
+
+        volumes = synthetique.GenerateurDonnees(nb, graine=options['seed']).generer(progression)
+        for nom, n in volumes.items():
+            self.stdout.write(f"{nom:14} {n}")
+        self.stdout.write(self.style.SUCCESS(f"Jeu de données généré en {time.perf_counter() - debut:.1f}s"))
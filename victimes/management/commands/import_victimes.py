@@ -0,0 +1,60 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from victimes import statistiques
+from victimes.importation import TAILLE_LOT, ImportVictimes, ecrire_reprise, lire_enregistrements, lire_reprise
+from victimes.models import User
+
+
+class Command(BaseCommand):
+    help = "Importe en masse des fiches victimes (avec familles et membres) depuis un fichier CSV ou JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Fichier .csv ou .jsonl")
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help="Lignes par transaction")
+        parser.add_argument('--agent', help="Nom d'utilisateur enregistré comme créateur des fiches")
+        parser.add_argument('--rejets', help="Fichier des lignes rejetées (défaut : <fichier>.rejets.jsonl)")
+        parser.add_argument('--reprendre', action='store_true',
+                            help="Reprend après la dernière ligne validée d'un import interrompu")
+
+    def handle(self, *args, **options):
+        chemin = options['fichier']
+        if not os.path.exists(chemin):
+            raise CommandError(f"Fichier introuvable : {chemin}")
+        cree_par = None
+        if options['agent']:
+            try:
+                cree_par = User.objects.get(username=options['agent'])
+            except User.DoesNotExist:
+                raise CommandError(f"Utilisateur inconnu : {options['agent']}")
+
+        chemin_reprise = f"{chemin}.reprise"
+        depart = lire_reprise(chemin_reprise) if options['reprendre'] else 0
+        chemin_rejets = options['rejets'] or f"{chemin}.rejets.jsonl"
+        if depart:
+            self.stdout.write(f"Reprise après la ligne {depart}")
+
+        with open(chemin_rejets, 'a' if depart else 'w', encoding='utf-8') as rejets:
+            importation = ImportVictimes(cree_par=cree_par, taille_lot=options['taille_lot'], rejets=rejets)
+            for numero, donnees in lire_enregistrements(chemin):
+                if numero <= depart:
+                    continue
+                if importation.ajouter(numero, donnees):
+                    ecrire_reprise(chemin_reprise, importation.derniere_ligne)
+                    self.stdout.write(
+                        f"  ligne {numero} : {importation.nb_importees} importée(s), "
+                        f"{importation.lignes_par_seconde():.0f} lignes/s"
+                    )
+            importation.ecrire_lot()
+
+        if os.path.exists(chemin_reprise):
+            os.remove(chemin_reprise)
+        # bulk_create ne déclenche pas les signaux qui tiennent le snapshot à jour
+        statistiques.reconstruire()
+        self.stdout.write(self.style.SUCCESS(
+            f"{importation.nb_lignes} ligne(s) lue(s) : {importation.nb_importees} fiche(s), "
+            f"{importation.nb_familles} famille(s), {importation.nb_membres} membre(s) importé(s), "
+            f"{importation.nb_rejetees} rejet(s) ({chemin_rejets}) ; "
+            f"{importation.lignes_par_seconde():.0f} lignes/s."
+        ))
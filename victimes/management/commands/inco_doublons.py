@@ -0,0 +1,64 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from victimes import doublons
+
+
+class Command(BaseCommand):
+    help = (
+        "Fusionne les fiches victimes en double (même INCO, casse et espaces ignorés) : "
+        "la plus ancienne est conservée et reprend les documents et la famille des autres"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simulation', action='store_true',
+                            help="Affiche ce qui serait fait sans rien modifier")
+        parser.add_argument('--rapport',
+                            help="Fichier JSONL (une ligne par INCO en double, « - » pour la sortie standard)")
+        parser.add_argument('--taille-lot', type=int, default=doublons.TAILLE_LOT,
+                            help="INCO traités par transaction")
+
+    def handle(self, *args, **options):
+        groupes = doublons.groupes_doublons()
+        nb_fiches = sum(len(fiches) - 1 for _, fiches in groupes)
+        self.stdout.write(f"{len(groupes)} INCO en double, {nb_fiches} fiche(s) en trop")
+        if not groupes:
+            return
+
+        if options['simulation']:
+            plans = (doublons.plan(cle, fiches) for cle, fiches in groupes)
+        else:
+            plans = doublons.resoudre(groupes, options['taille_lot'])
+
+        rapport = None
+        if options['rapport'] == '-':
+            rapport = sys.stdout
+        elif options['rapport']:
+            rapport = open(options['rapport'], 'w', encoding='utf-8')
+        documents = familles_reprises = 0
+        familles_detachees = set()
+        try:
+            for numero, plan in enumerate(plans, 1):
+                if rapport:
+                    rapport.write(json.dumps(dict(plan, simulation=options['simulation']), ensure_ascii=False) + '\n')
+                documents += plan.get('documents_deplaces', 0)
+                familles_reprises += plan['famille_reprise'] is not None
+                familles_detachees.update(plan['familles_detachees'])
+                if not options['simulation'] and numero % options['taille_lot'] == 0:
+                    self.stdout.write(f"  {numero}/{len(groupes)} INCO traités")
+        finally:
+            if rapport and rapport is not sys.stdout:
+                rapport.close()
+
+        if options['simulation']:
+            self.stdout.write(
+                f"Simulation : {nb_fiches} fiche(s) seraient supprimées, {familles_reprises} famille(s) reprise(s) "
+                f"par la fiche conservée, {len(familles_detachees)} famille(s) détachée(s) de toute fiche."
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{nb_fiches} fiche(s) supprimée(s), {documents} document(s) rattaché(s) à la fiche conservée, "
+            f"{familles_reprises} famille(s) reprise(s), {len(familles_detachees)} famille(s) détachée(s)."
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from victimes import recherche_globale
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de la recherche globale ou le vérifie contre les tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verifier', action='store_true',
+                            help="Compte les lignes d'index à corriger sans rien modifier")
+        parser.add_argument('--taille-lot', type=int, default=recherche_globale.TAILLE_LOT)
+
+    def handle(self, *args, **options):
+        if options['verifier']:
+            ecarts = recherche_globale.ecarts(options['taille_lot'])
+            if not ecarts:
+                self.stdout.write(self.style.SUCCESS("Index cohérent avec les tables."))
+                return
+            for type_objet, nb in sorted(ecarts.items()):
+                self.stdout.write(f"{type_objet}: {nb} ligne(s) à corriger")
+            raise CommandError(f"Index incohérent pour {len(ecarts)} type(s) ; relancer sans --verifier")
+
+        volumes = recherche_globale.reconstruire(options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(
+            "Index reconstruit : " + ', '.join(f"{type_objet} {nb}" for type_objet, nb in volumes.items())
+            + " terme(s)."
+        ))
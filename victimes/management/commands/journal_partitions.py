@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from victimes.partitions import preparer_partitions, purger_avant
+
+
+class Command(BaseCommand):
+    help = "Crée les partitions mensuelles à venir du journal des actions et purge les mois anciens"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mois', type=int, default=3, help="Nombre de mois à venir à préparer (défaut : 3)")
+        parser.add_argument('--purger-avant', metavar='AAAA-MM', help="Supprime les actions antérieures à ce mois")
+
+    def handle(self, *args, **options):
+        creees = preparer_partitions(mois_a_venir=options['mois'])
+        self.stdout.write(f"{len(creees)} partition(s) créée(s) {' '.join(creees)}".rstrip())
+        if options['purger_avant']:
+            try:
+                limite = datetime.strptime(options['purger_avant'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("--purger-avant attend un mois au format AAAA-MM")
+            self.stdout.write(purger_avant(limite))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from victimes import metriques
+from victimes.journal import tampon
+
+
+class Command(BaseCommand):
+    help = "Écrit en base le tampon du journal et les fichiers de secours laissés par des processus arrêtés"
+
+    def handle(self, *args, **options):
+        tampon.vider()
+        etat = tampon.etat()
+        self.stdout.write(
+            f"{etat['nb_entrees_ecrites']} entrée(s) écrite(s) ; profondeur restante {etat['profondeur']}, "
+            f"dernier vidage {etat['derniere_duree_ms']} ms, échecs {etat['nb_echecs']}"
+        )
+        # Tampons des autres processus (serveur), d'après leurs derniers envois de métriques
+        totaux = metriques.totaux(
+            'journal_entrees_ajoutees_total', 'journal_entrees_ecrites_total', 'journal_echecs_total',
+            'journal_vidage_duree_secondes_sum', 'journal_vidage_duree_secondes_count',
+        )
+        nb_vidages = totaux['journal_vidage_duree_secondes_count']
+        self.stdout.write(
+            f"Tous processus : {totaux['journal_entrees_ajoutees_total'] - totaux['journal_entrees_ecrites_total']:.0f} "
+            f"entrée(s) en attente, {totaux['journal_entrees_ecrites_total']:.0f} écrite(s), "
+            f"échecs {totaux['journal_echecs_total']:.0f}, vidage moyen "
+            f"{totaux['journal_vidage_duree_secondes_sum'] / nb_vidages * 1000 if nb_vidages else 0:.1f} ms"
+        )
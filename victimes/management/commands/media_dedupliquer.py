@@ -0,0 +1,66 @@
+import os
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from victimes.stockage import REPERTOIRE_BLOBS, StockageDedupliquant, empreinte_fichier
+
+
+def _taille_lisible(octets):
+    if octets < 1024:
+        return f"{octets} o"
+    for unite in ('Ko', 'Mo', 'Go'):
+        octets /= 1024
+        if octets < 1024 or unite == 'Go':
+            return f"{octets:.1f} {unite}"
+
+
+class Command(BaseCommand):
+    help = "Déduplique les fichiers existants de MEDIA_ROOT dans le stockage adressé par contenu"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simulation', action='store_true',
+                            help="Calcule l'espace récupérable sans rien modifier")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, StockageDedupliquant):
+            raise CommandError("Le stockage par défaut n'est pas StockageDedupliquant (réglage STORAGES)")
+
+        fichiers = []
+        for dossier, sous_dossiers, noms in os.walk(default_storage.location):
+            if os.path.abspath(dossier) == os.path.abspath(default_storage.location):
+                sous_dossiers[:] = [d for d in sous_dossiers if d != REPERTOIRE_BLOBS]
+            fichiers.extend(os.path.join(dossier, nom) for nom in noms)
+
+        recupere = 0
+        if options['simulation']:
+            # Un exemplaire par contenu (les liens physiques existants comptent pour un)
+            inodes_par_empreinte = defaultdict(dict)
+            for chemin in fichiers:
+                infos = os.stat(chemin)
+                inodes_par_empreinte[empreinte_fichier(chemin)][infos.st_ino] = infos.st_size
+            for inodes in inodes_par_empreinte.values():
+                recupere += sum(inodes.values()) - next(iter(inodes.values()))
+            self.stdout.write(
+                f"{len(fichiers)} fichier(s), {len(inodes_par_empreinte)} contenu(s) distinct(s) : "
+                f"{_taille_lisible(recupere)} récupérable(s)."
+            )
+            return
+
+        doublons = 0
+        for chemin in fichiers:
+            octets = default_storage.lier_au_blob(chemin)
+            if octets:
+                doublons += 1
+                recupere += octets
+                self.stdout.write(f"  doublon : {os.path.relpath(chemin, default_storage.location)}")
+        orphelins = 0
+        for blob in list(default_storage.blobs()):
+            if os.stat(blob).st_nlink == 1:
+                os.remove(blob)
+                orphelins += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(fichiers)} fichier(s) traité(s), {doublons} doublon(s) fusionné(s), "
+            f"{orphelins} blob(s) orphelin(s) supprimé(s) : {_taille_lisible(recupere)} récupéré(s)."
+        ))
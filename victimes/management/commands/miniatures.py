@@ -0,0 +1,58 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+
+from victimes.miniatures import generer_miniatures
+from victimes.models import FicheVictime
+
+
+def _initialiser_processus():
+    # Processus lancés en mode "spawn" : Django doit y être initialisé
+    django.setup()
+
+
+def _traiter(nom_photo, forcer):
+    try:
+        return nom_photo, generer_miniatures(nom_photo, forcer=forcer), None
+    except Exception as exc:
+        return nom_photo, [], str(exc)
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures manquantes des photos de victimes, en parallèle sur plusieurs processus"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processus', type=int, default=os.cpu_count() or 1,
+                            help="Nombre de processus (défaut : nombre de cœurs)")
+        parser.add_argument('--forcer', action='store_true', help="Régénère aussi les miniatures existantes")
+
+    def handle(self, *args, **options):
+        photos = list(
+            FicheVictime.objects.exclude(photo='').exclude(photo__isnull=True)
+            .order_by('photo').values_list('photo', flat=True).distinct()
+        )
+        debut = time.perf_counter()
+        generees = echecs = 0
+        if options['processus'] <= 1:
+            resultats = (_traiter(nom, options['forcer']) for nom in photos)
+            generees, echecs = self._bilan(resultats)
+        else:
+            with ProcessPoolExecutor(options['processus'], initializer=_initialiser_processus) as executeur:
+                taches = [executeur.submit(_traiter, nom, options['forcer']) for nom in photos]
+                generees, echecs = self._bilan(tache.result() for tache in as_completed(taches))
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(photos)} photo(s) traitée(s) en {duree:.1f} s : {generees} miniature(s) générée(s), {echecs} échec(s)."
+        ))
+
+    def _bilan(self, resultats):
+        generees = echecs = 0
+        for nom_photo, rendus, erreur in resultats:
+            if erreur:
+                echecs += 1
+                self.stderr.write(f"{nom_photo} : {erreur}")
+            generees += len(rendus)
+        return generees, echecs
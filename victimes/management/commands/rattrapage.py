@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from victimes import rattrapages
+from victimes.models import PointReprise
+
+
+class Command(BaseCommand):
+    help = "Exécute ou reprend un rattrapage de données par lots (voir victimes/rattrapages.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('nom', nargs='?', help="Rattrapage à exécuter (sans nom : liste et avancement)")
+        parser.add_argument('--taille-lot', type=int, default=rattrapages.TAILLE_LOT, help="Lignes par transaction")
+        parser.add_argument('--debit', type=int, default=rattrapages.DEBIT,
+                            help="Lignes par seconde au plus (0 : sans limite)")
+        parser.add_argument('--recommencer', action='store_true',
+                            help="Repart du début au lieu de reprendre au dernier lot enregistré")
+        parser.add_argument('--simulation', action='store_true',
+                            help="Compte les lignes qui seraient modifiées sans rien écrire")
+
+    def handle(self, *args, **options):
+        if not options['nom']:
+            points = {point.nom: point for point in PointReprise.objects.all()}
+            for nom, classe in sorted(rattrapages.RATTRAPAGES.items()):
+                point = points.get(nom)
+                etat = "jamais exécuté" if point is None else (
+                    f"{'terminé' if point.termine else 'interrompu'}, {point.nb_lues} lue(s), "
+                    f"{point.nb_modifiees} modifiée(s), dernier id {point.dernier_pk}"
+                )
+                self.stdout.write(f"{nom:20} {(classe.__doc__ or '').strip()}\n{'':20} {etat}")
+            return
+        try:
+            rattrapage = rattrapages.RATTRAPAGES[options['nom']]()
+        except KeyError:
+            raise CommandError(f"Rattrapage inconnu : {options['nom']} (sans argument : liste des rattrapages)")
+
+        if options['simulation']:
+            lues, modifiees = rattrapages.simuler(rattrapage, options['taille_lot'])
+            self.stdout.write(f"Simulation : {lues} ligne(s) lue(s), {modifiees} seraient modifiée(s).")
+            return
+
+        point = PointReprise.objects.filter(nom=rattrapage.nom).first()
+        if point and point.termine and not options['recommencer']:
+            self.stdout.write(f"{rattrapage.nom} est déjà terminé ({point.nb_lues} ligne(s)) ; --recommencer pour le relancer.")
+            return
+        if point and point.nb_lues and not options['recommencer']:
+            self.stdout.write(f"Reprise après l'id {point.dernier_pk} ({point.nb_lues} ligne(s) déjà lue(s))")
+
+        debut = time.monotonic()
+        dernier_affichage = [debut]
+
+        def progression(point):
+            # Une ligne toutes les 5 secondes au plus
+            maintenant = time.monotonic()
+            if maintenant - dernier_affichage[0] >= 5:
+                dernier_affichage[0] = maintenant
+                self.stdout.write(
+                    f"  {point.nb_lues} lue(s), {point.nb_modifiees} modifiée(s), dernier id {point.dernier_pk}"
+                )
+
+        point = rattrapages.executer(
+            rattrapage, taille_lot=options['taille_lot'], debit=options['debit'],
+            recommencer=options['recommencer'], progression=progression,
+        )
+        duree = time.monotonic() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f"{rattrapage.nom} terminé : {point.nb_lues} ligne(s) lue(s), {point.nb_modifiees} modifiée(s) "
+            f"en {duree:.1f}s."
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from victimes import statistiques
+
+
+class Command(BaseCommand):
+    help = "Reconstruit le snapshot statistique du tableau de bord ou le vérifie contre un recomptage complet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verifier', action='store_true',
+                            help="Compare le snapshot au recomptage sans rien modifier")
+
+    def handle(self, *args, **options):
+        if options['verifier']:
+            differences = statistiques.ecarts()
+            if not differences:
+                self.stdout.write(self.style.SUCCESS("Snapshot cohérent avec les tables."))
+                return
+            for cle, (snapshot, reel) in sorted(differences.items()):
+                self.stdout.write(f"{cle}: snapshot={snapshot} réel={reel}")
+            raise CommandError(f"{len(differences)} compteur(s) incohérent(s)")
+
+        compteurs = statistiques.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"Snapshot reconstruit ({len(compteurs)} compteurs)."))
@@ -0,0 +1,295 @@
+"""
+Métriques de performance par vue, exposées au format texte Prometheus.
+
+`MetriquesMiddleware` mesure pour chaque requête, par nom d'URL :
+la durée (histogramme), le nombre et la durée des requêtes SQL, le temps
+de rendu des gabarits et la taille de la réponse. Pour une réponse en
+flux (exports), la mesure couvre toute la durée de l'envoi.
+
+Chaque processus cumule ses mesures en mémoire et les ajoute toutes les
+METRIQUES_INTERVALLE secondes (en fin de requête, après l'envoi de la
+réponse) à une base SQLite locale partagée par les processus du serveur
+(METRIQUES_FICHIER) : `exposition()` lit les totaux de tous les processus,
+y compris ceux qui ont été redémarrés. La vue `/metrics` est réservée aux
+administrateurs.
+"""
+import atexit
+import contextvars
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PREFIXE = 'gendarmerie'
+SEUILS_DUREE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Famille de métriques -> (type Prometheus, description)
+FAMILLES = {
+    f'{PREFIXE}_requete_duree_secondes': ('histogram', "Durée des requêtes HTTP par vue"),
+    f'{PREFIXE}_reponses_total': ('counter', "Réponses par vue et classe de statut"),
+    f'{PREFIXE}_sql_requetes_total': ('counter', "Requêtes SQL exécutées par vue"),
+    f'{PREFIXE}_sql_duree_secondes_total': ('counter', "Temps passé dans les requêtes SQL par vue"),
+    f'{PREFIXE}_gabarits_duree_secondes_total': ('counter', "Temps de rendu des gabarits par vue"),
+    f'{PREFIXE}_reponse_octets_total': ('counter', "Octets de corps de réponse envoyés par vue"),
+    f'{PREFIXE}_journal_entrees_ajoutees_total': ('counter', "Entrées ajoutées au tampon du journal"),
+    f'{PREFIXE}_journal_entrees_ecrites_total': ('counter', "Entrées du journal écrites en base (vidages et rejeux)"),
+    f'{PREFIXE}_journal_echecs_total': ('counter', "Vidages du tampon du journal en échec"),
+    f'{PREFIXE}_journal_vidage_duree_secondes': ('histogram', "Durée d'écriture en base d'un lot du journal"),
+}
+
+_SEUIL = re.compile(r'le="([^"]+)"')
+
+
+def _parametre(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+class _Mesure:
+    __slots__ = ('debut', 'nb_sql', 'duree_sql', 'duree_gabarits')
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.nb_sql = 0
+        self.duree_sql = 0.0
+        self.duree_gabarits = 0.0
+
+
+_mesure = contextvars.ContextVar('mesure_metriques', default=None)
+
+
+def _espion_sql(execute, sql, params, many, context):
+    mesure = _mesure.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        mesure.nb_sql += 1
+        mesure.duree_sql += time.perf_counter() - debut
+
+
+def instrumenter_gabarits():
+    """Mesure le rendu des gabarits Django (appelé une fois, par VictimesConfig.ready)."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'metriques', False):
+        return
+    rendu = Template.render
+
+    def render(self, context=None, request=None):
+        mesure = _mesure.get()
+        if mesure is None:
+            return rendu(self, context, request)
+        debut = time.perf_counter()
+        try:
+            return rendu(self, context, request)
+        finally:
+            mesure.duree_gabarits += time.perf_counter() - debut
+
+    render.metriques = True
+    Template.render = render
+
+
+class Registre:
+    """Cumuls du processus en attente d'ajout à la base partagée."""
+
+    def __init__(self):
+        self._valeurs = defaultdict(float)
+        self._verrou = threading.Lock()
+        self._dernier_envoi = time.monotonic()
+
+    def _histogramme(self, famille, etiquette, duree):
+        valeurs = self._valeurs
+        # Histogramme cumulatif ; tous les seuils sont écrits, même à 0
+        for seuil in SEUILS_DUREE:
+            valeurs[f'{famille}_bucket', ','.join(filter(None, (etiquette, f'le="{seuil}"')))] += duree <= seuil
+        valeurs[f'{famille}_bucket', ','.join(filter(None, (etiquette, 'le="+Inf"')))] += 1
+        valeurs[f'{famille}_sum', etiquette] += duree
+        valeurs[f'{famille}_count', etiquette] += 1
+
+    def observer(self, vue, statut, duree, mesure, taille):
+        etiquette = f'vue="{vue}"'
+        with self._verrou:
+            valeurs = self._valeurs
+            self._histogramme(f'{PREFIXE}_requete_duree_secondes', etiquette, duree)
+            valeurs[f'{PREFIXE}_reponses_total', f'{etiquette},statut="{statut // 100}xx"'] += 1
+            valeurs[f'{PREFIXE}_sql_requetes_total', etiquette] += mesure.nb_sql
+            valeurs[f'{PREFIXE}_sql_duree_secondes_total', etiquette] += mesure.duree_sql
+            valeurs[f'{PREFIXE}_gabarits_duree_secondes_total', etiquette] += mesure.duree_gabarits
+            valeurs[f'{PREFIXE}_reponse_octets_total', etiquette] += taille
+
+    def incrementer(self, nom, valeur=1):
+        """Ajoute `valeur` au compteur `<PREFIXE>_<nom>` (sans étiquette)."""
+        with self._verrou:
+            self._valeurs[f'{PREFIXE}_{nom}', ''] += valeur
+
+    def observer_duree(self, nom, duree):
+        """Ajoute une durée (secondes) à l'histogramme `<PREFIXE>_<nom>` (sans étiquette)."""
+        with self._verrou:
+            self._histogramme(f'{PREFIXE}_{nom}', '', duree)
+
+    def envoyer(self, forcer=True):
+        """Ajoute les cumuls à la base partagée (au plus toutes les METRIQUES_INTERVALLE s sauf si forcer)."""
+        if not forcer and time.monotonic() - self._dernier_envoi < _parametre('METRIQUES_INTERVALLE', 5):
+            return
+        with self._verrou:
+            valeurs, self._valeurs = self._valeurs, defaultdict(float)
+            self._dernier_envoi = time.monotonic()
+        if not valeurs:
+            return
+        try:
+            with _Base() as base:
+                base.executemany(
+                    "INSERT INTO metriques (nom, etiquettes, valeur) VALUES (?, ?, ?) "
+                    "ON CONFLICT (nom, etiquettes) DO UPDATE SET valeur = valeur + excluded.valeur",
+                    [(nom, etiquettes, valeur) for (nom, etiquettes), valeur in valeurs.items()],
+                )
+        except sqlite3.Error:
+            logger.warning("Métriques non enregistrées, nouvel essai au prochain envoi", exc_info=True)
+            with self._verrou:
+                for cle, valeur in valeurs.items():
+                    self._valeurs[cle] += valeur
+
+
+registre = Registre()
+atexit.register(registre.envoyer)
+
+
+class _Base:
+    def __enter__(self):
+        self.connexion = sqlite3.connect(str(_parametre('METRIQUES_FICHIER', settings.BASE_DIR / 'metriques.sqlite3')), timeout=10)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute(
+            "CREATE TABLE IF NOT EXISTS metriques ("
+            "nom TEXT NOT NULL, etiquettes TEXT NOT NULL, valeur REAL NOT NULL, "
+            "PRIMARY KEY (nom, etiquettes))"
+        )
+        return self.connexion
+
+    def __exit__(self, type_exc, exc, trace):
+        try:
+            if type_exc is None:
+                self.connexion.commit()
+        finally:
+            self.connexion.close()
+
+
+def _famille(nom):
+    for suffixe in ('_bucket', '_sum', '_count'):
+        if nom.endswith(suffixe) and nom[:-len(suffixe)] in FAMILLES:
+            return nom[:-len(suffixe)]
+    return nom
+
+
+def _ordre(ligne):
+    nom, etiquettes, _ = ligne
+    seuil = _SEUIL.search(etiquettes)
+    if seuil:
+        return _famille(nom), _SEUIL.sub('', etiquettes), nom, float(seuil.group(1))
+    return _famille(nom), etiquettes, nom, 0.0
+
+
+def totaux(*noms):
+    """{nom: total de tous les processus} des compteurs sans étiquette `<PREFIXE>_<nom>`."""
+    registre.envoyer()
+    with _Base() as base:
+        lignes = dict(base.execute(
+            f"SELECT nom, valeur FROM metriques WHERE etiquettes = '' AND nom IN ({', '.join('?' * len(noms))})",
+            [f'{PREFIXE}_{nom}' for nom in noms],
+        ))
+    return {nom: lignes.get(f'{PREFIXE}_{nom}', 0.0) for nom in noms}
+
+
+def exposition():
+    """Totaux de tous les processus au format texte Prometheus (0.0.4)."""
+    registre.envoyer()
+    with _Base() as base:
+        lignes = sorted(base.execute("SELECT nom, etiquettes, valeur FROM metriques"), key=_ordre)
+    sortie = []
+    famille_courante = None
+    for nom, etiquettes, valeur in lignes:
+        famille = _famille(nom)
+        if famille != famille_courante:
+            famille_courante = famille
+            type_metrique, aide = FAMILLES.get(famille, ('untyped', ''))
+            sortie.append(f"# HELP {famille} {aide}")
+            sortie.append(f"# TYPE {famille} {type_metrique}")
+        sortie.append(f"{nom}{{{etiquettes}}} {valeur!r}" if etiquettes else f"{nom} {valeur!r}")
+    return '\n'.join(sortie) + '\n'
+
+
+class MetriquesMiddleware:
+    """À placer en tête de MIDDLEWARE pour mesurer toute la requête (WSGI ou ASGI)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mesure = _Mesure()
+        jeton = _mesure.set(mesure)
+        try:
+            with _espions_sql():
+                response = self.get_response(request)
+        finally:
+            _mesure.reset(jeton)
+        return self._observer(request, response, mesure)
+
+    async def __acall__(self, request):
+        mesure = _Mesure()
+        jeton = _mesure.set(mesure)
+        try:
+            # Les connexions servent dans le thread des appels sync_to_async de
+            # la requête : elles y sont créées, pas dans la boucle d'événements
+            espions = await sync_to_async(_espions_sql)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                espions.close()
+        finally:
+            _mesure.reset(jeton)
+        return self._observer(request, response, mesure)
+
+    def _observer(self, request, response, mesure):
+        match = getattr(request, 'resolver_match', None)
+        vue = (match.url_name or match.view_name) if match else 'non_resolue'
+        if response.streaming:
+            response.streaming_content = self._flux(response.streaming_content, vue, response.status_code, mesure)
+        else:
+            registre.observer(vue, response.status_code, time.perf_counter() - mesure.debut, mesure, len(response.content))
+        return response
+
+    def _flux(self, contenu, vue, statut, mesure):
+        taille = 0
+        # Pas de reset() : le flux peut être fermé depuis un autre contexte
+        _mesure.set(mesure)
+        try:
+            with _espions_sql():
+                for morceau in contenu:
+                    taille += len(morceau)
+                    yield morceau
+        finally:
+            _mesure.set(None)
+            registre.observer(vue, statut, time.perf_counter() - mesure.debut, mesure, taille)
+
+
+def _espions_sql():
+    pile = ExitStack()
+    for connexion in connections.all():
+        pile.enter_context(connexion.execute_wrapper(_espion_sql))
+    return pile
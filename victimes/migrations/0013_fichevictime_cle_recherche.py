@@ -0,0 +1,71 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def indexer_fiches_existantes(apps, schema_editor):
+    from victimes.recherche import cle_recherche, termes_victime
+
+    FicheVictime = apps.get_model("victimes", "FicheVictime")
+    TermeRechercheVictime = apps.get_model("victimes", "TermeRechercheVictime")
+    for victime in FicheVictime.objects.only("id", "matricule", "nom", "prenom").iterator():
+        victime.cle_recherche = cle_recherche(victime)
+        victime.save(update_fields=["cle_recherche"])
+        TermeRechercheVictime.objects.bulk_create(
+            [
+                TermeRechercheVictime(victime_id=victime.pk, terme=terme)
+                for terme in termes_victime(victime)
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0012_documentvictime"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fichevictime",
+            name="cle_recherche",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=255,
+                verbose_name="Clé de recherche",
+            ),
+        ),
+        migrations.CreateModel(
+            name="TermeRechercheVictime",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("terme", models.CharField(max_length=100)),
+                (
+                    "victime",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="termes",
+                        to="victimes.fichevictime",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Terme de recherche",
+                "verbose_name_plural": "Termes de recherche",
+                "indexes": [
+                    models.Index(fields=["terme", "victime"], name="terme_victime_idx")
+                ],
+            },
+        ),
+        migrations.RunPython(indexer_fiches_existantes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:31
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def marquer_familles_avec_demandes(apps, schema_editor):
+    Famille = apps.get_model("victimes", "Famille")
+    DemandeAide = apps.get_model("victimes", "DemandeAide")
+    Famille.objects.update(
+        a_des_demandes=Exists(DemandeAide.objects.filter(famille=OuterRef("pk")))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0013_fichevictime_cle_recherche"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cle", models.CharField(max_length=100, unique=True)),
+                ("valeur", models.BigIntegerField(default=0)),
+                ("date_maj", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Compteur statistique",
+                "verbose_name_plural": "Compteurs statistiques",
+            },
+        ),
+        migrations.AddField(
+            model_name="famille",
+            name="a_des_demandes",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(marquer_familles_avec_demandes, migrations.RunPython.noop),
+    ]
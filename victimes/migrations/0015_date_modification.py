@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0014_statssnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="famille",
+            name="date_modification",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="membrefamille",
+            name="date_modification",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="fichevictime",
+            name="date_modification",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0015_date_modification"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="journalaction",
+            name="date_action",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
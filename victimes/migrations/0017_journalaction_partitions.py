@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def partitionner_journal(apps, schema_editor):
+    from victimes.partitions import preparer_partitions
+
+    preparer_partitions(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0016_alter_journalaction_date_action"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="journalaction",
+            name="utilisateur",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="journalaction",
+            index=models.Index(fields=["date_action", "id"], name="journal_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="journalaction",
+            index=models.Index(
+                fields=["utilisateur", "date_action", "id"],
+                name="journal_utilisateur_date_idx",
+            ),
+        ),
+        migrations.RunPython(partitionner_journal, migrations.RunPython.noop),
+    ]
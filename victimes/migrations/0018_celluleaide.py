@@ -0,0 +1,86 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:49
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def construire_cube(apps, schema_editor):
+    DemandeAide = apps.get_model("victimes", "DemandeAide")
+    CelluleAide = apps.get_model("victimes", "CelluleAide")
+    cellules = Counter()
+    for date_creation, type_demande, statut, ville, situation in (
+        DemandeAide.objects.values_list(
+            "date_creation",
+            "type_demande",
+            "statut",
+            "famille__ville",
+            "famille__situation_economique",
+        )
+        .order_by()
+        .iterator(chunk_size=5000)
+    ):
+        mois = timezone.localtime(date_creation).date().replace(day=1)
+        cellules[(mois, type_demande, statut, ville or "", situation or "")] += 1
+    CelluleAide.objects.bulk_create(
+        [
+            CelluleAide(
+                mois=mois,
+                type_demande=type_demande,
+                statut=statut,
+                ville=ville,
+                situation_economique=situation,
+                nb_demandes=n,
+            )
+            for (mois, type_demande, statut, ville, situation), n in cellules.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0017_journalaction_partitions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CelluleAide",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mois", models.DateField()),
+                ("type_demande", models.CharField(max_length=20)),
+                ("statut", models.CharField(max_length=20)),
+                ("ville", models.CharField(max_length=100)),
+                ("situation_economique", models.CharField(max_length=20)),
+                ("nb_demandes", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Cellule du cube des aides",
+                "verbose_name_plural": "Cube des aides",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "mois",
+                            "type_demande",
+                            "statut",
+                            "ville",
+                            "situation_economique",
+                        ),
+                        name="cellule_aide_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(construire_cube, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0018_celluleaide"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="membrefamille",
+            index=models.Index(fields=["date_naissance"], name="membre_naissance_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="membrefamille",
+            index=models.Index(
+                fields=["ville", "date_naissance"], name="membre_ville_naissance_idx"
+            ),
+        ),
+    ]
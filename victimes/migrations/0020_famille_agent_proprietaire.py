@@ -0,0 +1,66 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def calculer_proprietaires(apps, schema_editor):
+    FicheVictime = apps.get_model("victimes", "FicheVictime")
+    Famille = apps.get_model("victimes", "Famille")
+    par_agent = {}
+    multiples = []
+    for ligne in (
+        FicheVictime.objects.filter(famille__isnull=False, cree_par__isnull=False)
+        .values("famille")
+        .annotate(nb=Count("cree_par", distinct=True), agent=Max("cree_par"))
+        .order_by()
+    ):
+        if ligne["nb"] == 1:
+            par_agent.setdefault(ligne["agent"], []).append(ligne["famille"])
+        else:
+            multiples.append(ligne["famille"])
+    for agent, familles in par_agent.items():
+        for i in range(0, len(familles), 1000):
+            Famille.objects.filter(pk__in=familles[i : i + 1000]).update(
+                agent_proprietaire_id=agent
+            )
+    for i in range(0, len(multiples), 1000):
+        Famille.objects.filter(pk__in=multiples[i : i + 1000]).update(
+            agents_multiples=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0019_membre_index_naissance"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="famille",
+            name="agent_proprietaire",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="famille",
+            name="agents_multiples",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="famille",
+            index=models.Index(
+                fields=["agents_multiples"], name="famille_agents_multiples_idx"
+            ),
+        ),
+        migrations.RunPython(calculer_proprietaires, migrations.RunPython.noop),
+    ]
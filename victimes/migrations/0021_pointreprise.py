@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0020_famille_agent_proprietaire"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PointReprise",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nom", models.CharField(max_length=100, unique=True)),
+                ("dernier_pk", models.BigIntegerField(blank=True, null=True)),
+                ("nb_lues", models.BigIntegerField(default=0)),
+                ("nb_modifiees", models.BigIntegerField(default=0)),
+                ("termine", models.BooleanField(default=False)),
+                ("date_debut", models.DateTimeField(auto_now_add=True)),
+                ("date_maj", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Point de reprise",
+                "verbose_name_plural": "Points de reprise",
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0021_pointreprise"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fichevictime",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="fichevictime",
+            index=models.Index(fields=["date_creation", "id"], name="victime_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fichevictime",
+            index=models.Index(
+                fields=["cree_par", "date_creation", "id"],
+                name="victime_agent_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0022_fichevictime_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TermeRecherche",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "type_objet",
+                    models.CharField(
+                        choices=[
+                            ("victime", "Fiche victime"),
+                            ("famille", "Famille"),
+                            ("membre", "Membre de famille"),
+                            ("demande", "Demande d'aide"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("objet_id", models.PositiveIntegerField()),
+                ("terme", models.CharField(max_length=100)),
+                ("poids", models.PositiveSmallIntegerField(default=1)),
+            ],
+            options={
+                "verbose_name": "Terme de recherche globale",
+                "verbose_name_plural": "Termes de recherche globale",
+                "indexes": [
+                    models.Index(
+                        fields=["terme", "type_objet", "objet_id", "poids"],
+                        name="terme_global_idx",
+                    ),
+                    models.Index(
+                        fields=["type_objet", "objet_id"], name="terme_global_objet_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("victimes", "0023_termerecherche"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fichevictime",
+            index=models.Index(
+                fields=["date_modification"], name="victime_modification_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,102 @@
+"""
+Miniatures des photos de victimes.
+
+Chaque photo est déclinée en rendus de taille fixe (JPEG progressif),
+rangés à côté des originaux :
+
+    photos_victimes/miniatures/<rendu>/<nom complet de la photo>.jpg
+
+Le nom complet (répertoires et extension compris, par exemple
+`photos_victimes/miniatures/carte/photos_victimes/a/x.png.jpg`) évite que
+deux photos de même nom de base partagent une miniature. Les rendus de
+l'ancien nommage sont régénérés par `manage.py miniatures`.
+
+Les rendus sont générés à l'enregistrement d'une nouvelle photo (signal
+post_save), à défaut à la première demande par le filtre de gabarit
+`miniature`, et pour les photos existantes par `manage.py miniatures`.
+Si la génération échoue (fichier absent ou illisible), l'original est servi.
+"""
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+# Taille maximale (largeur, hauteur) de chaque rendu, doublée pour les écrans haute densité
+RENDUS = {
+    'avatar': (128, 128),
+    'carte': (160, 160),
+    'modal': (1280, 1280),
+}
+REPERTOIRE_MINIATURES = 'photos_victimes/miniatures'
+QUALITE_JPEG = 82
+
+
+def chemin_miniature(nom_photo, rendu):
+    return f"{REPERTOIRE_MINIATURES}/{rendu}/{nom_photo}.jpg"
+
+
+def _ouvrir(nom_photo, storage):
+    from PIL import Image, ImageOps
+
+    with storage.open(nom_photo, 'rb') as fichier:
+        image = Image.open(fichier)
+        # Décodage JPEG à échelle réduite : évite de décompresser les 12 Mpx d'une photo de téléphone
+        largeur, hauteur = max(RENDUS.values())
+        image.draft('RGB', (largeur, hauteur))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+def generer_miniatures(nom_photo, rendus=None, forcer=False, storage=None):
+    """
+    Génère les rendus manquants (tous si `forcer`) d'une photo.
+    Retourne la liste des rendus écrits.
+    """
+    from PIL import Image
+
+    storage = storage or default_storage
+    rendus = rendus or list(RENDUS)
+    a_generer = [r for r in rendus if forcer or not storage.exists(chemin_miniature(nom_photo, r))]
+    if not a_generer:
+        return []
+    image = _ouvrir(nom_photo, storage)
+    # Du plus grand au plus petit : chaque rendu est réduit à partir du précédent
+    for rendu in sorted(a_generer, key=lambda r: RENDUS[r], reverse=True):
+        image.thumbnail(RENDUS[rendu], Image.LANCZOS)
+        tampon = BytesIO()
+        image.save(tampon, 'JPEG', quality=QUALITE_JPEG, optimize=True, progressive=True)
+        chemin = chemin_miniature(nom_photo, rendu)
+        if storage.exists(chemin):
+            storage.delete(chemin)
+        storage.save(chemin, ContentFile(tampon.getvalue()))
+    return a_generer
+
+
+def supprimer_miniatures(nom_photo, storage=None):
+    storage = storage or default_storage
+    for rendu in RENDUS:
+        chemin = chemin_miniature(nom_photo, rendu)
+        if storage.exists(chemin):
+            storage.delete(chemin)
+
+
+def url_miniature(photo, rendu):
+    """URL du rendu demandé pour un ImageFieldFile (générée au besoin), ou celle de l'original."""
+    if not photo:
+        return ''
+    if rendu not in RENDUS:
+        raise ValueError(f"Rendu inconnu : {rendu}")
+    chemin = chemin_miniature(photo.name, rendu)
+    if not photo.storage.exists(chemin):
+        try:
+            generer_miniatures(photo.name, [rendu], storage=photo.storage)
+        except Exception:
+            logger.warning("Miniature %s impossible pour %s", rendu, photo.name, exc_info=True)
+            return photo.url
+    return photo.storage.url(chemin)
@@ -1,5 +1,10 @@
 
+from datetime import date
+
 from django.db import models
+from django.db.models import Case, Count, Exists, OuterRef, Q, Value, When
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 # Rôles utilisateur
@@ -13,6 +18,18 @@ class User(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default="agent")
 
 
+class FamilleQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Familles visibles par l'utilisateur : les agents ne voient que celles de leurs victimes."""
+        if user.role != 'agent':
+            return self
+        # Cas courant : un seul agent, lu sur la colonne indexée agent_proprietaire
+        return self.filter(
+            Q(agent_proprietaire=user)
+            | Q(agents_multiples=True) & Exists(FicheVictime.objects.filter(famille=OuterRef('pk'), cree_par=user))
+        )
+
+
 class Famille(models.Model):
     SITUATION_ECONOMIQUE_CHOICES = [
         ('stable', 'Stable'),
@@ -29,11 +46,110 @@ class Famille(models.Model):
     informations_complementaires = models.TextField(blank=True, verbose_name="Informations complémentaires")
     nombre_personnes = models.PositiveIntegerField(default=1, verbose_name="Nombre de personnes")
     date_creation = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
+    # Indicateur dénormalisé tenu à jour par les signaux de DemandeAide (statistiques)
+    a_des_demandes = models.BooleanField(default=False, editable=False)
+    # Propriété dénormalisée tenue à jour par les signaux de FicheVictime (acces.py) :
+    # l'agent qui a créé les victimes de la famille, ou agents_multiples s'ils sont plusieurs
+    agent_proprietaire = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+'
+    )
+    agents_multiples = models.BooleanField(default=False, editable=False)
+
+    objects = FamilleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['agents_multiples'], name='famille_agents_multiples_idx'),
+        ]
 
     def __str__(self):
         return f"Famille {self.nom_famille} - {self.ville}"
 
 
+def date_il_y_a(reference, annees):
+    """Même jour `annees` ans avant `reference` (le 29 février devient le 28)."""
+    try:
+        return reference.replace(year=reference.year - annees)
+    except ValueError:
+        return reference.replace(year=reference.year - annees, day=28)
+
+
+def intervalle_naissance(age_min=None, age_max=None, reference=None):
+    """Filtres sur date_naissance équivalents à age_min <= âge <= age_max (bornes facultatives)."""
+    reference = reference or date.today()
+    filtres = {}
+    if age_min is not None:
+        filtres['date_naissance__lte'] = date_il_y_a(reference, age_min)
+    if age_max is not None:
+        filtres['date_naissance__gt'] = date_il_y_a(reference, age_max + 1)
+    if not filtres:
+        filtres['date_naissance__isnull'] = False
+    return filtres
+
+
+# Tranches d'âge par défaut des histogrammes : bornes inférieures
+TRANCHES_AGE = (0, 6, 12, 18, 25, 40, 60)
+
+
+class MembreFamilleQuerySet(models.QuerySet):
+    """
+    Filtres sur l'âge traduits en intervalles de date_naissance : la base
+    peut les servir depuis l'index au lieu de calculer l'âge ligne par ligne.
+    """
+
+    def with_age(self, reference=None):
+        """Annote `age_calcule`, l'âge en années révolues à la date de référence."""
+        reference = reference or date.today()
+        pas_encore_anniversaire = Q(date_naissance__month__gt=reference.month) | Q(
+            date_naissance__month=reference.month, date_naissance__day__gt=reference.day
+        )
+        return self.annotate(
+            age_calcule=Value(reference.year) - ExtractYear('date_naissance')
+            - Case(When(pas_encore_anniversaire, then=Value(1)), default=Value(0))
+        )
+
+    def age_between(self, age_min=None, age_max=None, reference=None):
+        """Membres dont l'âge est compris entre age_min et age_max inclus (bornes facultatives)."""
+        return self.filter(**intervalle_naissance(age_min, age_max, reference))
+
+    def visible_to(self, user):
+        """Membres des familles visibles par l'utilisateur (voir FamilleQuerySet.visible_to)."""
+        if user.role != 'agent':
+            return self
+        return self.filter(
+            Q(famille__agent_proprietaire=user)
+            | Q(famille__agents_multiples=True)
+            & Exists(FicheVictime.objects.filter(famille=OuterRef('famille'), cree_par=user))
+        )
+
+    def age_buckets(self, bornes=TRANCHES_AGE, reference=None):
+        """
+        Nombre de membres par tranche d'âge en une requête GROUP BY :
+        {'0-5': n, '6-11': n, ..., '60+': n}, plus None pour les dates inconnues.
+        """
+        reference = reference or date.today()
+        tranches = []
+        for i, debut in enumerate(bornes):
+            fin = bornes[i + 1] - 1 if i + 1 < len(bornes) else None
+            libelle = f"{debut}-{fin}" if fin is not None else f"{debut}+"
+            condition = Q(date_naissance__lte=date_il_y_a(reference, debut))
+            if fin is not None:
+                condition &= Q(date_naissance__gt=date_il_y_a(reference, fin + 1))
+            tranches.append((libelle, condition))
+        comptes = dict(
+            self.annotate(tranche=Case(*(When(condition, then=Value(libelle)) for libelle, condition in tranches)))
+            .values('tranche')
+            .annotate(n=Count('pk'))
+            .order_by()
+            .values_list('tranche', 'n')
+        )
+        resultat = {libelle: comptes.get(libelle, 0) for libelle, _ in tranches}
+        if comptes.get(None):
+            resultat[None] = comptes[None]
+        return resultat
+
+
 class MembreFamille(models.Model):
     SEXE_CHOICES = [
         ('M', 'Masculin'),
@@ -66,6 +182,23 @@ class MembreFamille(models.Model):
     # Champ de compatibilité avec l'ancien modèle
     lien_parente = models.CharField(max_length=50, blank=True, verbose_name="Lien de parenté (ancien)")
     date_creation = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
+
+    objects = MembreFamilleQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valeurs des filtres de l'admin au chargement : le cache des facettes
+        # n'est invalidé que si elles changent
+        instance._facettes_initiales = (instance.__dict__.get('ville'), instance.__dict__.get('lien_parente'))
+        return instance
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_naissance'], name='membre_naissance_idx'),
+            models.Index(fields=['ville', 'date_naissance'], name='membre_ville_naissance_idx'),
+        ]
 
     @property
     def age(self):
@@ -84,6 +217,14 @@ class MembreFamille(models.Model):
 
 
 
+class FicheVictimeQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Fiches visibles par l'utilisateur : les agents ne voient que celles qu'ils ont créées."""
+        if user.role != 'agent':
+            return self
+        return self.filter(cree_par=user)
+
+
 class FicheVictime(models.Model):
     SEXE_CHOICES = [
         ('M', 'Masculin'),
@@ -136,11 +277,106 @@ class FicheVictime(models.Model):
     famille = models.ForeignKey(Famille, related_name="victimes", on_delete=models.CASCADE, null=True, blank=True)
     cree_par = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     date_creation = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
+
+    # Clé de recherche normalisée (INCO, nom, prénom sans accents), tenue à jour par save()
+    cle_recherche = models.CharField(max_length=255, blank=True, editable=False, verbose_name="Clé de recherche")
+    # Incrémentée à chaque modification de la fiche ou de sa famille : clé des cartes en cache (cartes.py)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    CHAMPS_RECHERCHE = ('matricule', 'nom', 'prenom')
+
+    objects = FicheVictimeQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mémoriser la clé chargée pour ne réindexer que si elle change
+        instance._cle_recherche_initiale = instance.__dict__.get('cle_recherche')
+        # Et la photo chargée, pour ne régénérer les miniatures qu'au changement
+        instance._photo_initiale = instance.__dict__.get('photo')
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .recherche import cle_recherche, indexer_victimes
+        update_fields = kwargs.get('update_fields')
+        incrementee = not self._state.adding
+        if incrementee:
+            # Incrément fait par la base : deux modifications simultanées
+            # d'une même version donnent deux versions distinctes
+            self.version = models.F('version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'version'}
+        if update_fields is not None and not set(update_fields) & set(self.CHAMPS_RECHERCHE):
+            super().save(*args, **kwargs)
+        else:
+            self.cle_recherche = cle_recherche(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'cle_recherche'}
+            super().save(*args, **kwargs)
+            if self.cle_recherche != getattr(self, '_cle_recherche_initiale', None):
+                indexer_victimes([self], maj_cle=False)
+                self._cle_recherche_initiale = self.cle_recherche
+        if incrementee:
+            self.refresh_from_db(fields=['version'])
+
+    class Meta:
+        indexes = [
+            # Pagination par curseur de la liste des victimes (listing.py)
+            models.Index(fields=['date_creation', 'id'], name='victime_date_idx'),
+            models.Index(fields=['cree_par', 'date_creation', 'id'], name='victime_agent_date_idx'),
+            # Synchronisation de l'index des INCO entre processus (inco.py)
+            models.Index(fields=['date_modification'], name='victime_modification_idx'),
+        ]
 
     def __str__(self):
         return f"{self.prenom} {self.nom}"
 
 
+class TermeRechercheVictime(models.Model):
+    """Terme normalisé d'une fiche victime (index de recherche par préfixe)."""
+    victime = models.ForeignKey(FicheVictime, related_name="termes", on_delete=models.CASCADE)
+    terme = models.CharField(max_length=100)
+
+    class Meta:
+        verbose_name = "Terme de recherche"
+        verbose_name_plural = "Termes de recherche"
+        indexes = [
+            models.Index(fields=['terme', 'victime'], name='terme_victime_idx'),
+        ]
+
+    def __str__(self):
+        return self.terme
+
+
+class TermeRecherche(models.Model):
+    """Terme normalisé d'une fiche, famille, membre ou demande (recherche globale, voir recherche_globale.py)."""
+    TYPE_CHOICES = [
+        ('victime', 'Fiche victime'),
+        ('famille', 'Famille'),
+        ('membre', 'Membre de famille'),
+        ('demande', "Demande d'aide"),
+    ]
+
+    type_objet = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    objet_id = models.PositiveIntegerField()
+    terme = models.CharField(max_length=100)
+    # Importance du champ d'origine (classement des résultats)
+    poids = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Terme de recherche globale"
+        verbose_name_plural = "Termes de recherche globale"
+        indexes = [
+            # Recherche par préfixe servie par l'index seul
+            models.Index(fields=['terme', 'type_objet', 'objet_id', 'poids'], name='terme_global_idx'),
+            models.Index(fields=['type_objet', 'objet_id'], name='terme_global_objet_idx'),
+        ]
+
+    def __str__(self):
+        return self.terme
+
+
 class DocumentVictime(models.Model):
     TYPE_CHOICES = [
         ('acte_deces', 'Acte de décès'),
@@ -192,10 +428,78 @@ class DemandeAide(models.Model):
 
 
 class JournalAction(models.Model):
-    utilisateur = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # Pas de contrainte FK en base : MySQL ne les accepte pas sur une table
+    # partitionnée (voir partitions.py) ; SET_NULL reste appliqué par Django
+    utilisateur = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, db_constraint=False)
     action = models.CharField(max_length=255)
-    date_action = models.DateTimeField(auto_now_add=True)
+    # Horodatage fixé à l'enregistrement de l'action (et non à son écriture différée en base)
+    date_action = models.DateTimeField(default=timezone.now)
     details = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_action', 'id'], name='journal_date_idx'),
+            models.Index(fields=['utilisateur', 'date_action', 'id'], name='journal_utilisateur_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.utilisateur} - {self.action} - {self.date_action}"
+
+
+class StatsSnapshot(models.Model):
+    """Compteurs du tableau de bord, mis à jour incrémentalement par les signaux."""
+    cle = models.CharField(max_length=100, unique=True)
+    valeur = models.BigIntegerField(default=0)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Compteur statistique"
+        verbose_name_plural = "Compteurs statistiques"
+
+    def __str__(self):
+        return f"{self.cle} = {self.valeur}"
+
+
+class CelluleAide(models.Model):
+    """
+    Cellule du cube des demandes d'aide : nombre de demandes par mois de
+    création, type, statut, ville et situation économique de la famille.
+    Tenue à jour par les signaux (voir cube.py).
+    """
+    mois = models.DateField()
+    type_demande = models.CharField(max_length=20)
+    statut = models.CharField(max_length=20)
+    ville = models.CharField(max_length=100)
+    situation_economique = models.CharField(max_length=20)
+    nb_demandes = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Cellule du cube des aides"
+        verbose_name_plural = "Cube des aides"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['mois', 'type_demande', 'statut', 'ville', 'situation_economique'],
+                name='cellule_aide_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.mois:%Y-%m} {self.type_demande} {self.statut} {self.ville} {self.situation_economique} = {self.nb_demandes}"
+
+
+class PointReprise(models.Model):
+    """Avancement d'un rattrapage de données par lots (voir rattrapages.py)."""
+    nom = models.CharField(max_length=100, unique=True)
+    dernier_pk = models.BigIntegerField(null=True, blank=True)
+    nb_lues = models.BigIntegerField(default=0)
+    nb_modifiees = models.BigIntegerField(default=0)
+    termine = models.BooleanField(default=False)
+    date_debut = models.DateTimeField(auto_now_add=True)
+    date_maj = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Point de reprise"
+        verbose_name_plural = "Points de reprise"
+
+    def __str__(self):
+        return f"{self.nom} : {self.nb_lues} lue(s), dernier id {self.dernier_pk}"
@@ -0,0 +1,121 @@
+"""
+Partitionnement mensuel du journal des actions.
+
+Sous MySQL, la table `victimes_journalaction` est partitionnée par plage
+(RANGE sur TO_DAYS(date_action)), une partition par mois plus une partition
+`p_futur` ; les filtres par plage de dates n'ouvrent alors que les
+partitions concernées et la purge d'un mois est un DROP PARTITION.
+
+Sur les autres moteurs (SQLite en développement), le partitionnement est
+émulé : l'index sur (date_action, id) sert les mêmes plages et la purge
+supprime les lignes par lots.
+"""
+from datetime import date, datetime
+
+from django.db import connection as connexion_defaut
+from django.utils import timezone
+
+TABLE_JOURNAL = 'victimes_journalaction'
+
+
+def _mois_suivant(jour):
+    return date(jour.year + jour.month // 12, jour.month % 12 + 1, 1)
+
+
+def _nom_partition(jour):
+    return f"p{jour:%Y%m}"
+
+
+def _definition(jour):
+    return f"PARTITION {_nom_partition(jour)} VALUES LESS THAN (TO_DAYS('{_mois_suivant(jour):%Y-%m-%d}'))"
+
+
+def partitions_existantes(connexion):
+    """Noms des partitions de la table (liste vide si elle n'est pas partitionnée)."""
+    with connexion.cursor() as curseur:
+        curseur.execute(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            [TABLE_JOURNAL],
+        )
+        return [ligne[0] for ligne in curseur.fetchall()]
+
+
+def preparer_partitions(connexion=None, mois_a_venir=3, aujourd_hui=None):
+    """
+    Partitionne la table (première exécution) puis crée les partitions des
+    `mois_a_venir` prochains mois. Retourne la liste des partitions créées.
+    Sans effet hors MySQL.
+    """
+    connexion = connexion or connexion_defaut
+    if connexion.vendor != 'mysql':
+        return []
+    aujourd_hui = aujourd_hui or date.today()
+    fin = date(aujourd_hui.year, aujourd_hui.month, 1)
+    for _ in range(mois_a_venir):
+        fin = _mois_suivant(fin)
+
+    existantes = partitions_existantes(connexion)
+    with connexion.cursor() as curseur:
+        if not existantes:
+            curseur.execute(f"SELECT MIN(date_action) FROM {TABLE_JOURNAL}")
+            plus_ancienne = curseur.fetchone()[0]
+            debut = date(plus_ancienne.year, plus_ancienne.month, 1) if plus_ancienne else date(aujourd_hui.year, aujourd_hui.month, 1)
+            mois = []
+            while debut <= fin:
+                mois.append(debut)
+                debut = _mois_suivant(debut)
+            # La clé de partitionnement doit faire partie de la clé primaire
+            curseur.execute(f"ALTER TABLE {TABLE_JOURNAL} DROP PRIMARY KEY, ADD PRIMARY KEY (id, date_action)")
+            curseur.execute(
+                f"ALTER TABLE {TABLE_JOURNAL} PARTITION BY RANGE (TO_DAYS(date_action)) ("
+                + ", ".join(_definition(m) for m in mois)
+                + ", PARTITION p_futur VALUES LESS THAN MAXVALUE)"
+            )
+            return [_nom_partition(m) for m in mois]
+
+        derniere = max(nom for nom in existantes if nom != 'p_futur')
+        debut = _mois_suivant(date(int(derniere[1:5]), int(derniere[5:7]), 1))
+        mois = []
+        while debut <= fin:
+            mois.append(debut)
+            debut = _mois_suivant(debut)
+        if mois:
+            curseur.execute(
+                f"ALTER TABLE {TABLE_JOURNAL} REORGANIZE PARTITION p_futur INTO ("
+                + ", ".join(_definition(m) for m in mois)
+                + ", PARTITION p_futur VALUES LESS THAN MAXVALUE)"
+            )
+        return [_nom_partition(m) for m in mois]
+
+
+def purger_avant(limite, connexion=None, taille_lot=10000):
+    """
+    Supprime les actions antérieures au mois de `limite` (date).
+    Sous MySQL : DROP PARTITION des mois concernés ; ailleurs : suppression par lots.
+    Retourne une description de ce qui a été supprimé.
+    """
+    from .models import JournalAction
+
+    connexion = connexion or connexion_defaut
+    limite = date(limite.year, limite.month, 1)
+    if connexion.vendor == 'mysql':
+        anciennes = [
+            nom for nom in partitions_existantes(connexion)
+            if nom != 'p_futur' and nom < _nom_partition(limite)
+        ]
+        if anciennes:
+            with connexion.cursor() as curseur:
+                curseur.execute(f"ALTER TABLE {TABLE_JOURNAL} DROP PARTITION {', '.join(anciennes)}")
+        return f"{len(anciennes)} partition(s) supprimée(s)"
+
+    borne = timezone.make_aware(datetime(limite.year, limite.month, 1))
+    total = 0
+    while True:
+        ids = list(JournalAction.objects.filter(date_action__lt=borne).order_by('date_action', 'pk')
+                   .values_list('pk', flat=True)[:taille_lot])
+        if not ids:
+            break
+        total += JournalAction.objects.filter(pk__in=ids).delete()[0]
+    return f"{total} action(s) supprimée(s)"
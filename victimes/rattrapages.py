@@ -0,0 +1,158 @@
+"""
+Rattrapages de données par lots, reprenables et bridés.
+
+Un rattrapage parcourt une table par lots successifs sur la clé primaire,
+transforme chaque ligne en Python et n'écrit que les champs déclarés,
+avec un bulk_update par lot. Après chaque lot, dans la même transaction,
+le dernier id traité est enregistré dans `PointReprise` : un rattrapage
+interrompu reprend au lot suivant. Le débit est limité à un nombre de
+lignes par seconde pour ne pas priver le trafic de production.
+
+Pour en ajouter un : sous-classer `Rattrapage` (modèle, champs lus et
+écrits, `transformer`) et le décorer par `@enregistrer`. Il est alors
+disponible par `manage.py rattrapage <nom>`.
+
+bulk_update ne déclenche pas les signaux : `apres()` invalide ou
+reconstruit ce qui en dépend.
+"""
+import time
+from datetime import date
+
+from django.db import transaction
+
+from . import facettes
+from .models import MembreFamille, PointReprise
+
+TAILLE_LOT = 1000
+DEBIT = 1000
+
+RATTRAPAGES = {}
+
+
+def enregistrer(classe):
+    RATTRAPAGES[classe.nom] = classe
+    return classe
+
+
+class Rattrapage:
+    nom = None
+    modele = None
+    # Champs lus (en plus de la clé primaire) et champs écrits
+    lecture = ()
+    champs = ()
+    # Nombre maximal de lignes parcourues (None : toute la table)
+    limite = None
+
+    def queryset(self):
+        return self.modele.objects.all()
+
+    def transformer(self, objet, rang):
+        """Modifie `objet` (rang : position dans le parcours) ; retourne True s'il faut l'écrire."""
+        raise NotImplementedError
+
+    def apres(self):
+        pass
+
+
+def _lot(rattrapage, point, taille_lot):
+    queryset = rattrapage.queryset().order_by('pk').only(*rattrapage.lecture)
+    if point.dernier_pk is not None:
+        queryset = queryset.filter(pk__gt=point.dernier_pk)
+    if rattrapage.limite is not None:
+        taille_lot = min(taille_lot, rattrapage.limite - point.nb_lues)
+    return list(queryset[:taille_lot]) if taille_lot > 0 else []
+
+
+def executer(rattrapage, taille_lot=TAILLE_LOT, debit=DEBIT, recommencer=False, progression=None):
+    """Exécute (ou reprend) le rattrapage ; retourne son PointReprise final."""
+    point, _ = PointReprise.objects.get_or_create(nom=rattrapage.nom)
+    if recommencer:
+        PointReprise.objects.filter(pk=point.pk).update(dernier_pk=None, nb_lues=0, nb_modifiees=0, termine=False)
+    while True:
+        debut = time.monotonic()
+        with transaction.atomic():
+            # Verrou : deux exécutions simultanées se partagent les lots au lieu de les doubler
+            point = PointReprise.objects.select_for_update().get(pk=point.pk)
+            if point.termine:
+                break
+            lot = _lot(rattrapage, point, taille_lot)
+            modifies = [
+                objet for rang, objet in enumerate(lot, point.nb_lues)
+                if rattrapage.transformer(objet, rang)
+            ]
+            if modifies:
+                rattrapage.modele.objects.bulk_update(modifies, rattrapage.champs, batch_size=taille_lot)
+            if lot:
+                point.dernier_pk = lot[-1].pk
+                point.nb_lues += len(lot)
+                point.nb_modifiees += len(modifies)
+            point.termine = len(lot) < taille_lot or point.nb_lues == rattrapage.limite
+            point.save()
+        if progression:
+            progression(point)
+        if point.termine:
+            break
+        if debit:
+            time.sleep(max(0.0, len(lot) / debit - (time.monotonic() - debut)))
+    rattrapage.apres()
+    return point
+
+
+def simuler(rattrapage, taille_lot=TAILLE_LOT):
+    """Parcourt tout le rattrapage sans rien écrire : (lignes lues, lignes qui seraient modifiées)."""
+    point = PointReprise(nom=rattrapage.nom)
+    while True:
+        lot = _lot(rattrapage, point, taille_lot)
+        point.nb_modifiees += sum(
+            1 for rang, objet in enumerate(lot, point.nb_lues) if rattrapage.transformer(objet, rang)
+        )
+        point.nb_lues += len(lot)
+        if len(lot) < taille_lot or point.nb_lues == rattrapage.limite:
+            return point.nb_lues, point.nb_modifiees
+        point.dernier_pk = lot[-1].pk
+
+
+# Anciens scripts add_villes.py et update_ages.py
+@enregistrer
+class VillesMembres(Rattrapage):
+    """Répartit les membres entre quelques villes et liens de parenté (données de démonstration)."""
+    nom = 'villes_membres'
+    modele = MembreFamille
+    lecture = ('ville', 'lien_parente')
+    champs = ('ville', 'lien_parente')
+    villes = ['Ouagadougou', 'Bobo-Dioulasso', 'Koudougou', 'Ouahigouya', 'Banfora', 'Dédougou', 'Kaya', 'Ouagadougou']
+    liens = ['Père', 'Mère', 'Fils', 'Fille', 'Frère', 'Sœur', 'Oncle', 'Tante']
+
+    def transformer(self, membre, rang):
+        valeurs = (self.villes[rang % len(self.villes)], self.liens[rang % len(self.liens)])
+        if (membre.ville, membre.lien_parente) == valeurs:
+            return False
+        membre.ville, membre.lien_parente = valeurs
+        return True
+
+    def apres(self):
+        facettes.invalider()
+
+
+@enregistrer
+class AgesMembres(Rattrapage):
+    """Donne des âges variés aux premiers membres dont la date de naissance est connue (démonstration)."""
+    nom = 'ages_membres'
+    modele = MembreFamille
+    lecture = ('date_naissance',)
+    champs = ('date_naissance',)
+    dates_naissance = [
+        date.fromisoformat(jour)
+        for jour in ('2016-03-15', '2010-05-20', '2005-08-10', '1995-11-25',
+                     '1990-02-14', '1985-07-30', '1975-04-18', '1965-09-22')
+    ]
+    limite = len(dates_naissance)
+
+    def queryset(self):
+        return MembreFamille.objects.filter(date_naissance__isnull=False)
+
+    def transformer(self, membre, rang):
+        if membre.date_naissance == self.dates_naissance[rang]:
+            return False
+        membre.date_naissance = self.dates_naissance[rang]
+        return True
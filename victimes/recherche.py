@@ -0,0 +1,108 @@
+"""
+Recherche indexée des fiches victimes.
+
+Les champs recherchables (INCO, nom, prénom) sont normalisés (sans accents,
+en minuscules) et découpés en termes stockés dans `TermeRechercheVictime`.
+Une recherche devient alors une suite de recherches par préfixe servies par
+l'index sur `terme`, au lieu d'un LIKE '%...%' qui parcourt toute la table.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Q
+
+LONGUEUR_MAX_TERME = 100
+_MOTIF_TERME = re.compile(r'[a-z0-9]+')
+
+
+def bornes_prefixe(terme):
+    """
+    Intervalle [terme, terme + "zzz..."] couvrant exactement les termes qui
+    commencent par `terme`. Les termes ne contenant que [a-z0-9], cet
+    intervalle est servi par l'index sur tous les moteurs (y compris SQLite,
+    qui n'utilise pas d'index pour LIKE 'x%').
+    """
+    return terme, terme.ljust(LONGUEUR_MAX_TERME, 'z')
+
+
+def normaliser(texte):
+    """Supprime les accents et met en minuscules ("Dédougou" -> "dedougou")."""
+    if not texte:
+        return ''
+    decompose = unicodedata.normalize('NFKD', str(texte))
+    return ''.join(c for c in decompose if not unicodedata.combining(c)).lower()
+
+
+def decouper(texte):
+    """Termes normalisés d'un texte, dans l'ordre d'apparition et sans doublons."""
+    termes = []
+    for terme in _MOTIF_TERME.findall(normaliser(texte)):
+        terme = terme[:LONGUEUR_MAX_TERME]
+        if terme not in termes:
+            termes.append(terme)
+    return termes
+
+
+def termes_victime(victime):
+    """Termes indexés pour une fiche victime."""
+    termes = decouper(f"{victime.matricule} {victime.nom} {victime.prenom}")
+    # L'INCO est aussi indexé d'un seul bloc ("GN-0042" -> "gn0042")
+    matricule_compact = ''.join(decouper(victime.matricule))[:LONGUEUR_MAX_TERME]
+    if matricule_compact and matricule_compact not in termes:
+        termes.append(matricule_compact)
+    return termes
+
+
+def cle_recherche(victime):
+    """Clé de recherche persistée sur la fiche (termes séparés par des espaces)."""
+    return ' '.join(termes_victime(victime))[:255]
+
+
+def indexer_victimes(victimes, maj_cle=True):
+    """
+    Reconstruit les termes d'un lot de fiches (après un bulk_create/bulk_update
+    qui contourne save()). Met aussi à jour `cle_recherche` si `maj_cle`.
+    """
+    from .models import FicheVictime, TermeRechercheVictime
+
+    victimes = list(victimes)
+    if not victimes:
+        return
+    with transaction.atomic():
+        if maj_cle:
+            for victime in victimes:
+                victime.cle_recherche = cle_recherche(victime)
+            FicheVictime.objects.bulk_update(victimes, ['cle_recherche'], batch_size=500)
+        TermeRechercheVictime.objects.filter(victime__in=[v.pk for v in victimes]).delete()
+        TermeRechercheVictime.objects.bulk_create(
+            [
+                TermeRechercheVictime(victime_id=victime.pk, terme=terme)
+                for victime in victimes
+                for terme in victime.cle_recherche.split()
+            ],
+            batch_size=1000,
+        )
+
+
+def rechercher_victimes(victimes, texte):
+    """
+    Filtre un queryset de fiches : chaque terme saisi doit être le début
+    d'un terme indexé de la fiche ("ded oue" trouve "Dédougou Ouédraogo").
+    """
+    from .models import TermeRechercheVictime
+
+    termes = decouper(texte)
+    if not termes:
+        return victimes.none()
+    # Le terme le plus long (le plus sélectif) passe par l'index ; à longueur
+    # égale on prend le dernier saisi, souvent le numéro de l'INCO.
+    pilote = max(reversed(termes), key=len)
+    victimes = victimes.filter(
+        pk__in=TermeRechercheVictime.objects.filter(terme__range=bornes_prefixe(pilote)).values('victime_id')
+    )
+    # Les autres termes sont vérifiés sur la clé persistée des seules lignes retenues
+    for terme in termes:
+        if terme != pilote:
+            victimes = victimes.filter(Q(cle_recherche__startswith=terme) | Q(cle_recherche__contains=f' {terme}'))
+    return victimes
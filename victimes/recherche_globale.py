@@ -0,0 +1,306 @@
+"""
+Recherche globale dans les fiches victimes, familles, membres et demandes d'aide.
+
+Les champs recherchables de chaque objet sont normalisés et découpés comme
+pour la recherche des victimes (recherche.py) et stockés dans un index
+inversé unique, `TermeRecherche` : une ligne par (objet, terme), avec le
+poids du champ d'origine. Les numéros (INCO, téléphones) sont aussi indexés
+d'un seul bloc ("70 12 34 56" -> "70123456").
+
+L'index est tenu à jour à chaque enregistrement ou suppression (signals.py) :
+seules les lignes qui changent sont écrites. Les écritures en masse qui
+contournent les signaux appellent `indexer()` sur leurs objets, ou
+`manage.py index_global` reconstruit tout.
+
+Une recherche retient les objets dont chaque terme saisi est le début d'un
+terme indexé : les lignes d'index de tous les termes saisis sont regroupées
+par objet en une requête (GROUP BY, un score par terme saisi, HAVING sur
+chacun). Quand l'un des termes saisis est rare (au plus SEUIL_PILOTE
+lignes), seuls ses objets sont regroupés ; sinon toutes les lignes des
+termes saisis le sont, ce qui rend le nombre de résultats exact mais coûte
+de l'ordre de 2 µs par ligne sous SQLite (environ 200 ms pour un nom porté
+par 40 000 objets). Les types et le périmètre d'un agent (visible_to) sont
+appliqués ensuite, par lots de clés primaires, pour que le parcours reste
+piloté par l'index sur `terme`. Une requête par type lit enfin les
+résultats affichés.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import add, or_
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Value, When
+from django.urls import reverse
+
+from .models import DemandeAide, Famille, FicheVictime, MembreFamille, TermeRecherche
+from .recherche import LONGUEUR_MAX_TERME, bornes_prefixe, decouper
+
+# Type -> (modèle, {champ: poids})
+TYPES = {
+    'victime': (FicheVictime, {'matricule': 5, 'nom': 3, 'prenom': 2, 'grade': 1, 'lieu_deces': 1}),
+    'famille': (Famille, {'nom_famille': 3, 'telephone': 4, 'adresse': 1}),
+    'membre': (MembreFamille, {'nom': 3, 'prenom': 2, 'telephone': 4}),
+    'demande': (DemandeAide, {'description': 1}),
+}
+# Champs aussi indexés d'un seul bloc
+COMPACTS = {'matricule', 'telephone'}
+# Rôles qui voient chaque type (comme les listes correspondantes)
+PORTEES = {
+    'victime': ('agent', 'assistant', 'responsable', 'admin'),
+    'famille': ('agent', 'assistant', 'responsable', 'admin'),
+    'membre': ('agent', 'assistant', 'responsable', 'admin'),
+    'demande': ('assistant', 'responsable', 'admin'),
+}
+LIBELLES = dict(TermeRecherche.TYPE_CHOICES)
+# Termes indexés au plus par objet (les descriptions longues sont tronquées)
+MAX_TERMES = 50
+LIMITE = 5
+# Lignes d'index au-delà desquelles un terme saisi n'est plus assez rare pour désigner les candidats
+SEUIL_PILOTE = 500
+TAILLE_LOT = 2000
+
+
+def termes(type_objet, objet):
+    """{terme: poids} d'un objet ; un terme présent dans plusieurs champs garde le poids le plus fort."""
+    poids = {}
+    for champ, poids_champ in TYPES[type_objet][1].items():
+        termes_champ = decouper(getattr(objet, champ))
+        if champ in COMPACTS and len(termes_champ) > 1:
+            termes_champ.append(''.join(termes_champ)[:LONGUEUR_MAX_TERME])
+        for terme in termes_champ:
+            if len(poids) >= MAX_TERMES and terme not in poids:
+                break
+            poids[terme] = max(poids.get(terme, 0), poids_champ)
+    return poids
+
+
+def _differences(type_objet, objets):
+    """Lignes d'index à supprimer (pk), à créer et à modifier pour que l'index corresponde aux objets."""
+    attendus = {(objet.pk, terme): poids for objet in objets for terme, poids in termes(type_objet, objet).items()}
+    existants = {
+        (objet_id, terme): (pk, poids)
+        for pk, objet_id, terme, poids in TermeRecherche.objects.filter(
+            type_objet=type_objet, objet_id__in=[objet.pk for objet in objets],
+        ).values_list('pk', 'objet_id', 'terme', 'poids')
+    }
+    a_supprimer = [pk for cle, (pk, _) in existants.items() if cle not in attendus]
+    a_creer, a_modifier = [], []
+    for (objet_id, terme), poids in attendus.items():
+        if (objet_id, terme) not in existants:
+            a_creer.append(TermeRecherche(type_objet=type_objet, objet_id=objet_id, terme=terme, poids=poids))
+        elif existants[objet_id, terme][1] != poids:
+            a_modifier.append(TermeRecherche(pk=existants[objet_id, terme][0], poids=poids))
+    return a_supprimer, a_creer, a_modifier
+
+
+def indexer(type_objet, objets):
+    """Met à jour l'index d'un lot d'objets d'un même type (seules les lignes changées sont écrites)."""
+    objets = list(objets)
+    if not objets:
+        return
+    a_supprimer, a_creer, a_modifier = _differences(type_objet, objets)
+    with transaction.atomic():
+        if a_supprimer:
+            TermeRecherche.objects.filter(pk__in=a_supprimer).delete()
+        TermeRecherche.objects.bulk_create(a_creer, batch_size=1000)
+        TermeRecherche.objects.bulk_update(a_modifier, ['poids'], batch_size=1000)
+
+
+def desindexer(type_objet, pks):
+    TermeRecherche.objects.filter(type_objet=type_objet, objet_id__in=list(pks)).delete()
+
+
+def _parcourir(type_objet, taille_lot):
+    """Objets d'un type par lots, sur la clé primaire, avec les seuls champs indexés."""
+    modele, champs = TYPES[type_objet]
+    queryset = modele.objects.order_by('pk').only(*champs)
+    dernier = 0
+    while True:
+        lot = list(queryset.filter(pk__gt=dernier)[:taille_lot])
+        if not lot:
+            return
+        yield lot
+        dernier = lot[-1].pk
+
+
+def reconstruire(taille_lot=TAILLE_LOT):
+    """Reconstruit tout l'index ; retourne le nombre de lignes par type."""
+    volumes = {}
+    for type_objet in TYPES:
+        with transaction.atomic():
+            TermeRecherche.objects.filter(type_objet=type_objet).delete()
+            volumes[type_objet] = 0
+            for lot in _parcourir(type_objet, taille_lot):
+                lignes = [
+                    TermeRecherche(type_objet=type_objet, objet_id=objet.pk, terme=terme, poids=poids)
+                    for objet in lot
+                    for terme, poids in termes(type_objet, objet).items()
+                ]
+                TermeRecherche.objects.bulk_create(lignes, batch_size=1000)
+                volumes[type_objet] += len(lignes)
+    return volumes
+
+
+def ecarts(taille_lot=TAILLE_LOT):
+    """Lignes d'index à corriger par type (manquantes ou périmées, objets disparus), sans rien modifier."""
+    resultat = {}
+    for type_objet, (modele, _) in TYPES.items():
+        nb = sum(
+            sum(len(lignes) for lignes in _differences(type_objet, lot))
+            for lot in _parcourir(type_objet, taille_lot)
+        )
+        nb += TermeRecherche.objects.filter(type_objet=type_objet).exclude(
+            objet_id__in=modele.objects.values('pk')
+        ).count()
+        if nb:
+            resultat[type_objet] = nb
+    return resultat
+
+
+def _victime(v):
+    return {
+        'libelle': f"{v['prenom']} {v['nom']}",
+        'detail': ' · '.join(filter(None, (v['matricule'], v['grade']))),
+        'url': reverse('victime_details_ajax', args=[v['pk']]),
+    }
+
+
+def _famille(f):
+    return {
+        'libelle': f['nom_famille'],
+        'detail': ' · '.join(filter(None, (f['telephone'], f['ville']))),
+        'url': reverse('famille_detail_modal', args=[f['pk']]),
+    }
+
+
+def _membre(m):
+    relation = dict(MembreFamille.RELATION_CHOICES).get(m['relation_victime'], m['relation_victime'])
+    return {
+        'libelle': f"{m['prenom']} {m['nom']}",
+        'detail': ' · '.join(filter(None, (relation, m['famille__nom_famille'], m['telephone']))),
+        'url': reverse('famille_detail_modal', args=[m['famille_id']]),
+    }
+
+
+def _demande(d):
+    type_demande = dict(DemandeAide.TYPE_CHOICES).get(d['type_demande'], d['type_demande'])
+    statut = dict(DemandeAide.STATUT_CHOICES).get(d['statut'], d['statut'])
+    return {
+        'libelle': f"{type_demande} - {d['famille__nom_famille']}",
+        'detail': f"{statut} · {d['description'][:80]}",
+        'url': reverse('famille_detail_modal', args=[d['famille_id']]),
+    }
+
+
+# Type -> (champs lus pour l'affichage, mise en forme d'un résultat)
+PRESENTATIONS = {
+    'victime': (('pk', 'prenom', 'nom', 'matricule', 'grade'), _victime),
+    'famille': (('pk', 'nom_famille', 'telephone', 'ville'), _famille),
+    'membre': (('pk', 'prenom', 'nom', 'telephone', 'relation_victime', 'famille_id', 'famille__nom_famille'), _membre),
+    'demande': (('pk', 'type_demande', 'statut', 'description', 'famille_id', 'famille__nom_famille'), _demande),
+}
+
+
+def _visibles(user, type_objet, ids):
+    """Parmi `ids`, ceux que l'utilisateur peut voir (périmètre d'un agent lu par lots de clés primaires)."""
+    if user.role != 'agent':
+        return set(ids)
+    ids = list(ids)
+    queryset = TYPES[type_objet][0].objects.visible_to(user)
+    return {
+        pk
+        for debut in range(0, len(ids), TAILLE_LOT)
+        for pk in queryset.filter(pk__in=ids[debut:debut + TAILLE_LOT]).values_list('pk', flat=True)
+    }
+
+
+def _correspondances(saisis):
+    """
+    (type, id, score) des objets dont chaque terme saisi est le début d'un
+    terme indexé : les lignes de tous les termes saisis sont regroupées par
+    objet, et un objet est retenu s'il a des points pour chacun d'eux.
+    """
+    # Ni les types ni le périmètre d'un agent ne sont filtrés ici : le parcours doit rester piloté
+    # par l'index sur `terme` (SQLite choisirait sinon celui sur type_objet, ou les objets du périmètre)
+    filtres = [reduce(or_, (Q(terme__range=bornes_prefixe(saisi)) for saisi in saisis))]
+    if len(saisis) > 1:
+        # Nombre de lignes de chaque terme (borné) : un terme rare désigne seul les candidats
+        comptes = {
+            saisi: TermeRecherche.objects.filter(terme__range=bornes_prefixe(saisi))[:SEUIL_PILOTE + 1].count()
+            for saisi in saisis
+        }
+        rare = min(saisis, key=comptes.get)
+        if not comptes[rare]:
+            return []
+        if comptes[rare] <= SEUIL_PILOTE:
+            par_type = defaultdict(set)
+            for type_objet, objet_id in TermeRecherche.objects.filter(
+                terme__range=bornes_prefixe(rare)
+            ).values_list('type_objet', 'objet_id'):
+                par_type[type_objet].add(objet_id)
+            filtres.append(reduce(or_, (
+                Q(type_objet=type_objet, objet_id__in=ids) for type_objet, ids in par_type.items()
+            )))
+    points = {
+        f'p{i}': Max(Case(
+            # Un terme identique à la saisie compte double face à un simple préfixe
+            When(terme=saisi, then=F('poids') * 2),
+            When(terme__range=bornes_prefixe(saisi), then=F('poids')),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        for i, saisi in enumerate(saisis)
+    }
+    return (
+        TermeRecherche.objects
+        .filter(*filtres)
+        .values('type_objet', 'objet_id')
+        .annotate(**points)
+        .filter(**{f'{nom}__gt': 0 for nom in points})
+        .annotate(score=reduce(add, (F(nom) for nom in points)))
+        .values_list('type_objet', 'objet_id', 'score')
+        .order_by()
+    )
+
+
+def rechercher(user, texte, limite=LIMITE):
+    """
+    Résultats groupés par type, du groupe le plus pertinent au moins pertinent :
+    [{'type', 'libelle', 'total', 'resultats': [{'id', 'libelle', 'detail', 'url', 'score'}, ...]}, ...].
+    Chaque terme saisi doit être le début d'un terme indexé de l'objet.
+    """
+    saisis = decouper(texte)
+    types = [type_objet for type_objet, roles in PORTEES.items() if user.role in roles]
+    if not saisis or not types:
+        return []
+    classes = defaultdict(list)
+    for type_objet, objet_id, score in _correspondances(saisis):
+        if type_objet in types:
+            classes[type_objet].append((score, objet_id))
+    groupes = []
+    for type_objet, trouves in classes.items():
+        visibles = _visibles(user, type_objet, [objet_id for _, objet_id in trouves])
+        trouves = [(score, objet_id) for score, objet_id in trouves if objet_id in visibles]
+        # Plus haut score d'abord, puis les plus récents
+        trouves.sort(reverse=True)
+        champs, presenter = PRESENTATIONS[type_objet]
+        meilleurs = trouves[:limite]
+        affiches = {
+            ligne['pk']: ligne
+            for ligne in TYPES[type_objet][0].objects.filter(pk__in=[objet_id for _, objet_id in meilleurs]).values(*champs)
+        }
+        resultats = [
+            {'id': objet_id, 'score': score, **presenter(affiches[objet_id])}
+            for score, objet_id in meilleurs if objet_id in affiches
+        ]
+        if resultats:
+            groupes.append({
+                'type': type_objet,
+                'libelle': LIBELLES[type_objet],
+                'total': len(trouves),
+                'resultats': resultats,
+            })
+    # À score égal, l'ordre de TYPES (fiches, familles, membres, demandes)
+    ordre = list(TYPES)
+    groupes.sort(key=lambda groupe: (-groupe['resultats'][0]['score'], ordre.index(groupe['type'])))
+    return groupes
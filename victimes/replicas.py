@@ -0,0 +1,177 @@
+"""
+Lectures des rapports et tableaux de bord sur des réplicas.
+
+Les alias listés dans DATABASES_REPLICAS (settings) sont des copies en
+lecture seule de `default`. Le routeur `RouteurReplicas` (DATABASE_ROUTERS)
+y envoie les lectures faites :
+
+- pendant une vue décorée par `@lecture_replica` ;
+- dans un bloc `with sur_replica():` ;
+- par un queryset explicitement placé sur `base_lecture()` (exports en
+  flux, lus après la fin de la vue).
+
+Toutes les écritures vont sur `default`. Les lectures restent sur
+`default` :
+
+- après une écriture dans la même vue (ou le même bloc) ;
+- pendant REPLICA_DUREE_COLLANTE secondes après une requête POST du même
+  navigateur (cookie posé par `ReplicaMiddleware`), pour relire ses
+  propres écritures ;
+- quand aucun réplica n'a un retard inférieur à REPLICA_RETARD_MAX
+  secondes (retard vérifié au plus toutes les REPLICA_INTERVALLE_VERIFICATION
+  secondes par processus) ou qu'il est injoignable.
+
+Essai local avec deux bases SQLite : déclarer un alias "replica" pointant
+sur une copie de db.sqlite3 et DATABASES_REPLICAS = ["replica"] ; SQLite
+n'ayant pas de réplication, son retard est considéré nul.
+"""
+import contextvars
+import functools
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+COOKIE_PRIMAIRE = 'lecture_primaire'
+METHODES_SURES = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+# Lectures autorisées sur un réplica dans le contexte courant
+_lecture = contextvars.ContextVar('lecture_replica', default=False)
+# Une écriture a eu lieu dans le bloc de lecture courant : relire sur default
+_ecriture = contextvars.ContextVar('ecriture_primaire', default=False)
+# Requête d'écriture ou cookie de lecture collante reçu : tout lire sur default
+_collant = contextvars.ContextVar('lecture_collante', default=False)
+
+# alias -> (instant de la vérification, retard en secondes ou None)
+_retards = {}
+
+
+def _parametre(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+def retard(alias):
+    """Retard de réplication en secondes, ou None s'il est inconnu (réplica arrêté, injoignable)."""
+    connexion = connections[alias]
+    try:
+        with connexion.cursor() as curseur:
+            if connexion.vendor == 'mysql':
+                try:
+                    curseur.execute("SHOW REPLICA STATUS")
+                    colonne = 'Seconds_Behind_Source'
+                except DatabaseError:
+                    # MySQL < 8.0.22 / MariaDB
+                    curseur.execute("SHOW SLAVE STATUS")
+                    colonne = 'Seconds_Behind_Master'
+                ligne = curseur.fetchone()
+                if ligne is None:
+                    return None
+                return ligne[[c[0] for c in curseur.description].index(colonne)]
+            if connexion.vendor == 'postgresql':
+                curseur.execute(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                )
+                return float(curseur.fetchone()[0])
+            curseur.execute("SELECT 1")
+            return 0
+    except DatabaseError:
+        logger.warning("Réplica %s injoignable", alias, exc_info=True)
+        return None
+
+
+def replica_disponible(alias):
+    maintenant = time.monotonic()
+    verification = _retards.get(alias)
+    if verification is None or maintenant - verification[0] > _parametre('REPLICA_INTERVALLE_VERIFICATION', 5):
+        verification = _retards[alias] = (maintenant, retard(alias))
+    secondes = verification[1]
+    return secondes is not None and secondes <= _parametre('REPLICA_RETARD_MAX', 5)
+
+
+def base_lecture():
+    """Alias où lire dans le contexte courant : un réplica à jour, sinon default."""
+    if not _lecture.get() or _ecriture.get() or _collant.get():
+        return DEFAULT_DB_ALIAS
+    disponibles = [alias for alias in _parametre('DATABASES_REPLICAS', []) if replica_disponible(alias)]
+    return random.choice(disponibles) if disponibles else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def sur_replica():
+    jetons = (_lecture.set(True), _ecriture.set(False))
+    try:
+        yield
+    finally:
+        _lecture.reset(jetons[0])
+        _ecriture.reset(jetons[1])
+
+
+def lecture_replica(vue):
+    """Décorateur de vue : ses lectures peuvent être servies par un réplica."""
+    @functools.wraps(vue)
+    def _vue(request, *args, **kwargs):
+        with sur_replica():
+            return vue(request, *args, **kwargs)
+    return _vue
+
+
+class RouteurReplicas:
+    def db_for_read(self, model, **hints):
+        alias = base_lecture()
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_write(self, model, **hints):
+        if _lecture.get():
+            _ecriture.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données sur default et les réplicas
+        return True
+
+
+class ReplicaMiddleware:
+    """Isole l'état du routeur par requête et pose le cookie de lecture collante après un POST."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        ecriture = request.method not in METHODES_SURES
+        jeton = _collant.set(ecriture or COOKIE_PRIMAIRE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            _collant.reset(jeton)
+        return self._poser_cookie(response, ecriture)
+
+    async def __acall__(self, request):
+        # Le contexte est copié dans les appels sync_to_async de la vue
+        ecriture = request.method not in METHODES_SURES
+        jeton = _collant.set(ecriture or COOKIE_PRIMAIRE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _collant.reset(jeton)
+        return self._poser_cookie(response, ecriture)
+
+    def _poser_cookie(self, response, ecriture):
+        if ecriture:
+            response.set_cookie(
+                COOKIE_PRIMAIRE, '1',
+                max_age=_parametre('REPLICA_DUREE_COLLANTE', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,280 @@
+"""
+Signaux de l'application.
+
+Les miniatures d'une photo de victime sont générées dès son enregistrement
+et celles de la photo remplacée sont supprimées.
+
+En fin de requête (après l'envoi de la réponse), le tampon du journal des
+actions est vidé s'il a atteint sa taille ou son délai maximal, et les
+métriques du processus sont ajoutées à la base partagée (metriques.py).
+
+L'agent propriétaire des familles (acces.py) est recalculé quand une
+victime est liée à une famille, en est déliée, change de créateur ou est
+supprimée.
+
+Les cartes en cache des victimes d'une famille modifiée (cartes.py) sont
+invalidées en incrémentant leur version.
+
+Les filtres de l'admin des membres (facettes.py) sont invalidés quand un
+membre est créé, supprimé ou change de ville ou de lien de parenté.
+
+L'index de la recherche globale (recherche_globale.py) est mis à jour à
+l'enregistrement et à la suppression des fiches, familles, membres et
+demandes ; l'index des INCO en mémoire du processus (inco.py), à
+l'enregistrement et à la suppression des fiches.
+
+Les compteurs du snapshot statistique et les cellules du cube des aides
+(cube.py) sont ajustés ici à chaque création,
+modification ou suppression. Les opérations en masse (bulk_create, update(),
+delete() sans signaux) ne passent pas par ces signaux : relancer ensuite
+`manage.py stats_snapshot`.
+"""
+import logging
+from collections import Counter
+
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import acces, cartes, cube, facettes, inco, metriques, recherche_globale, statistiques
+from .journal import tampon
+from .miniatures import generer_miniatures, supprimer_miniatures
+from .models import DemandeAide, Famille, FicheVictime, MembreFamille
+
+logger = logging.getLogger(__name__)
+
+
+def _etat_precedent(sender, instance, champs):
+    """Valeurs en base avant la sauvegarde (None pour une création)."""
+    if instance._state.adding or instance.pk is None:
+        return None
+    return sender.objects.filter(pk=instance.pk).values(*champs).first()
+
+
+# Fiches victimes
+@receiver(pre_save, sender=FicheVictime)
+def victime_pre_save(sender, instance, **kwargs):
+    instance._stats_avant = _etat_precedent(sender, instance, ['famille_id', 'cree_par_id', 'matricule'])
+
+
+@receiver(post_save, sender=FicheVictime)
+def victime_post_save(sender, instance, created, **kwargs):
+    deltas = Counter()
+    if created:
+        if instance.famille_id:
+            acces.recalculer_proprietaires([instance.famille_id])
+        deltas['victimes.total'] += 1
+        deltas[statistiques.cle_mois(instance.date_creation)] += 1
+        if instance.cree_par_id:
+            deltas[statistiques.cle_victimes_agent(instance.cree_par_id)] += 1
+        if instance.famille_id:
+            deltas['victimes.avec_famille'] += 1
+    else:
+        avant = getattr(instance, '_stats_avant', None)
+        if avant is None:
+            return
+        if (avant['famille_id'], avant['cree_par_id']) != (instance.famille_id, instance.cree_par_id):
+            acces.recalculer_proprietaires([avant['famille_id'], instance.famille_id])
+        deltas['victimes.avec_famille'] += bool(instance.famille_id) - bool(avant['famille_id'])
+        if avant['cree_par_id'] != instance.cree_par_id:
+            if avant['cree_par_id']:
+                deltas[statistiques.cle_victimes_agent(avant['cree_par_id'])] -= 1
+            if instance.cree_par_id:
+                deltas[statistiques.cle_victimes_agent(instance.cree_par_id)] += 1
+    statistiques.ajuster(deltas)
+
+
+@receiver(post_delete, sender=FicheVictime)
+def victime_post_delete(sender, instance, **kwargs):
+    deltas = Counter({'victimes.total': -1, statistiques.cle_mois(instance.date_creation): -1})
+    if instance.cree_par_id:
+        deltas[statistiques.cle_victimes_agent(instance.cree_par_id)] -= 1
+    if instance.famille_id:
+        deltas['victimes.avec_famille'] -= 1
+        acces.recalculer_proprietaires([instance.famille_id])
+    statistiques.ajuster(deltas)
+
+
+@receiver(post_save, sender=FicheVictime)
+def victime_miniatures(sender, instance, **kwargs):
+    avant = getattr(instance, '_photo_initiale', None) or ''
+    apres = instance.photo.name or ''
+    if avant == apres:
+        return
+    instance._photo_initiale = apres
+    try:
+        if avant:
+            supprimer_miniatures(avant, instance.photo.storage)
+        if apres:
+            generer_miniatures(apres, storage=instance.photo.storage)
+    except Exception:
+        # Le filtre `miniature` réessaiera à l'affichage
+        logger.warning("Génération des miniatures impossible pour %s", apres, exc_info=True)
+
+
+# Membres de famille
+@receiver(post_save, sender=MembreFamille)
+def membre_post_save(sender, instance, created, **kwargs):
+    valeurs = (instance.ville, instance.lien_parente)
+    if created or getattr(instance, '_facettes_initiales', None) != valeurs:
+        facettes.invalider()
+    instance._facettes_initiales = valeurs
+
+
+@receiver(post_delete, sender=MembreFamille)
+def membre_post_delete(sender, instance, **kwargs):
+    facettes.invalider()
+
+
+# Familles
+@receiver(pre_save, sender=Famille)
+def famille_pre_save(sender, instance, **kwargs):
+    instance._cube_avant = _etat_precedent(sender, instance, ['ville', 'situation_economique'])
+
+
+@receiver(post_save, sender=Famille)
+def famille_post_save(sender, instance, created, **kwargs):
+    if created:
+        statistiques.ajuster({'familles.total': 1})
+        return
+    cartes.invalider_famille(instance.pk)
+    avant = getattr(instance, '_cube_avant', None)
+    if avant is None:
+        return
+    avant = (avant['ville'], avant['situation_economique'])
+    apres = (instance.ville, instance.situation_economique)
+    if avant != apres:
+        cube.deplacer_famille(instance.pk, avant, apres)
+
+
+@receiver(post_delete, sender=Famille)
+def famille_post_delete(sender, instance, **kwargs):
+    # Les demandes sont supprimées en cascade avant la famille et ont déjà
+    # décrémenté familles.avec_demandes
+    statistiques.ajuster({'familles.total': -1})
+
+
+# Demandes d'aide
+def _marquer_famille(famille_id, a_des_demandes):
+    """
+    Bascule l'indicateur a_des_demandes de la famille. La mise à jour
+    conditionnelle ne touche une ligne que si l'état change réellement :
+    lors d'une suppression en lot, une seule demande décrémente le compteur.
+    """
+    if famille_id is None:
+        return 0
+    modifiees = Famille.objects.filter(pk=famille_id, a_des_demandes=not a_des_demandes).update(
+        a_des_demandes=a_des_demandes
+    )
+    if not modifiees:
+        return 0
+    return 1 if a_des_demandes else -1
+
+
+def _liberer_famille(famille_id):
+    """Décrémente familles.avec_demandes si la famille n'a plus de demande."""
+    if DemandeAide.objects.filter(famille_id=famille_id).exists():
+        return 0
+    return _marquer_famille(famille_id, False)
+
+
+def _cellule_demande(demande, famille_id, type_demande, statut):
+    """Clé de la cellule du cube d'une demande (ville et situation lues sur la famille)."""
+    famille = demande._state.fields_cache.get('famille')
+    if famille is not None and famille.pk == famille_id:
+        dimensions = (famille.ville, famille.situation_economique)
+    else:
+        dimensions = Famille.objects.filter(pk=famille_id).values_list('ville', 'situation_economique').first() or ('', '')
+    return cube.cle_cellule(demande.date_creation, type_demande, statut, *dimensions)
+
+
+@receiver(pre_save, sender=DemandeAide)
+def demande_pre_save(sender, instance, **kwargs):
+    instance._stats_avant = _etat_precedent(sender, instance, ['statut', 'cree_par_id', 'famille_id', 'type_demande'])
+
+
+@receiver(post_save, sender=DemandeAide)
+def demande_post_save(sender, instance, created, **kwargs):
+    deltas = Counter()
+    if created:
+        deltas[statistiques.cle_demandes_statut(instance.statut)] += 1
+        if instance.cree_par_id:
+            deltas[statistiques.cle_demandes_agent(instance.cree_par_id, instance.statut)] += 1
+        deltas['familles.avec_demandes'] += _marquer_famille(instance.famille_id, True)
+        cube.ajuster({_cellule_demande(instance, instance.famille_id, instance.type_demande, instance.statut): 1})
+    else:
+        avant = getattr(instance, '_stats_avant', None)
+        if avant is None:
+            return
+        if (avant['famille_id'], avant['type_demande'], avant['statut']) != (instance.famille_id, instance.type_demande, instance.statut):
+            cellules = Counter()
+            cellules[_cellule_demande(instance, avant['famille_id'], avant['type_demande'], avant['statut'])] -= 1
+            cellules[_cellule_demande(instance, instance.famille_id, instance.type_demande, instance.statut)] += 1
+            cube.ajuster(cellules)
+        if (avant['statut'], avant['cree_par_id']) != (instance.statut, instance.cree_par_id):
+            deltas[statistiques.cle_demandes_statut(avant['statut'])] -= 1
+            deltas[statistiques.cle_demandes_statut(instance.statut)] += 1
+            if avant['cree_par_id']:
+                deltas[statistiques.cle_demandes_agent(avant['cree_par_id'], avant['statut'])] -= 1
+            if instance.cree_par_id:
+                deltas[statistiques.cle_demandes_agent(instance.cree_par_id, instance.statut)] += 1
+        if avant['famille_id'] != instance.famille_id:
+            deltas['familles.avec_demandes'] += _marquer_famille(instance.famille_id, True)
+            deltas['familles.avec_demandes'] += _liberer_famille(avant['famille_id'])
+    statistiques.ajuster(deltas)
+
+
+@receiver(post_delete, sender=DemandeAide)
+def demande_post_delete(sender, instance, **kwargs):
+    deltas = Counter({statistiques.cle_demandes_statut(instance.statut): -1})
+    if instance.cree_par_id:
+        deltas[statistiques.cle_demandes_agent(instance.cree_par_id, instance.statut)] -= 1
+    deltas['familles.avec_demandes'] += _liberer_famille(instance.famille_id)
+    statistiques.ajuster(deltas)
+    cube.ajuster({_cellule_demande(instance, instance.famille_id, instance.type_demande, instance.statut): -1})
+
+
+# Recherche globale
+TYPES_RECHERCHE = {modele: type_objet for type_objet, (modele, _) in recherche_globale.TYPES.items()}
+
+
+@receiver(post_save, sender=FicheVictime)
+@receiver(post_save, sender=Famille)
+@receiver(post_save, sender=MembreFamille)
+@receiver(post_save, sender=DemandeAide)
+def recherche_post_save(sender, instance, update_fields=None, **kwargs):
+    type_objet = TYPES_RECHERCHE[sender]
+    if update_fields is not None and not set(update_fields) & set(recherche_globale.TYPES[type_objet][1]):
+        return
+    recherche_globale.indexer(type_objet, [instance])
+
+
+@receiver(post_delete, sender=FicheVictime)
+@receiver(post_delete, sender=Famille)
+@receiver(post_delete, sender=MembreFamille)
+@receiver(post_delete, sender=DemandeAide)
+def recherche_post_delete(sender, instance, **kwargs):
+    recherche_globale.desindexer(TYPES_RECHERCHE[sender], [instance.pk])
+
+
+# Suggestions d'INCO
+@receiver(post_save, sender=FicheVictime)
+def inco_post_save(sender, instance, created, **kwargs):
+    avant = None if created else getattr(instance, '_stats_avant', None)
+    inco.index.ajouter(instance.pk, instance.matricule, ancien=avant and avant['matricule'])
+
+
+@receiver(post_delete, sender=FicheVictime)
+def inco_post_delete(sender, instance, **kwargs):
+    inco.index.retirer(instance.pk, instance.matricule)
+
+
+# Journal des actions
+@receiver(request_finished)
+def vider_journal(sender, **kwargs):
+    tampon.vider(force=False)
+
+
+@receiver(request_finished)
+def envoyer_metriques(sender, **kwargs):
+    metriques.registre.envoyer(forcer=False)
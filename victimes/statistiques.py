@@ -0,0 +1,227 @@
+"""
+Statistiques du tableau de bord.
+
+Deux sources pour les mêmes compteurs :
+- un recomptage complet, avec une requête d'agrégation conditionnelle par modèle ;
+- la table `StatsSnapshot`, tenue à jour incrémentalement par les signaux
+  (voir signals.py), qui permet au tableau de bord de lire tous ses compteurs
+  en une seule requête.
+
+Le snapshot n'est utilisé qu'une fois construit (`manage.py stats_snapshot`) ;
+tant qu'il ne l'est pas, le tableau de bord retombe sur les agrégations.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import DemandeAide, Famille, FicheVictime, StatsSnapshot
+
+CLE_CONSTRUIT = 'snapshot.construit'
+STATUTS_DEMANDE = [statut for statut, _ in DemandeAide.STATUT_CHOICES]
+
+
+# Clés du snapshot
+def cle_mois(date):
+    return f"victimes.mois.{timezone.localtime(date).strftime('%Y-%m')}"
+
+
+def cle_victimes_agent(user_id):
+    return f"victimes.cree_par.{user_id}"
+
+
+def cle_demandes_statut(statut):
+    return f"demandes.statut.{statut}"
+
+
+def cle_demandes_agent(user_id, statut):
+    return f"demandes.cree_par.{user_id}.{statut}"
+
+
+def debut_du_mois():
+    """Début du mois courant (borne sargable, à la place de __month/__year)."""
+    return timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+# Agrégations conditionnelles (une requête par modèle)
+def agreger_victimes(victimes=None):
+    victimes = FicheVictime.objects.all() if victimes is None else victimes
+    return victimes.aggregate(
+        total=Count('pk'),
+        avec_famille=Count('pk', filter=Q(famille__isnull=False)),
+        ce_mois=Count('pk', filter=Q(date_creation__gte=debut_du_mois())),
+    )
+
+
+def agreger_demandes(demandes=None):
+    demandes = DemandeAide.objects.all() if demandes is None else demandes
+    return demandes.aggregate(
+        total=Count('pk'),
+        **{statut: Count('pk', filter=Q(statut=statut)) for statut in STATUTS_DEMANDE}
+    )
+
+
+def agreger_familles():
+    return Famille.objects.aggregate(
+        total=Count('pk'),
+        avec_demandes=Count('pk', filter=Q(Exists(DemandeAide.objects.filter(famille=OuterRef('pk'))))),
+    )
+
+
+def compter_familles_agent(user):
+    """Familles distinctes des victimes créées par l'agent (servi par l'index cree_par)."""
+    return (
+        FicheVictime.objects.filter(cree_par=user, famille__isnull=False)
+        .values('famille').distinct().count()
+    )
+
+
+def compter_familles_suivies(user):
+    """Familles distinctes pour lesquelles l'utilisateur a créé des demandes."""
+    return DemandeAide.objects.filter(cree_par=user).values('famille').distinct().count()
+
+
+# Snapshot
+def recompter():
+    """Recomptage complet de toutes les clés du snapshot."""
+    compteurs = Counter()
+
+    victimes = agreger_victimes()
+    compteurs['victimes.total'] = victimes['total']
+    compteurs['victimes.avec_famille'] = victimes['avec_famille']
+    for ligne in FicheVictime.objects.values('date_creation').iterator(chunk_size=5000):
+        compteurs[cle_mois(ligne['date_creation'])] += 1
+    for ligne in (FicheVictime.objects.filter(cree_par__isnull=False)
+                  .values('cree_par').annotate(n=Count('pk')).order_by()):
+        compteurs[cle_victimes_agent(ligne['cree_par'])] = ligne['n']
+
+    for statut in STATUTS_DEMANDE:
+        compteurs[cle_demandes_statut(statut)] = 0
+    for ligne in DemandeAide.objects.values('cree_par', 'statut').annotate(n=Count('pk')).order_by():
+        compteurs[cle_demandes_statut(ligne['statut'])] += ligne['n']
+        if ligne['cree_par'] is not None:
+            compteurs[cle_demandes_agent(ligne['cree_par'], ligne['statut'])] = ligne['n']
+
+    familles = agreger_familles()
+    compteurs['familles.total'] = familles['total']
+    compteurs['familles.avec_demandes'] = familles['avec_demandes']
+    return dict(compteurs)
+
+
+def reconstruire():
+    """Reconstruit le snapshot (et les indicateurs dénormalisés) à partir des tables."""
+    with transaction.atomic():
+        Famille.objects.update(a_des_demandes=Exists(DemandeAide.objects.filter(famille=OuterRef('pk'))))
+        compteurs = recompter()
+        StatsSnapshot.objects.all().delete()
+        StatsSnapshot.objects.bulk_create(
+            [StatsSnapshot(cle=cle, valeur=valeur) for cle, valeur in compteurs.items()]
+            + [StatsSnapshot(cle=CLE_CONSTRUIT, valeur=1)],
+            batch_size=1000,
+        )
+    return compteurs
+
+
+def ecarts():
+    """Clés dont la valeur du snapshot diffère du recomptage : {cle: (snapshot, reel)}."""
+    reel = recompter()
+    snapshot = dict(StatsSnapshot.objects.exclude(cle=CLE_CONSTRUIT).values_list('cle', 'valeur'))
+    differences = {}
+    for cle in set(reel) | set(snapshot):
+        if snapshot.get(cle, 0) != reel.get(cle, 0):
+            differences[cle] = (snapshot.get(cle, 0), reel.get(cle, 0))
+    return differences
+
+
+def ajuster(deltas):
+    """Applique des variations {cle: delta} au snapshot (dans la transaction courante)."""
+    for cle, delta in deltas.items():
+        if not delta:
+            continue
+        if not StatsSnapshot.objects.filter(cle=cle).update(valeur=F('valeur') + delta):
+            _, cree = StatsSnapshot.objects.get_or_create(cle=cle, defaults={'valeur': delta})
+            if not cree:
+                StatsSnapshot.objects.filter(cle=cle).update(valeur=F('valeur') + delta)
+
+
+def lire(cles):
+    """Lit des clés du snapshot en une requête ; None si le snapshot n'est pas construit."""
+    valeurs = dict(StatsSnapshot.objects.filter(cle__in=[*cles, CLE_CONSTRUIT]).values_list('cle', 'valeur'))
+    if CLE_CONSTRUIT not in valeurs:
+        return None
+    return {cle: valeurs.get(cle, 0) for cle in cles}
+
+
+# Compteurs par rôle
+def stats_generales():
+    cles = ['victimes.total', cle_mois(timezone.now())] + [cle_demandes_statut(s) for s in STATUTS_DEMANDE]
+    snapshot = lire(cles)
+    if snapshot is not None:
+        total_demandes = sum(snapshot[cle_demandes_statut(s)] for s in STATUTS_DEMANDE)
+        return {
+            'total_victimes': snapshot['victimes.total'],
+            'nouveaux_dossiers': snapshot[cle_mois(timezone.now())],
+            'affaires_resolues': snapshot[cle_demandes_statut('validee')],
+            'total_demandes': total_demandes,
+        }
+    victimes = agreger_victimes()
+    demandes = agreger_demandes()
+    return {
+        'total_victimes': victimes['total'],
+        'nouveaux_dossiers': victimes['ce_mois'],
+        'affaires_resolues': demandes['validee'],
+        'total_demandes': demandes['total'],
+    }
+
+
+def stats_agent(user):
+    snapshot = lire([cle_victimes_agent(user.pk)])
+    if snapshot is not None:
+        mes_fiches = snapshot[cle_victimes_agent(user.pk)]
+    else:
+        mes_fiches = FicheVictime.objects.filter(cree_par=user).count()
+    return {
+        'mes_fiches': mes_fiches,
+        'mes_familles': compter_familles_agent(user),
+    }
+
+
+def stats_assistant(user):
+    snapshot = lire([cle_demandes_agent(user.pk, s) for s in STATUTS_DEMANDE])
+    if snapshot is not None:
+        par_statut = {s: snapshot[cle_demandes_agent(user.pk, s)] for s in STATUTS_DEMANDE}
+    else:
+        par_statut = agreger_demandes(DemandeAide.objects.filter(cree_par=user))
+    return {
+        'mes_demandes': sum(par_statut[s] for s in STATUTS_DEMANDE),
+        'demandes_validees': par_statut['validee'],
+        'demandes_en_attente': par_statut['soumise'],
+        'demandes_refusees': par_statut['refusee'],
+        'familles_suivies': compter_familles_suivies(user),
+    }
+
+
+def stats_responsable():
+    cles = (['victimes.total', 'victimes.avec_famille', 'familles.total', 'familles.avec_demandes']
+            + [cle_demandes_statut(s) for s in STATUTS_DEMANDE])
+    snapshot = lire(cles)
+    if snapshot is not None:
+        victimes = {'total': snapshot['victimes.total'], 'avec_famille': snapshot['victimes.avec_famille']}
+        familles = {'total': snapshot['familles.total'], 'avec_demandes': snapshot['familles.avec_demandes']}
+        demandes = {s: snapshot[cle_demandes_statut(s)] for s in STATUTS_DEMANDE}
+        demandes['total'] = sum(demandes.values())
+    else:
+        victimes = agreger_victimes()
+        familles = agreger_familles()
+        demandes = agreger_demandes()
+    return {
+        'total_demandes': demandes['total'],
+        'demandes_en_attente': demandes['soumise'],
+        'demandes_validees': demandes['validee'],
+        'demandes_refusees': demandes['refusee'],
+        'total_familles': familles['total'],
+        'familles_avec_demandes': familles['avec_demandes'],
+        'total_victimes_resp': victimes['total'],
+        'victimes_avec_famille': victimes['avec_famille'],
+    }
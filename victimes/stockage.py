@@ -0,0 +1,91 @@
+"""
+Stockage des fichiers uploadés adressé par contenu.
+
+Chaque contenu est conservé une seule fois dans `MEDIA_ROOT/.blobs/`, sous
+son empreinte SHA-256 (`.blobs/ab/abcdef…`). Les FileField gardent leurs noms
+et leurs URL habituels (`actes_deces/…`, `documents_victimes/…`) : ces
+chemins sont des liens physiques (hard links) vers le blob. Le nombre de
+liens du blob tient lieu de compteur de références ; le blob est supprimé
+quand le dernier fichier qui le référence l'est.
+
+Les fichiers déjà présents sont convertis par `manage.py media_dedupliquer`.
+"""
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+REPERTOIRE_BLOBS = '.blobs'
+TAILLE_BLOC = 1024 * 1024
+
+
+def empreinte_fichier(chemin):
+    sha = hashlib.sha256()
+    with open(chemin, 'rb') as fichier:
+        for bloc in iter(lambda: fichier.read(TAILLE_BLOC), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+def _remplacer_par_lien(source, destination):
+    """Remplace atomiquement `destination` par un lien physique vers `source`."""
+    temporaire = f"{destination}.{uuid.uuid4().hex}.lien"
+    os.link(source, temporaire)
+    os.replace(temporaire, destination)
+
+
+class StockageDedupliquant(FileSystemStorage):
+    """FileSystemStorage dont les fichiers identiques partagent un même blob."""
+
+    def chemin_blob(self, empreinte):
+        return os.path.join(self.location, REPERTOIRE_BLOBS, empreinte[:2], empreinte)
+
+    def lier_au_blob(self, chemin, empreinte=None):
+        """
+        Rattache le fichier `chemin` au blob de son contenu. Retourne le nombre
+        d'octets libérés (taille du fichier s'il doublonnait un blob existant).
+        """
+        empreinte = empreinte or empreinte_fichier(chemin)
+        blob = self.chemin_blob(empreinte)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(chemin, blob)
+            return 0
+        except FileExistsError:
+            pass
+        if os.path.samefile(chemin, blob):
+            return 0
+        taille = os.path.getsize(chemin)
+        _remplacer_par_lien(blob, chemin)
+        return taille
+
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        try:
+            self.lier_au_blob(self.path(name), getattr(content, 'empreinte', None))
+        except OSError:
+            # Système de fichiers sans liens physiques : le fichier reste une copie autonome
+            pass
+        return name
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        chemin = self.path(name)
+        try:
+            infos = os.stat(chemin)
+        except FileNotFoundError:
+            return
+        # Deux liens : ce fichier et le blob, qui n'est plus référencé ensuite
+        blob = self.chemin_blob(empreinte_fichier(chemin)) if infos.st_nlink == 2 else None
+        super().delete(name)
+        if blob and os.path.exists(blob) and os.stat(blob).st_nlink == 1:
+            os.remove(blob)
+
+    def blobs(self):
+        """Chemins absolus de tous les blobs."""
+        racine = os.path.join(self.location, REPERTOIRE_BLOBS)
+        for dossier, _, fichiers in os.walk(racine):
+            for nom in fichiers:
+                yield os.path.join(dossier, nom)
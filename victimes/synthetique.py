@@ -0,0 +1,241 @@
+"""
+Jeux de données synthétiques pour les mesures de performance.
+
+`GenerateurDonnees` produit, de façon déterministe pour une graine donnée,
+des utilisateurs, fiches victimes, familles, membres, demandes d'aide,
+documents et entrées du journal dans des proportions réalistes, par lots
+insérés avec bulk_create. Les données générées sont reconnaissables (INCO
+"SYN-…", familles "SYN-F…", utilisateurs "syn_…") et peuvent être
+supprimées avec `purger()`.
+
+Les documents n'ont pas de fichier sur disque : seul leur nom est
+enregistré. Les dates sont réparties sur les trois années précédant une
+date de référence fixe, pour que deux générations soient identiques.
+"""
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from . import cube, facettes, recherche_globale, statistiques
+from .models import DemandeAide, DocumentVictime, Famille, FicheVictime, JournalAction, MembreFamille, User
+from .recherche import cle_recherche, indexer_victimes
+
+ECHELLES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+MOT_DE_PASSE = 'synthetique'
+REFERENCE = datetime(2025, 6, 30, 12, tzinfo=dt_timezone.utc)
+PERIODE = timedelta(days=3 * 365)
+TAILLE_LOT = 2000
+
+NOMS = ['Ouédraogo', 'Sawadogo', 'Kaboré', 'Compaoré', 'Traoré', 'Zongo', 'Ilboudo', 'Kiemdé', 'Sanou', 'Dabiré',
+        'Nikiéma', 'Zoungrana', 'Ouattara', 'Diallo', 'Bamogo', 'Tapsoba', 'Yaméogo', 'Konaté', 'Somé', 'Palm']
+PRENOMS = ['Aminata', 'Issouf', 'Mariam', 'Boukary', 'Salif', 'Fatimata', 'Adama', 'Élise', 'Gérald', 'Hamidou',
+           'Rasmané', 'Awa', 'Moussa', 'Safiatou', 'Noël', 'Alizéta', 'Karim', 'Ramata', 'Ousséni', 'Clémence']
+VILLES = ['Ouagadougou', 'Bobo-Dioulasso', 'Koudougou', 'Ouahigouya', 'Kaya', "Fada N'Gourma", 'Dori', 'Banfora',
+          'Tenkodogo', 'Dédougou', 'Gaoua', 'Djibo']
+GRADES = ['Gendarme', 'Maréchal des logis', 'Adjudant', 'Adjudant-chef', 'Lieutenant', 'Capitaine']
+LIENS = ['fils', 'fille', 'épouse', 'mère', 'père', 'frère', 'sœur']
+ACTIONS = ['Création victime', 'Modification victime', 'Création famille', 'Ajout membre famille', 'Export de données']
+
+# Proportions par fiche victime
+PART_AVEC_FAMILLE = 0.8
+MEMBRES_PAR_FAMILLE = (0, 7)
+DEMANDES_PAR_FAMILLE = (0, 3)
+PART_AVEC_DOCUMENT = 0.7
+ACTIONS_PAR_VICTIME = 2
+
+
+@contextmanager
+def _dates_imposees(*modeles):
+    """Laisse bulk_create enregistrer les dates générées au lieu de auto_now_add."""
+    champs = [
+        champ for modele in modeles for champ in modele._meta.concrete_fields
+        if getattr(champ, 'auto_now_add', False)
+    ]
+    for champ in champs:
+        champ.auto_now_add = False
+    try:
+        yield
+    finally:
+        for champ in champs:
+            champ.auto_now_add = True
+
+
+class GenerateurDonnees:
+    def __init__(self, nb_victimes, graine=42, taille_lot=TAILLE_LOT):
+        self.nb_victimes = nb_victimes
+        self.rng = random.Random(graine)
+        self.taille_lot = taille_lot
+        self.volumes = {}
+
+    def _date(self):
+        return REFERENCE - timedelta(seconds=self.rng.randrange(int(PERIODE.total_seconds())))
+
+    def _compter(self, nom, n):
+        self.volumes[nom] = self.volumes.get(nom, 0) + n
+
+    def generer(self, progression=None):
+        self.utilisateurs()
+        with _dates_imposees(FicheVictime, Famille, MembreFamille, DemandeAide, DocumentVictime):
+            for depart in range(0, self.nb_victimes, self.taille_lot):
+                self.lot(depart, min(depart + self.taille_lot, self.nb_victimes))
+                if progression:
+                    progression(min(depart + self.taille_lot, self.nb_victimes))
+        # bulk_create contourne les signaux : agrégats dérivés à reconstruire
+        statistiques.reconstruire()
+        cube.reconstruire()
+        facettes.invalider()
+        recherche_globale.reconstruire()
+        return self.volumes
+
+    def utilisateurs(self):
+        # Un seul hachage pour tous : make_password est volontairement lent
+        mot_de_passe = make_password(MOT_DE_PASSE)
+        roles = [
+            ('agent', max(5, self.nb_victimes // 2000)),
+            ('assistant', max(2, self.nb_victimes // 10000)),
+            ('responsable', 2),
+            ('admin', 1),
+        ]
+        User.objects.bulk_create([
+            User(username=f"syn_{role}_{i:04d}", password=mot_de_passe, role=role,
+                 first_name=self.rng.choice(PRENOMS), last_name=self.rng.choice(NOMS))
+            for role, nb in roles
+            for i in range(1, nb + 1)
+        ])
+        ids = dict(User.objects.filter(username__startswith='syn_').values_list('username', 'pk'))
+        self.agents = sorted(pk for nom, pk in ids.items() if nom.startswith('syn_agent_'))
+        self.assistants = sorted(pk for nom, pk in ids.items() if nom.startswith('syn_assistant_'))
+        self.responsables = sorted(pk for nom, pk in ids.items() if nom.startswith('syn_responsable_'))
+        self._compter('utilisateurs', len(ids))
+
+    def _agent(self):
+        # Répartition inégale : quelques agents saisissent beaucoup de fiches
+        return self.agents[min(int(self.rng.paretovariate(1.2)) - 1, len(self.agents) - 1)]
+
+    @transaction.atomic
+    def lot(self, debut, fin):
+        rng = self.rng
+        victimes = []
+        familles = {}
+        for i in range(debut, fin):
+            agent = self._agent()
+            date_creation = self._date()
+            victime = FicheVictime(
+                matricule=f"SYN-{i:07d}",
+                nom=rng.choice(NOMS),
+                prenom=rng.choice(PRENOMS),
+                sexe='F' if rng.random() < 0.1 else 'M',
+                grade=rng.choice(GRADES),
+                date_naissance=(date_creation - timedelta(days=rng.randrange(20 * 365, 55 * 365))).date(),
+                date_deces=date_creation.date(),
+                lieu_deces=rng.choice(VILLES),
+                cree_par_id=agent,
+                date_creation=date_creation,
+            )
+            victime.cle_recherche = cle_recherche(victime)
+            victimes.append(victime)
+            if rng.random() < PART_AVEC_FAMILLE:
+                familles[victime.matricule] = Famille(
+                    nom_famille=f"SYN-F{i:07d} {victime.nom}",
+                    ville=rng.choice(VILLES),
+                    situation_economique=rng.choice(Famille.SITUATION_ECONOMIQUE_CHOICES)[0],
+                    nombre_personnes=rng.randint(1, 10),
+                    agent_proprietaire_id=agent,
+                    date_creation=date_creation,
+                )
+
+        # MySQL ne renvoie pas les clés d'un bulk_create : relues par clé naturelle
+        Famille.objects.bulk_create(familles.values(), batch_size=1000)
+        ids_familles = dict(Famille.objects.filter(
+            nom_famille__in=[f.nom_famille for f in familles.values()]
+        ).values_list('nom_famille', 'pk'))
+        for victime in victimes:
+            famille = familles.get(victime.matricule)
+            if famille is not None:
+                famille.pk = victime.famille_id = ids_familles[famille.nom_famille]
+        FicheVictime.objects.bulk_create(victimes, batch_size=1000)
+        victimes = list(
+            FicheVictime.objects.filter(matricule__in=[v.matricule for v in victimes])
+            .order_by('matricule')
+            .only('pk', 'matricule', 'nom', 'prenom', 'cle_recherche', 'cree_par_id', 'date_creation')
+        )
+        indexer_victimes(victimes, maj_cle=False)
+
+        membres, demandes, documents, actions = [], [], [], []
+        for famille in familles.values():
+            for _ in range(rng.randint(*MEMBRES_PAR_FAMILLE)):
+                membres.append(MembreFamille(
+                    famille_id=famille.pk,
+                    nom=famille.nom_famille.split(' ', 1)[1],
+                    prenom=rng.choice(PRENOMS),
+                    date_naissance=(REFERENCE - timedelta(days=rng.randrange(0, 80 * 365))).date(),
+                    ville=famille.ville if rng.random() < 0.9 else rng.choice(VILLES),
+                    sexe=rng.choice('MF'),
+                    relation_victime=rng.choice(MembreFamille.RELATION_CHOICES)[0],
+                    lien_parente=rng.choice(LIENS),
+                    date_creation=famille.date_creation,
+                ))
+            for _ in range(rng.randint(*DEMANDES_PAR_FAMILLE)):
+                statut = rng.choice(('soumise', 'validee', 'validee', 'refusee'))
+                date_creation = famille.date_creation + timedelta(days=rng.randrange(0, 180))
+                demandes.append(DemandeAide(
+                    famille_id=famille.pk,
+                    type_demande=rng.choice(DemandeAide.TYPE_CHOICES)[0],
+                    statut=statut,
+                    description="Demande générée",
+                    cree_par_id=rng.choice(self.assistants),
+                    valide_par_id=rng.choice(self.responsables) if statut != 'soumise' else None,
+                    date_creation=date_creation,
+                    date_validation=date_creation + timedelta(days=rng.randrange(1, 30)) if statut != 'soumise' else None,
+                ))
+        for victime in victimes:
+            if rng.random() < PART_AVEC_DOCUMENT:
+                documents.append(DocumentVictime(
+                    victime_id=victime.pk,
+                    type_document='acte_deces',
+                    fichier=f"documents_victimes/synthetiques/{victime.matricule}.pdf",
+                    nom_fichier=f"{victime.matricule}.pdf",
+                    date_ajout=victime.date_creation,
+                ))
+            for n in range(ACTIONS_PAR_VICTIME):
+                actions.append(JournalAction(
+                    utilisateur_id=victime.cree_par_id,
+                    action=ACTIONS[0] if n == 0 else rng.choice(ACTIONS[1:]),
+                    date_action=victime.date_creation + timedelta(minutes=n * rng.randrange(1, 10000)),
+                    details=f"[SYN] {victime.matricule}",
+                ))
+        MembreFamille.objects.bulk_create(membres, batch_size=2000)
+        DemandeAide.objects.bulk_create(demandes, batch_size=2000)
+        DocumentVictime.objects.bulk_create(documents, batch_size=2000)
+        JournalAction.objects.bulk_create(actions, batch_size=2000)
+        if demandes:
+            Famille.objects.filter(pk__in={d.famille_id for d in demandes}).update(a_des_demandes=True)
+
+        self._compter('victimes', len(victimes))
+        self._compter('familles', len(familles))
+        self._compter('membres', len(membres))
+        self._compter('demandes', len(demandes))
+        self._compter('documents', len(documents))
+        self._compter('journal', len(actions))
+
+
+def purger(taille_lot=TAILLE_LOT):
+    """Supprime les données synthétiques (par lots, signaux compris)."""
+    for queryset in (
+        FicheVictime.objects.filter(matricule__startswith='SYN-'),
+        Famille.objects.filter(nom_famille__startswith='SYN-F'),
+    ):
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:taille_lot])
+            if not pks:
+                break
+            with transaction.atomic():
+                queryset.model.objects.filter(pk__in=pks).delete()
+    JournalAction.objects.filter(details__startswith='[SYN] ').delete()
+    User.objects.filter(username__startswith='syn_').delete()
+    statistiques.reconstruire()
+    cube.reconstruire()
+    facettes.invalider()
@@ -0,0 +1,170 @@
+"""
+Téléversement direct des documents de victimes.
+
+Le gestionnaire `TeleversementDirect` écrit chaque fichier des champs
+`actes_deces` et `rapports_medicaux` directement à son emplacement final
+dans le stockage, au fil de la lecture du corps de la requête : ni copie
+en mémoire, ni fichier temporaire recopié ensuite dans MEDIA_ROOT.
+L'empreinte SHA-256 et le type réel du fichier (d'après ses premiers
+octets) sont calculés au passage.
+
+La vue crée ensuite les DocumentVictime en une seule requête
+(`documents_pour`, puis bulk_create) et appelle `conserver()` ; dans tous
+les autres cas (formulaire invalide, vérification CSRF refusée, erreur),
+`abandonner()` supprime les fichiers déjà écrits.
+"""
+import hashlib
+import os
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+
+from .models import DocumentVictime
+from .stockage import StockageDedupliquant
+
+# Champ du formulaire -> type de document
+CHAMPS_DOCUMENTS = {
+    'actes_deces': 'acte_deces',
+    'rapports_medicaux': 'rapport_medical',
+}
+
+# Signatures des formats acceptés (premiers octets du fichier)
+SIGNATURES = (
+    (b'%PDF', 'application/pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+TAILLE_SIGNATURE = 8
+
+
+def detecter_type(debut):
+    """Type MIME d'après les premiers octets, ou None si le format n'est pas reconnu."""
+    for signature, type_mime in SIGNATURES:
+        if debut.startswith(signature):
+            return type_mime
+    return None
+
+
+class FichierTeleverse(UploadedFile):
+    """Fichier déjà écrit dans le stockage sous `nom_stocke`."""
+
+    def __init__(self, chemin, nom_stocke, nom_origine, taille, type_detecte, empreinte):
+        super().__init__(open(chemin, 'rb'), nom_origine, type_detecte, taille)
+        self.chemin = chemin
+        self.nom_stocke = nom_stocke
+        self.type_detecte = type_detecte
+        self.empreinte = empreinte
+
+
+class _Ecriture:
+    def __init__(self, champ, nom_fichier):
+        self.storage = champ.storage
+        self.nom_origine = nom_fichier
+        nom = champ.generate_filename(None, nom_fichier)
+        os.makedirs(os.path.dirname(self.storage.path(nom)), exist_ok=True)
+        # Même garde que FileSystemStorage._save contre deux écritures simultanées du même nom
+        while True:
+            nom = self.storage.get_available_name(nom)
+            try:
+                self.descripteur = os.open(self.storage.path(nom), os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+                break
+            except FileExistsError:
+                continue
+        self.nom = nom
+        self.chemin = self.storage.path(nom)
+        self.sha = hashlib.sha256()
+        self.debut = b''
+
+    def ecrire(self, donnees):
+        if len(self.debut) < TAILLE_SIGNATURE:
+            self.debut += donnees[:TAILLE_SIGNATURE - len(self.debut)]
+        self.sha.update(donnees)
+        os.write(self.descripteur, donnees)
+
+    def terminer(self, taille):
+        os.close(self.descripteur)
+        if self.storage.file_permissions_mode is not None:
+            os.chmod(self.chemin, self.storage.file_permissions_mode)
+        empreinte = self.sha.hexdigest()
+        if isinstance(self.storage, StockageDedupliquant):
+            try:
+                self.storage.lier_au_blob(self.chemin, empreinte)
+            except OSError:
+                pass
+        return FichierTeleverse(self.chemin, self.nom, self.nom_origine, taille, detecter_type(self.debut), empreinte)
+
+    def abandonner(self):
+        os.close(self.descripteur)
+        os.remove(self.chemin)
+
+
+class TeleversementDirect(FileUploadHandler):
+    """
+    Gestionnaire d'upload à installer en tête de `request.upload_handlers`
+    avant toute lecture de request.POST / request.FILES. Les autres champs
+    fichier (photo, etc.) sont laissés aux gestionnaires par défaut.
+    """
+
+    def __init__(self, request=None, champs=CHAMPS_DOCUMENTS):
+        super().__init__(request)
+        self.champs = champs
+        self.champ_modele = DocumentVictime._meta.get_field('fichier')
+        self.fichiers = []
+        self._ecriture = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self._ecriture = None
+        if field_name in self.champs and self.file_name:
+            self._ecriture = _Ecriture(self.champ_modele, self.file_name)
+            raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._ecriture is None:
+            return raw_data
+        self._ecriture.ecrire(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self._ecriture is None:
+            return None
+        fichier = self._ecriture.terminer(file_size)
+        self._ecriture = None
+        self.fichiers.append(fichier)
+        return fichier
+
+    def upload_interrupted(self):
+        if self._ecriture is not None:
+            self._ecriture.abandonner()
+            self._ecriture = None
+
+    def conserver(self):
+        """Les fichiers écrits sont rattachés à des DocumentVictime enregistrés : `abandonner()` les laissera."""
+        for fichier in self.fichiers:
+            fichier.close()
+        self.fichiers = []
+
+    def abandonner(self):
+        """Supprime les fichiers écrits et non conservés (formulaire invalide, CSRF refusé, erreur)."""
+        for fichier in self.fichiers:
+            fichier.close()
+            self.champ_modele.storage.delete(fichier.nom_stocke)
+        self.fichiers = []
+
+
+def documents_pour(victime, fichiers, type_document):
+    """DocumentVictime non enregistrés pour les fichiers d'un champ, à passer à bulk_create."""
+    documents = []
+    for fichier in fichiers:
+        document = DocumentVictime(victime=victime, type_document=type_document, nom_fichier=fichier.name)
+        if isinstance(fichier, FichierTeleverse):
+            document.fichier.name = fichier.nom_stocke
+        else:
+            # Fichier reçu par les gestionnaires par défaut : enregistrement classique
+            document.fichier.save(fichier.name, fichier, save=False)
+        documents.append(document)
+    return documents
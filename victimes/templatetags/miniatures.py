@@ -0,0 +1,11 @@
+from django import template
+
+from victimes.miniatures import url_miniature
+
+register = template.Library()
+
+
+@register.filter
+def miniature(photo, rendu='carte'):
+    """{{ victime.photo|miniature:'avatar' }} : URL du rendu réduit de la photo."""
+    return url_miniature(photo, rendu)
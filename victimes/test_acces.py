@@ -0,0 +1,67 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from victimes.acces import can_edit
+from victimes.models import Famille, FicheVictime, MembreFamille
+
+User = get_user_model()
+
+
+class ProprieteFamillesTest(TestCase):
+    def setUp(self):
+        self.agent1 = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.agent2 = User.objects.create_user(username='agent2', password='testpass123', role='agent')
+        self.famille = Famille.objects.create(nom_famille='Famille A')
+        self.autre = Famille.objects.create(nom_famille='Famille B')
+        self.victime = FicheVictime.objects.create(nom='A', prenom='A', matricule='I1', famille=self.famille,
+                                                   cree_par=self.agent1)
+        self.membre = MembreFamille.objects.create(famille=self.famille, nom='M', prenom='P', relation_victime='enfant')
+
+    def proprietaire(self, famille):
+        famille.refresh_from_db()
+        return famille.agent_proprietaire_id, famille.agents_multiples
+
+    def test_synchronisation(self):
+        self.assertEqual(self.proprietaire(self.famille), (self.agent1.pk, False))
+        seconde = FicheVictime.objects.create(nom='B', prenom='B', matricule='I2', famille=self.famille,
+                                              cree_par=self.agent2)
+        self.assertEqual(self.proprietaire(self.famille), (None, True))
+        seconde.famille = self.autre
+        seconde.save()
+        self.assertEqual(self.proprietaire(self.famille), (self.agent1.pk, False))
+        self.assertEqual(self.proprietaire(self.autre), (self.agent2.pk, False))
+        seconde.delete()
+        self.assertEqual(self.proprietaire(self.autre), (None, False))
+
+    def test_visible_to(self):
+        FicheVictime.objects.create(nom='B', prenom='B', matricule='I2', famille=self.autre, cree_par=self.agent2)
+        self.assertEqual(list(Famille.objects.visible_to(self.agent1)), [self.famille])
+        self.assertEqual(list(MembreFamille.objects.visible_to(self.agent1)), [self.membre])
+        self.assertEqual(list(MembreFamille.objects.visible_to(self.agent2)), [])
+        # Famille partagée entre deux agents : visible par les deux
+        FicheVictime.objects.create(nom='C', prenom='C', matricule='I3', famille=self.famille, cree_par=self.agent2)
+        self.assertEqual(set(Famille.objects.visible_to(self.agent2)), {self.famille, self.autre})
+        responsable = User.objects.create_user(username='resp1', password='testpass123', role='responsable')
+        self.assertEqual(Famille.objects.visible_to(responsable).count(), 2)
+
+    def test_can_edit(self):
+        famille = Famille.objects.get(pk=self.famille.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(can_edit(self.agent1, famille))
+            self.assertFalse(can_edit(self.agent2, famille))
+            self.assertTrue(can_edit(self.agent1, self.victime))
+        FicheVictime.objects.create(nom='C', prenom='C', matricule='I3', famille=self.famille, cree_par=self.agent2)
+        famille.refresh_from_db()
+        with self.assertNumQueries(1):
+            self.assertTrue(can_edit(self.agent2, famille))
+            self.assertTrue(can_edit(self.agent2, famille))
+
+    def test_vues_agent(self):
+        self.client.login(username='agent2', password='testpass123')
+        response = self.client.get(reverse('famille_update', args=[self.famille.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.client.login(username='agent1', password='testpass123')
+        response = self.client.get(reverse('famille_update', args=[self.famille.pk]))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('famille_list'))
+        self.assertEqual([f.pk for f in response.context['familles']], [self.famille.pk])
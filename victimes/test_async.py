@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from victimes import metriques
+from victimes.models import FicheVictime, Famille, JournalAction, MembreFamille
+
+User = get_user_model()
+
+
+class VuesAjaxAsynchronesTest(TestCase):
+    """Vues AJAX asynchrones servies par le gestionnaire ASGI (AsyncClient)."""
+
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.famille = Famille.objects.create(nom_famille='Famille Test')
+        MembreFamille.objects.create(famille=self.famille, nom='M', prenom='X', relation_victime='enfant')
+        self.victime = FicheVictime.objects.create(
+            nom='Nom', prenom='P', matricule='INCO1', famille=self.famille, cree_par=self.agent,
+        )
+        self.async_client.force_login(self.agent)
+
+    async def test_details_et_etag(self):
+        url = reverse('victime_details_ajax', args=[self.victime.id])
+        response = await self.async_client.get(url)
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(len(response.json()['victime']['famille']['membres']), 1)
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_role_required(self):
+        url = reverse('victime_modifier_ajax', args=[self.victime.id])
+        await self.async_client.alogout()
+        response = await self.async_client.post(url, {'grade': 'Adjudant'})
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        assistant = await User.objects.acreate(username='assistant1', role='assistant')
+        await self.async_client.aforce_login(assistant)
+        response = await self.async_client.post(url, {'grade': 'Adjudant'})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_modification_et_journal(self):
+        version = self.victime.version
+        response = await self.async_client.post(
+            reverse('victime_modifier_ajax', args=[self.victime.id]), {'grade': 'Adjudant'},
+        )
+        self.assertTrue(response.json()['success'])
+        await self.victime.arefresh_from_db()
+        self.assertEqual(self.victime.grade, 'Adjudant')
+        self.assertEqual(self.victime.version, version + 1)
+        self.assertTrue(await JournalAction.objects.filter(action="Modification fiche victime").aexists())
+
+    async def test_ajout_membre_refuse_a_un_autre_agent(self):
+        autre = await User.objects.acreate(username='agent2', role='agent')
+        await self.async_client.aforce_login(autre)
+        response = await self.async_client.post(
+            reverse('ajouter_membre_ajax'), {'famille_id': self.famille.id, 'prenom': 'Y', 'nom': 'M'},
+        )
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(await MembreFamille.objects.filter(famille=self.famille).acount(), 1)
+
+    async def test_metriques_sous_asgi(self):
+        metriques.registre._valeurs.clear()
+        await self.async_client.get(reverse('victime_details_ajax', args=[self.victime.id]))
+        etiquette = 'vue="victime_details_ajax"'
+        self.assertGreater(metriques.registre._valeurs[f'{metriques.PREFIXE}_sql_requetes_total', etiquette], 0)
+        metriques.registre._valeurs.clear()
@@ -0,0 +1,69 @@
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from victimes import cartes
+from victimes.listing import page_victimes
+from victimes.models import Famille, FicheVictime
+
+User = get_user_model()
+
+
+class CartesVictimesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.assistant = User.objects.create_user(username='assist1', password='testpass123', role='assistant')
+        self.famille = Famille.objects.create(nom_famille='Famille A')
+        self.victime = FicheVictime.objects.create(
+            nom='Kaboré', prenom='Issa', matricule='GN-1', famille=self.famille, cree_par=self.agent,
+        )
+        for i in range(4):
+            FicheVictime.objects.create(nom=f'Nom{i}', prenom='P', matricule=f'GN-X{i}', cree_par=self.agent)
+
+    def test_page_servie_depuis_le_cache(self):
+        self.client.force_login(self.agent)
+        self.client.get(reverse('victime_list'))
+        with mock.patch('victimes.cartes.render_to_string') as rendu, self.assertNumQueries(3):
+            # Session, utilisateur, page de fiches
+            response = self.client.get(reverse('victime_list'))
+        rendu.assert_not_called()
+        self.assertContains(response, 'class="victime-card"', count=5)
+        self.assertContains(response, 'class="edit"', count=5)
+
+    def test_version_et_role(self):
+        self.client.force_login(self.assistant)
+        self.assertContains(self.client.get(reverse('victime_list')), 'class="demande"', count=1)
+        version = self.victime.version
+        self.victime.prenom = 'Issouf'
+        self.victime.save()
+        self.assertEqual(self.victime.version, version + 1)
+        self.famille.ville = 'Kaya'
+        self.famille.save()
+        self.victime.refresh_from_db()
+        self.assertEqual(self.victime.version, version + 2)
+        response = self.client.get(reverse('victime_list'))
+        self.assertContains(response, 'Issouf')
+        self.assertNotContains(response, 'class="edit"')
+
+    def test_modifications_concurrentes(self):
+        # Deux copies chargées à la même version : chaque enregistrement change la clé de la carte
+        copie_a = FicheVictime.objects.get(pk=self.victime.pk)
+        copie_b = FicheVictime.objects.get(pk=self.victime.pk)
+        version = copie_a.version
+        copie_a.prenom = 'Issouf'
+        copie_a.save()
+        copie_b.grade = 'Sergent'
+        copie_b.save(update_fields=['grade'])
+        self.assertEqual((copie_a.version, copie_b.version), (version + 1, version + 2))
+        self.victime.refresh_from_db()
+        self.assertEqual(self.victime.version, version + 2)
+
+    def test_pagination_par_curseur(self):
+        page1, curseur = page_victimes(FicheVictime.objects.all(), taille=3)
+        self.assertEqual(len(page1), 3)
+        page2, suivant = page_victimes(FicheVictime.objects.all(), curseur, taille=3)
+        self.assertIsNone(suivant)
+        self.assertEqual({v.pk for v in page1 + page2}, set(FicheVictime.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(cartes.cartes(page2, 'agent')), 2)
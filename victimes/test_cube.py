@@ -0,0 +1,56 @@
+from io import StringIO
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from victimes import cube
+from victimes.models import CelluleAide, DemandeAide, Famille
+
+User = get_user_model()
+
+
+class CubeAidesTest(TestCase):
+    def setUp(self):
+        self.assistant = User.objects.create_user(username='assist1', password='testpass123', role='assistant')
+        self.kaya = Famille.objects.create(nom_famille='Famille A', ville='Kaya', situation_economique='precaire')
+        self.dori = Famille.objects.create(nom_famille='Famille B', ville='Dori')
+        self.demande = DemandeAide.objects.create(famille=self.kaya, type_demande='scolaire', cree_par=self.assistant)
+        DemandeAide.objects.create(famille=self.kaya, type_demande='logement', cree_par=self.assistant)
+        DemandeAide.objects.create(famille=self.dori, type_demande='scolaire', statut='validee', cree_par=self.assistant)
+
+    def test_mises_a_jour_incrementales(self):
+        self.assertEqual(cube.ecarts(), {})
+        self.demande.statut = 'validee'
+        self.demande.save()
+        self.assertEqual(cube.ecarts(), {})
+        self.kaya.ville = 'Ouahigouya'
+        self.kaya.save()
+        self.assertEqual(cube.ecarts(), {})
+        self.kaya.delete()
+        self.assertEqual(cube.ecarts(), {})
+
+    def test_pivot(self):
+        tableau = cube.pivot('ville', 'statut')
+        self.assertEqual(tableau['lignes'], ['Dori', 'Kaya'])
+        self.assertEqual(tableau['valeurs'][('Kaya', 'soumise')], 2)
+        self.assertEqual(tableau['totaux_colonnes']['validee'], 1)
+        self.assertEqual(tableau['total'], 3)
+        filtre = cube.pivot('type_demande', filtres={'ville': 'Kaya', 'mois': cube.mois_de(timezone.now())})
+        self.assertEqual(filtre['totaux_lignes'], {'scolaire': 1, 'logement': 1})
+
+    def test_commande_verifier(self):
+        CelluleAide.objects.all().delete()
+        with self.assertRaises(Exception):
+            call_command('cube_aides', verifier=True, stdout=StringIO())
+        call_command('cube_aides', stdout=StringIO())
+        self.assertEqual(cube.ecarts(), {})
+
+    def test_rapport_exploration(self):
+        User.objects.create_user(username='resp1', password='testpass123', role='responsable')
+        self.client.login(username='resp1', password='testpass123')
+        response = self.client.get(reverse('rapport_familles_aidees'), {'lignes': 'ville', 'colonnes': 'statut', 'ville': 'Kaya'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['nb_familles'], 1)
+        self.assertEqual(response.context['total_demandes'], 2)
+        self.assertIn('lignes=situation_economique', response.context['rangees'][0]['exploration'])
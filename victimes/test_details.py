@@ -0,0 +1,44 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from victimes.models import FicheVictime, Famille, MembreFamille
+
+User = get_user_model()
+
+
+class VictimeDetailsAjaxTest(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        famille = Famille.objects.create(nom_famille='Famille Test')
+        for i in range(5):
+            MembreFamille.objects.create(famille=famille, nom=f'M{i}', prenom='X', relation_victime='enfant')
+        self.victime = FicheVictime.objects.create(nom='Nom', prenom='P', matricule='INCO1', famille=famille, cree_par=self.agent)
+        self.url = reverse('victime_details_ajax', args=[self.victime.id])
+        self.client.login(username='agent1', password='testpass123')
+
+    def test_nombre_de_requetes_constant(self):
+        # session + utilisateur, ETag, fiche/créateur/famille, membres
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()['victime']['famille']['membres']), 5)
+
+    def test_reponse_304_si_inchangee(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_change_avec_les_membres(self):
+        etag = self.client.get(self.url)['ETag']
+        membre = self.victime.famille.membres.first()
+        membre.prenom = 'Y'
+        membre.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_agent_non_createur(self):
+        User.objects.create_user(username='agent2', password='testpass123', role='agent')
+        self.client.login(username='agent2', password='testpass123')
+        response = self.client.get(self.url)
+        self.assertFalse(response.json()['success'])
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from victimes import doublons, statistiques
+from victimes.models import DocumentVictime, Famille, FicheVictime, TermeRechercheVictime
+
+User = get_user_model()
+
+
+class IncoDoublonsTest(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.autre_agent = User.objects.create_user(username='agent2', password='testpass123', role='agent')
+        self.famille = Famille.objects.create(nom_famille='Famille A')
+        self.conservee = FicheVictime.objects.create(nom='Kaboré', prenom='Issa', matricule='GN-1', cree_par=self.agent)
+        self.doublon = FicheVictime.objects.create(
+            nom='Kabore', prenom='Issa', matricule='gn-1 ', famille=self.famille, cree_par=self.autre_agent,
+        )
+        DocumentVictime.objects.create(victime=self.doublon, type_document='acte_deces', fichier='documents_victimes/a.pdf')
+        FicheVictime.objects.create(nom='Zongo', prenom='Awa', matricule='GN-2', cree_par=self.agent)
+        call_command('stats_snapshot', stdout=StringIO())
+
+    def test_groupes_en_une_requete(self):
+        with self.assertNumQueries(1):
+            groupes = doublons.groupes_doublons()
+        self.assertEqual([(cle, [f['pk'] for f in fiches]) for cle, fiches in groupes],
+                         [('GN-1', [self.conservee.pk, self.doublon.pk])])
+
+    def test_simulation(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'rapport.jsonl')
+            call_command('inco_doublons', '--simulation', '--rapport', chemin, stdout=StringIO())
+            with open(chemin, encoding='utf-8') as fichier:
+                lignes = [json.loads(ligne) for ligne in fichier]
+        self.assertEqual(len(lignes), 1)
+        self.assertEqual(lignes[0]['conservee'], self.conservee.pk)
+        self.assertEqual(lignes[0]['famille_reprise'], self.famille.pk)
+        self.assertEqual(FicheVictime.objects.count(), 3)
+
+    def test_fusion(self):
+        call_command('inco_doublons', stdout=StringIO())
+        self.assertFalse(FicheVictime.objects.filter(pk=self.doublon.pk).exists())
+        self.assertFalse(TermeRechercheVictime.objects.filter(victime_id=self.doublon.pk).exists())
+        self.conservee.refresh_from_db()
+        self.assertEqual(self.conservee.famille, self.famille)
+        self.assertEqual(self.conservee.documents.count(), 1)
+        self.famille.refresh_from_db()
+        self.assertEqual(self.famille.agent_proprietaire, self.agent)
+        self.assertEqual(statistiques.ecarts(), {})
+        self.assertEqual(doublons.groupes_doublons(), [])
@@ -0,0 +1,76 @@
+import csv
+import io
+import zipfile
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from victimes.exports import lignes
+from victimes.models import DemandeAide, Famille, FicheVictime, JournalAction, MembreFamille
+
+User = get_user_model()
+
+
+class ExportsTest(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.autre = User.objects.create_user(username='agent2', password='testpass123', role='agent')
+        User.objects.create_user(username='resp', password='testpass123', role='responsable')
+        famille = Famille.objects.create(nom_famille='Kaboré', ville='Kaya')
+        MembreFamille.objects.create(famille=famille, nom='Kaboré', prenom='Awa', relation_victime='conjoint')
+        for i in range(5):
+            FicheVictime.objects.create(nom=f'Nom{i}', prenom='P', matricule=f'INCO-{i}', famille=famille,
+                                        cree_par=self.agent if i < 3 else self.autre)
+        DemandeAide.objects.create(famille=famille, type_demande='scolaire', statut='validee', description='a & <b>')
+        DemandeAide.objects.create(famille=famille, type_demande='logement')
+
+    def contenu(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_limite_aux_fiches_de_l_agent(self):
+        self.client.login(username='agent1', password='testpass123')
+        response = self.client.get(reverse('export_donnees', args=['victimes', 'csv']))
+        rangees = list(csv.reader(io.StringIO(self.contenu(response).decode('utf-8-sig')), delimiter=';'))
+        self.assertEqual(rangees[0][0], 'INCO')
+        self.assertEqual([r[0] for r in rangees[1:]], ['INCO-0', 'INCO-1', 'INCO-2'])
+        self.assertEqual(rangees[1][3], 'Décédé')
+        self.assertEqual(rangees[1][9], 'Kaboré')
+        response = self.client.get(reverse('export_donnees', args=['demandes', 'csv']))
+        self.assertEqual(response.status_code, 403)
+
+    def test_csv_sans_formule(self):
+        FicheVictime.objects.create(nom='=HYPERLINK("http://x")', prenom='-2+3', lieu_deces='@SUM(A1)',
+                                    matricule='INCO-9', cree_par=self.agent)
+        self.client.login(username='agent1', password='testpass123')
+        response = self.client.get(reverse('export_donnees', args=['victimes', 'csv']))
+        rangees = list(csv.reader(io.StringIO(self.contenu(response).decode('utf-8-sig')), delimiter=';'))
+        rangee = rangees[-1]
+        self.assertEqual(rangee[:3], ['INCO-9', '\'=HYPERLINK("http://x")', "'-2+3"])
+        self.assertEqual(rangee[8], "'@SUM(A1)")
+        # Les dates ne sont pas touchées
+        self.assertFalse(rangee[13].startswith("'"))
+
+    def test_export_admin_journalise(self):
+        User.objects.create_superuser(username='admin1', password='testpass123', role='admin')
+        self.client.login(username='admin1', password='testpass123')
+        response = self.client.post(reverse('admin:victimes_fichevictime_changelist'), {
+            'action': 'exporter_csv',
+            '_selected_action': list(FicheVictime.objects.values_list('pk', flat=True)),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(JournalAction.objects.filter(
+            action="Export de données", details="Export victimes (csv) depuis l'administration",
+        ).exists())
+
+    def test_xlsx_demandes_filtrees(self):
+        self.client.login(username='resp', password='testpass123')
+        response = self.client.get(reverse('export_donnees', args=['demandes', 'xlsx']), {'statut': 'validee'})
+        archive = zipfile.ZipFile(io.BytesIO(self.contenu(response)))
+        self.assertIn('[Content_Types].xml', archive.namelist())
+        feuille = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(feuille.count('<row>'), 2)
+        self.assertIn('a &amp; &lt;b&gt;', feuille)
+        self.assertIn('Aide scolaire', feuille)
+
+    def test_lecture_par_lots(self):
+        valeurs = [r[0] for r in lignes(FicheVictime.objects.all(), 'victimes', taille_lot=2)]
+        self.assertEqual(valeurs, [f'INCO-{i}' for i in range(5)])
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from victimes.models import Famille, FicheVictime, MembreFamille
+from victimes.recherche import rechercher_victimes
+
+
+class ImportVictimesTest(TestCase):
+    def setUp(self):
+        self.dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dossier, ignore_errors=True)
+        FicheVictime.objects.create(nom='Existant', prenom='Deja', matricule='INCO-0')
+
+    def fichier(self, nom, contenu):
+        chemin = os.path.join(self.dossier, nom)
+        with open(chemin, 'w', encoding='utf-8') as f:
+            f.write(contenu)
+        return chemin
+
+    def jsonl(self, enregistrements):
+        return self.fichier('registre.jsonl', '\n'.join(json.dumps(e) for e in enregistrements) + '\n')
+
+    def rejets(self, chemin):
+        with open(f"{chemin}.rejets.jsonl", encoding='utf-8') as f:
+            return [json.loads(ligne) for ligne in f]
+
+    def test_import_jsonl_avec_rejets(self):
+        chemin = self.jsonl([
+            {'matricule': 'INCO-1', 'nom': 'Ouédraogo', 'prenom': 'Issouf', 'date_deces': '12/03/2021',
+             'lieu_deces': '01/02/2020', 'famille': {'ville': 'Kaya', 'adresse': '05/06/2019'},
+             'membres': [{'nom': 'Ouédraogo', 'prenom': 'Awa', 'relation_victime': 'conjoint'}]},
+            {'matricule': 'INCO-2', 'nom': 'Sawadogo', 'prenom': 'Mariam'},
+            {'matricule': 'INCO-0', 'nom': 'Doublon', 'prenom': 'Base'},
+            {'matricule': 'INCO-2', 'nom': 'Doublon', 'prenom': 'Fichier'},
+            {'matricule': 'INCO-3', 'nom': 'X', 'prenom': 'Y', 'statut_victime': 'inconnu'},
+            {'matricule': 'INCO-4', 'nom': 'Kaboré', 'prenom': 'Adama'},
+            # Même INCO pour la contrainte d'unicité de MySQL
+            {'matricule': ' inco-0', 'nom': 'Doublon', 'prenom': 'Casse base'},
+            {'matricule': 'Inco-4 ', 'nom': 'Doublon', 'prenom': 'Casse fichier'},
+        ])
+        call_command('import_victimes', chemin, taille_lot=2, stdout=StringIO())
+        self.assertEqual(FicheVictime.objects.count(), 4)
+        victime = FicheVictime.objects.get(matricule='INCO-1')
+        self.assertEqual(str(victime.date_deces), '2021-03-12')
+        # Texte libre ressemblant à une date : importé tel quel
+        self.assertEqual(victime.lieu_deces, '01/02/2020')
+        self.assertEqual(victime.famille.adresse, '05/06/2019')
+        self.assertEqual(victime.famille.nom_famille, 'Ouédraogo')
+        self.assertEqual(MembreFamille.objects.get().famille, victime.famille)
+        self.assertEqual([r['ligne'] for r in self.rejets(chemin)], [3, 4, 5, 7, 8])
+        # Index de recherche construit malgré bulk_create
+        self.assertEqual(list(rechercher_victimes(FicheVictime.objects.all(), 'ouedr')), [victime])
+        self.assertFalse(os.path.exists(f"{chemin}.reprise"))
+
+    def test_reprise_apres_interruption(self):
+        chemin = self.jsonl([{'matricule': f'INCO-{i}', 'nom': 'N', 'prenom': 'P'} for i in range(1, 7)])
+        # Lignes 1 à 3 déjà importées avant l'interruption
+        for i in range(1, 4):
+            FicheVictime.objects.create(matricule=f'INCO-{i}', nom='N', prenom='P')
+        with open(f"{chemin}.reprise", 'w') as f:
+            json.dump({'derniere_ligne': 3}, f)
+        call_command('import_victimes', chemin, reprendre=True, stdout=StringIO())
+        self.assertEqual(FicheVictime.objects.count(), 7)
+        self.assertEqual(self.rejets(chemin), [])
+
+    def test_import_csv(self):
+        chemin = self.fichier('registre.csv', (
+            'matricule,nom,prenom,famille_nom,famille_ville,membres\n'
+            'INCO-1,Traoré,Salif,Traoré,Banfora,"[{""nom"": ""Traoré"", ""prenom"": ""Ali"", ""relation_victime"": ""enfant""}]"\n'
+            'INCO-2,Zongo,Élise,,,\n'
+        ))
+        call_command('import_victimes', chemin, stdout=StringIO())
+        self.assertEqual(FicheVictime.objects.count(), 3)
+        self.assertEqual(Famille.objects.get().ville, 'Banfora')
+        self.assertEqual(MembreFamille.objects.count(), 1)
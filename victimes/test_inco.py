@@ -0,0 +1,99 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from victimes import inco
+from victimes.models import FicheVictime
+
+User = get_user_model()
+
+
+@override_settings(INCO_CHARGEMENT_EN_FOND=False)
+class SuggestionsIncoTest(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.autre_agent = User.objects.create_user(username='agent2', password='testpass123', role='agent')
+        self.victime = FicheVictime.objects.create(nom='Ouédraogo', prenom='Issouf', matricule='GN-0042', cree_par=self.agent)
+        FicheVictime.objects.create(nom='Zongo', prenom='Awa', matricule='GN-0043', cree_par=self.autre_agent)
+        FicheVictime.objects.create(nom='Sanou', prenom='Salif', matricule='PN-0042', cree_par=self.agent)
+        inco.index.vider()
+        self.addCleanup(inco.index.vider)
+
+    def matricules(self, texte, user=None, limite=inco.LIMITE):
+        return [s['matricule'] for s in inco.suggestions(user or self.agent, texte, limite)]
+
+    def test_prefixe_compact_et_ordre(self):
+        self.assertEqual(self.matricules('gn-004'), ['GN-0042', 'GN-0043'])
+        self.assertTrue(inco.index.pret)
+        self.assertEqual(self.matricules('GN0042'), ['GN-0042'])
+        self.assertEqual(self.matricules('g', limite=1), ['GN-0042'])
+        self.assertEqual(self.matricules('x'), [])
+        self.assertEqual(self.matricules(' - '), [])
+
+    def test_mises_a_jour_du_processus(self):
+        inco.index.charger()
+        FicheVictime.objects.create(nom='Kaboré', prenom='Adama', matricule='GN-0041', cree_par=self.agent)
+        self.victime.matricule = 'GN-9042'
+        self.victime.save()
+        self.assertEqual(self.matricules('gn00'), ['GN-0041', 'GN-0043'])
+        FicheVictime.objects.get(matricule='GN-0043').delete()
+        self.assertEqual(self.matricules('gn'), ['GN-0041', 'GN-9042'])
+        self.assertEqual(len(inco.index), 3)
+
+    def test_ecritures_hors_processus(self):
+        inco.index.charger()
+        # update() et bulk_create ne déclenchent pas les signaux, comme un autre processus
+        FicheVictime.objects.bulk_create([FicheVictime(nom='Traoré', prenom='Mariam', matricule='GN-0044')])
+        FicheVictime.objects.filter(matricule='GN-0043').update(matricule='GN-9043', date_modification=timezone.now())
+        # L'entrée périmée est écartée à la lecture
+        self.assertEqual(self.matricules('gn'), ['GN-0042'])
+        inco.index.synchroniser(forcer=True)
+        self.assertEqual(self.matricules('gn'), ['GN-0042', 'GN-0044', 'GN-9043'])
+
+    @mock.patch.object(inco, 'SEUIL_FUSION', 1)
+    def test_ecriture_en_masse_fusionnee(self):
+        inco.index.charger()
+        FicheVictime.objects.bulk_create([
+            FicheVictime(nom='Traoré', prenom='Mariam', matricule=matricule)
+            for matricule in ('GN-0044', 'GN-0001', 'GN-9999')
+        ])
+        fusionner = inco._fusionner
+
+        def fusionner_pendant_un_enregistrement(*args):
+            # Enregistrement du processus pendant la fusion : la copie fusionnée est abandonnée
+            FicheVictime.objects.create(nom='Kaboré', prenom='Adama', matricule='GN-0045')
+            return fusionner(*args)
+
+        with mock.patch.object(inco, '_fusionner', fusionner_pendant_un_enregistrement):
+            inco.index.synchroniser(forcer=True)
+        self.assertEqual(len(inco.index), 4)
+        # Relue à la synchronisation suivante, avec les autres
+        inco.index.synchroniser(forcer=True)
+        self.assertEqual(self.matricules('gn'), ['GN-0001', 'GN-0042', 'GN-0043', 'GN-0044', 'GN-0045', 'GN-9999'])
+        self.assertEqual(len(inco.index), 7)
+
+    def test_noms_visibles_par_role(self):
+        suggestions = inco.suggestions(self.agent, 'gn')
+        self.assertEqual(suggestions[0]['nom'], 'Issouf Ouédraogo')
+        self.assertEqual(suggestions[0]['url'], reverse('victime_details_ajax', args=[self.victime.pk]))
+        # Un agent voit qu'un INCO existe, pas à qui il appartient
+        self.assertEqual(suggestions[1], {'matricule': 'GN-0043', 'nom': None, 'url': None})
+        assistant = User.objects.create_user(username='assistant1', role='assistant')
+        self.assertEqual(inco.suggestions(assistant, 'gn')[1]['nom'], 'Awa Zongo')
+
+    def test_vue(self):
+        inco.index.charger()
+        self.client.login(username='agent1', password='testpass123')
+        with self.assertNumQueries(3):
+            # session + utilisateur, fiches retenues (la synchronisation vient d'avoir lieu)
+            response = self.client.get(reverse('inco_suggestions'), {'q': 'gn', 'limite': 1})
+        self.assertEqual([s['matricule'] for s in response.json()['suggestions']], ['GN-0042'])
+
+    @override_settings(INCO_CHARGEMENT_EN_FOND=True)
+    def test_repli_sur_la_base_pendant_le_chargement(self):
+        # Chargement en cours dans un autre thread
+        inco.index._thread = type('Chargement', (), {'is_alive': lambda self: True})()
+        self.addCleanup(setattr, inco.index, '_thread', None)
+        self.assertEqual(self.matricules('gn004'), ['GN-0042', 'GN-0043'])
+        self.assertFalse(inco.index.pret)
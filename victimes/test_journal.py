@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from victimes.journal import TamponJournal, journaliser
+from victimes.listing import decoder_curseur, filtrer_journal, page_journal
+from victimes.models import JournalAction
+
+User = get_user_model()
+
+
+class TamponJournalTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.repertoire = tempfile.mkdtemp()
+        self.tampon = TamponJournal(repertoire=self.repertoire, taille_lot=3, delai_max=60)
+
+    def test_vidage_par_lot(self):
+        self.tampon.ajouter(self.user.pk, "Action 1")
+        self.tampon.ajouter(self.user.pk, "Action 2")
+        self.assertFalse(self.tampon.doit_vider())
+        self.assertEqual(self.tampon.vider(force=False), 0)
+        self.tampon.ajouter(self.user.pk, "Action 3")
+        self.assertTrue(self.tampon.doit_vider())
+        with self.assertNumQueries(4):  # auteurs, savepoint, INSERT groupé, libération
+            self.assertEqual(self.tampon.vider(force=False), 3)
+        self.assertEqual(JournalAction.objects.count(), 3)
+        self.assertEqual(self.tampon.etat()['profondeur'], 0)
+        # Les fichiers de secours sont supprimés après écriture
+        self.assertEqual(os.listdir(self.repertoire), [])
+
+    def test_fichier_de_secours_rejoue(self):
+        # Fichier laissé par un processus arrêté (pid inexistant)
+        chemin = os.path.join(self.repertoire, 'journal-999999999-0.jsonl')
+        with open(chemin, 'w', encoding='utf-8') as fichier:
+            fichier.write(json.dumps({
+                'utilisateur_id': self.user.pk, 'action': 'Perdue', 'details': '',
+                'date_action': '2025-01-01T10:00:00+00:00',
+            }) + '\n')
+        self.tampon.vider()
+        self.assertTrue(JournalAction.objects.filter(action='Perdue').exists())
+        self.assertFalse(os.path.exists(chemin))
+
+    def ecrire_secours(self, nom, action):
+        with open(os.path.join(self.repertoire, nom), 'w', encoding='utf-8') as fichier:
+            fichier.write(json.dumps({
+                'utilisateur_id': self.user.pk, 'action': action, 'details': '',
+                'date_action': '2025-01-01T10:00:00+00:00',
+            }) + '\n')
+
+    @override_settings(JOURNAL_INTERVALLE_ORPHELINS=0)
+    def test_fichiers_reclames_et_recherche_periodique(self):
+        # Réclamé par un processus vivant (le parent) : il le rejoue lui-même
+        self.ecrire_secours(f'rejeu-{os.getppid()}-journal-999999998-0.jsonl', 'En cours ailleurs')
+        # Réclamé par un processus arrêté pendant le rejeu : repris
+        self.ecrire_secours('rejeu-999999999-journal-999999998-1.jsonl', 'Interrompue')
+        self.tampon.vider()
+        self.assertEqual(list(JournalAction.objects.values_list('action', flat=True)), ['Interrompue'])
+        self.assertEqual(os.listdir(self.repertoire), [f'rejeu-{os.getppid()}-journal-999999998-0.jsonl'])
+        # Un processus arrêté après le premier vidage : son fichier est repris au vidage suivant
+        self.ecrire_secours('journal-999999999-0.jsonl', 'Plus tard')
+        self.tampon.vider()
+        self.assertTrue(JournalAction.objects.filter(action='Plus tard').exists())
+        # Un second tampon (autre processus) ne rejoue rien deux fois
+        TamponJournal(repertoire=self.repertoire).vider()
+        self.assertEqual(JournalAction.objects.count(), 2)
+
+    def test_fichier_de_secours_tronque(self):
+        # Processus arrêté en pleine écriture : la dernière ligne est incomplète
+        self.ecrire_secours('journal-999999999-0.jsonl', 'Avant la coupure')
+        with open(os.path.join(self.repertoire, 'journal-999999999-0.jsonl'), 'a', encoding='utf-8') as fichier:
+            fichier.write('{"utilisateur_id": %d, "action": "Coup' % self.user.pk)
+        # Ligne illisible au milieu : le fichier est conservé, les autres sont rejoués
+        self.ecrire_secours('journal-999999999-1.jsonl', 'Corrompu')
+        with open(os.path.join(self.repertoire, 'journal-999999999-1.jsonl'), 'r+', encoding='utf-8') as fichier:
+            contenu = fichier.read()
+            fichier.seek(0)
+            fichier.write('###\n' + contenu)
+        self.ecrire_secours('journal-999999999-2.jsonl', 'Fichier suivant')
+        with self.assertLogs('victimes.journal', 'WARNING'):
+            self.tampon.vider()
+        self.assertEqual(
+            sorted(JournalAction.objects.values_list('action', flat=True)), ['Avant la coupure', 'Fichier suivant'],
+        )
+        self.assertEqual(os.listdir(self.repertoire), [f'rejeu-{os.getpid()}-journal-999999999-1.jsonl'])
+
+    def test_utilisateur_supprime(self):
+        autre = User.objects.create_user(username='agent2', password='testpass123')
+        self.tampon.ajouter(autre.pk, "Action orpheline")
+        autre.delete()
+        self.tampon.vider()
+        self.assertIsNone(JournalAction.objects.get(action="Action orpheline").utilisateur)
+
+    @override_settings(JOURNAL_SYNCHRONE=True)
+    def test_mode_synchrone(self):
+        journaliser(self.user, "Immédiate", "détails")
+        self.assertTrue(JournalAction.objects.filter(action="Immédiate").exists())
+
+
+class ConsultationJournalTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin1', password='testpass123', role='admin')
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        base = timezone.make_aware(datetime(2024, 3, 10, 12, 0))
+        # Deux actions par horodatage pour vérifier le départage par id
+        for i in range(10):
+            for user in (self.admin, self.agent):
+                JournalAction.objects.create(utilisateur=user, action=f"Action {i}", date_action=base + timedelta(days=i))
+
+    def test_pages_sans_doublon_ni_trou(self):
+        vues, curseur = [], None
+        while True:
+            page, curseur = page_journal(JournalAction.objects.all(), curseur, taille=3)
+            vues.extend(action.pk for action in page)
+            if curseur is None:
+                break
+        attendu = list(JournalAction.objects.order_by('-date_action', '-pk').values_list('pk', flat=True))
+        self.assertEqual(vues, attendu)
+
+    def test_filtres_par_jour_et_role(self):
+        self.assertEqual(filtrer_journal(date_debut='2024-03-12', date_fin='2024-03-12').count(), 2)
+        self.assertEqual(filtrer_journal(role='agent', date_debut='2024-03-15').count(), 5)
+        self.assertEqual(filtrer_journal(date_debut='pas-une-date').count(), 20)
+
+    def test_vue_journal(self):
+        self.client.login(username='admin1', password='testpass123')
+        response = self.client.get(reverse('journal_actions'), {'user': self.agent.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['actions']), 10)
+        self.assertIsNone(response.context['curseur_suivant'])
+
+    def test_curseur_invalide(self):
+        self.client.login(username='admin1', password='testpass123')
+        for curseur in ('99999999999999999999999-1', '1-99999999999999999999999', 'abc', '1-2-3'):
+            self.assertIsNone(decoder_curseur(curseur))
+            # Curseur ignoré : première page
+            response = self.client.get(reverse('journal_actions'), {'avant': curseur})
+            self.assertEqual(len(response.context['actions']), 20)
+            response = self.client.get(reverse('victime_list'), {'avant': curseur})
+            self.assertEqual(response.status_code, 200)
+
+    def test_commande_purge(self):
+        call_command('journal_partitions', purger_avant='2024-03', stdout=StringIO())
+        self.assertEqual(JournalAction.objects.count(), 20)
+        JournalAction.objects.create(utilisateur=self.admin, action="Ancienne",
+                                     date_action=timezone.make_aware(datetime(2024, 2, 1)))
+        call_command('journal_partitions', purger_avant='2024-03', stdout=StringIO())
+        self.assertEqual(JournalAction.objects.count(), 20)
@@ -0,0 +1,54 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from victimes.listing import page_familles
+from victimes.models import FicheVictime, DemandeAide, Famille, MembreFamille
+
+User = get_user_model()
+
+
+class FamilleListingTest(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.autre_agent = User.objects.create_user(username='agent2', password='testpass123', role='agent')
+        self.responsable = User.objects.create_user(username='resp1', password='testpass123', role='responsable')
+        for i in range(6):
+            famille = Famille.objects.create(nom_famille=f'Famille {i}')
+            createur = self.agent if i % 2 == 0 else self.autre_agent
+            FicheVictime.objects.create(nom=f'Nom{i}', prenom='P', matricule=f'INCO{i}', famille=famille, cree_par=createur)
+            for j in range(i):
+                MembreFamille.objects.create(famille=famille, nom=f'M{j}', prenom='X', relation_victime='enfant')
+                DemandeAide.objects.create(famille=famille, type_demande='scolaire')
+
+    def test_compteurs_et_apercus(self):
+        familles, curseur = page_familles(self.responsable)
+        self.assertIsNone(curseur)
+        self.assertEqual(len(familles), 6)
+        derniere = familles[-1]
+        self.assertEqual(derniere.nb_victimes, 1)
+        self.assertEqual(derniere.nb_membres, 5)
+        self.assertEqual(derniere.nb_demandes, 5)
+        self.assertEqual(len(derniere.membres_apercu), 3)
+        self.assertEqual(len(derniere.demandes_apercu), 2)
+
+    def test_portee_agent(self):
+        familles, _ = page_familles(self.agent)
+        self.assertEqual([f.nom_famille for f in familles], ['Famille 0', 'Famille 2', 'Famille 4'])
+
+    def test_pagination_par_curseur(self):
+        page1, curseur = page_familles(self.responsable, taille=4)
+        self.assertEqual(len(page1), 4)
+        page2, curseur2 = page_familles(self.responsable, apres=curseur, taille=4)
+        self.assertEqual(len(page2), 2)
+        self.assertIsNone(curseur2)
+
+    def test_nombre_de_requetes_constant(self):
+        # 1 requête principale + 3 préchargements, quel que soit le nombre de familles
+        with self.assertNumQueries(4):
+            page_familles(self.responsable)
+
+    def test_vue_famille_list(self):
+        self.client.login(username='agent1', password='testpass123')
+        response = self.client.get(reverse('famille_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['familles']), 3)
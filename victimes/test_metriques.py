@@ -0,0 +1,78 @@
+import os
+import re
+import tempfile
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from victimes import metriques
+from victimes.journal import TamponJournal
+from victimes.models import Famille, FicheVictime
+
+User = get_user_model()
+
+
+class MetriquesTest(TestCase):
+    def setUp(self):
+        repertoire = tempfile.TemporaryDirectory()
+        self.addCleanup(repertoire.cleanup)
+        reglages = override_settings(METRIQUES_FICHIER=os.path.join(repertoire.name, 'metriques.sqlite3'))
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        metriques.registre._valeurs.clear()
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        User.objects.create_user(username='admin1', password='testpass123', role='admin')
+        famille = Famille.objects.create(nom_famille='Famille A')
+        FicheVictime.objects.create(nom='A', prenom='A', matricule='I1', famille=famille, cree_par=self.agent)
+
+    def valeur(self, texte, serie):
+        ligne = re.search(rf'^{re.escape(serie)} (\S+)$', texte, re.M)
+        return float(ligne.group(1)) if ligne else None
+
+    def exposition(self):
+        self.client.login(username='admin1', password='testpass123')
+        response = self.client.get(reverse('metriques'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_mesures_par_vue(self):
+        self.client.login(username='agent1', password='testpass123')
+        page = self.client.get(reverse('famille_list'))
+        export = b''.join(self.client.get(reverse('export_donnees', args=['victimes', 'csv'])).streaming_content)
+        texte = self.exposition()
+        self.assertIn('# TYPE gendarmerie_requete_duree_secondes histogram', texte)
+        self.assertEqual(self.valeur(texte, 'gendarmerie_requete_duree_secondes_bucket{vue="famille_list",le="+Inf"}'), 1)
+        self.assertEqual(self.valeur(texte, 'gendarmerie_reponses_total{vue="famille_list",statut="2xx"}'), 1)
+        self.assertGreater(self.valeur(texte, 'gendarmerie_sql_requetes_total{vue="famille_list"}'), 0)
+        self.assertGreater(self.valeur(texte, 'gendarmerie_gabarits_duree_secondes_total{vue="famille_list"}'), 0)
+        self.assertEqual(self.valeur(texte, 'gendarmerie_reponse_octets_total{vue="famille_list"}'), len(page.content))
+        # Réponse en flux : mesurée jusqu'à la fin de l'envoi
+        self.assertEqual(self.valeur(texte, 'gendarmerie_reponse_octets_total{vue="export_donnees"}'), len(export))
+        self.assertGreater(self.valeur(texte, 'gendarmerie_sql_requetes_total{vue="export_donnees"}'), 0)
+
+    def test_cumul_entre_processus(self):
+        # Deux processus (registres) ajoutent leurs mesures à la même base
+        for _ in range(2):
+            registre = metriques.Registre()
+            registre.observer('famille_list', 200, 0.2, metriques._Mesure(), 100)
+            registre.envoyer()
+        texte = self.exposition()
+        self.assertEqual(self.valeur(texte, 'gendarmerie_requete_duree_secondes_bucket{vue="famille_list",le="0.1"}'), 0)
+        self.assertEqual(self.valeur(texte, 'gendarmerie_requete_duree_secondes_bucket{vue="famille_list",le="0.25"}'), 2)
+        self.assertEqual(self.valeur(texte, 'gendarmerie_reponse_octets_total{vue="famille_list"}'), 200)
+
+    def test_tampon_du_journal(self):
+        tampon = TamponJournal(repertoire=tempfile.mkdtemp(), taille_lot=3, delai_max=60)
+        for i in range(3):
+            tampon.ajouter(self.agent.pk, f"Action {i}")
+        tampon.vider()
+        tampon.ajouter(self.agent.pk, "En attente")
+        texte = self.exposition()
+        self.assertEqual(self.valeur(texte, 'gendarmerie_journal_entrees_ajoutees_total'), 4)
+        self.assertEqual(self.valeur(texte, 'gendarmerie_journal_entrees_ecrites_total'), 3)
+        self.assertEqual(self.valeur(texte, 'gendarmerie_journal_vidage_duree_secondes_bucket{le="+Inf"}'), 1)
+        totaux = metriques.totaux('journal_entrees_ajoutees_total', 'journal_echecs_total')
+        self.assertEqual(totaux, {'journal_entrees_ajoutees_total': 4, 'journal_echecs_total': 0})
+
+    def test_reserve_aux_administrateurs(self):
+        self.client.login(username='agent1', password='testpass123')
+        self.assertEqual(self.client.get(reverse('metriques')).status_code, 403)
@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from victimes.miniatures import RENDUS, chemin_miniature, generer_miniatures, url_miniature
+from victimes.models import FicheVictime
+
+
+def photo_jpeg(nom='photo.jpg', taille=(3000, 2000)):
+    tampon = BytesIO()
+    Image.new('RGB', taille, (120, 80, 40)).save(tampon, 'JPEG')
+    return SimpleUploadedFile(nom, tampon.getvalue(), content_type='image/jpeg')
+
+
+class MiniaturesTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+
+    def test_generees_a_l_enregistrement(self):
+        victime = FicheVictime.objects.create(nom='N', prenom='P', matricule='INCO1', photo=photo_jpeg())
+        for rendu, (largeur, hauteur) in RENDUS.items():
+            chemin = chemin_miniature(victime.photo.name, rendu)
+            self.assertTrue(default_storage.exists(chemin))
+            with default_storage.open(chemin) as fichier:
+                image = Image.open(fichier)
+                self.assertLessEqual(image.width, largeur)
+                self.assertLessEqual(image.height, hauteur)
+        self.assertTrue(url_miniature(victime.photo, 'carte').endswith('.jpg'))
+
+    def test_remplacement_de_photo(self):
+        victime = FicheVictime.objects.create(nom='N', prenom='P', matricule='INCO1', photo=photo_jpeg('a.jpg'))
+        ancienne = victime.photo.name
+        victime = FicheVictime.objects.get(pk=victime.pk)
+        victime.photo = photo_jpeg('b.jpg')
+        victime.save()
+        self.assertFalse(default_storage.exists(chemin_miniature(ancienne, 'carte')))
+        self.assertTrue(default_storage.exists(chemin_miniature(victime.photo.name, 'carte')))
+
+    def test_commande_et_generation_paresseuse(self):
+        victime = FicheVictime.objects.create(nom='N', prenom='P', matricule='INCO1', photo=photo_jpeg())
+        chemin = chemin_miniature(victime.photo.name, 'avatar')
+        default_storage.delete(chemin)
+        call_command('miniatures', processus=1, stdout=StringIO())
+        self.assertTrue(default_storage.exists(chemin))
+        default_storage.delete(chemin)
+        self.assertTrue(url_miniature(victime.photo, 'avatar').endswith(chemin))
+        self.assertTrue(default_storage.exists(chemin))
+
+    def test_photos_de_meme_nom_de_base(self):
+        noms = ['photos_victimes/a/x.png', 'photos_victimes/b/x.jpg', 'photos_victimes/x.webp']
+        couleurs = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+        for nom, couleur in zip(noms, couleurs):
+            tampon = BytesIO()
+            Image.new('RGB', (400, 300), couleur).save(tampon, 'PNG')
+            default_storage.save(nom, SimpleUploadedFile(nom, tampon.getvalue()))
+            generer_miniatures(nom, ['avatar'])
+        chemins = [chemin_miniature(nom, 'avatar') for nom in noms]
+        self.assertEqual(len(set(chemins)), 3)
+        for chemin, couleur in zip(chemins, couleurs):
+            with default_storage.open(chemin) as fichier:
+                pixel = Image.open(fichier).getpixel((10, 10))
+            # Chaque miniature garde la couleur dominante de sa propre photo
+            self.assertEqual(couleur.index(255), pixel.index(max(pixel)))
@@ -1,7 +1,8 @@
+from datetime import date, timedelta
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from victimes.models import FicheVictime, DemandeAide, Famille
+from victimes.models import FicheVictime, DemandeAide, Famille, MembreFamille
 
 User = get_user_model()
 
@@ -31,4 +32,61 @@ class DemandeAideValidationFunctionalTest(TestCase):
         self.assertEqual(response.status_code, 302)  # Redirection après validation
         self.assertEqual(self.demande.statut, 'validee')
         print("\033[92mSuccès : Demande d'aide validée avec succès\033[0m")
-        print("\033[92mOK\033[0m")
\ No newline at end of file
+        print("\033[92mOK\033[0m")
+
+
+class MembreFamilleAgeTest(TestCase):
+    def setUp(self):
+        self.famille = Famille.objects.create(nom_famille='Famille Test')
+        aujourd_hui = date.today()
+        naissances = [None, aujourd_hui, date(2008, 2, 29)]
+        for annees in (5, 6, 12, 18, 19, 45, 70):
+            il_y_a = aujourd_hui.replace(year=aujourd_hui.year - annees, day=min(aujourd_hui.day, 28))
+            naissances += [il_y_a - timedelta(days=1), il_y_a, il_y_a + timedelta(days=1)]
+        for i, naissance in enumerate(naissances):
+            MembreFamille.objects.create(famille=self.famille, nom='M', prenom=str(i), date_naissance=naissance,
+                                         relation_victime='enfant')
+
+    def test_age_calcule_en_base_identique_a_la_propriete(self):
+        for membre in MembreFamille.objects.with_age():
+            self.assertEqual(membre.age_calcule, membre.age)
+
+    def test_age_between(self):
+        membres = list(MembreFamille.objects.all())
+        attendus = {m.pk for m in membres if m.age is not None and 6 <= m.age <= 18}
+        self.assertEqual(set(MembreFamille.objects.age_between(6, 18).values_list('pk', flat=True)), attendus)
+        attendus = {m.pk for m in membres if m.age is not None and m.age >= 45}
+        self.assertEqual(set(MembreFamille.objects.age_between(45).values_list('pk', flat=True)), attendus)
+
+    def test_29_fevrier(self):
+        membre = MembreFamille.objects.get(date_naissance=date(2008, 2, 29))
+        for reference, age in ((date(2026, 2, 28), 17), (date(2026, 3, 1), 18), (date(2024, 2, 29), 16)):
+            self.assertEqual(MembreFamille.objects.with_age(reference).get(pk=membre.pk).age_calcule, age)
+            self.assertTrue(MembreFamille.objects.age_between(age, age, reference).filter(pk=membre.pk).exists())
+
+    def test_age_buckets_en_une_requete(self):
+        with self.assertNumQueries(1):
+            tranches = MembreFamille.objects.age_buckets()
+        attendu = {}
+        for membre in MembreFamille.objects.all():
+            if membre.age is None:
+                cle = None
+            else:
+                debut = max(b for b in (0, 6, 12, 18, 25, 40, 60) if b <= membre.age)
+                cle = {0: '0-5', 6: '6-11', 12: '12-17', 18: '18-24', 25: '25-39', 40: '40-59', 60: '60+'}[debut]
+            attendu[cle] = attendu.get(cle, 0) + 1
+        self.assertEqual({k: v for k, v in tranches.items() if v}, attendu)
+
+    def test_recherche_admin_par_age(self):
+        from django.contrib import admin
+        modele_admin = admin.site._registry[MembreFamille]
+        MembreFamille.objects.filter(date_naissance=date.today()).update(ville='Kaya')
+        membres = list(MembreFamille.objects.all())
+        for saisie, age_min, age_max in (('18', 18, 18), ('6-18', 6, 18), ('18 - 6', 6, 18)):
+            resultats, doublons = modele_admin.get_search_results(None, MembreFamille.objects.all(), saisie)
+            attendus = {m.pk for m in membres if m.age is not None and age_min <= m.age <= age_max}
+            self.assertEqual(set(resultats.values_list('pk', flat=True)), attendus)
+            self.assertFalse(doublons)
+            self.assertNotIn('django_datetime_extract', str(resultats.query))
+        resultats, _ = modele_admin.get_search_results(None, MembreFamille.objects.all(), 'kaya 0-1')
+        self.assertEqual(resultats.count(), 1)
@@ -0,0 +1,62 @@
+from io import StringIO
+from unittest import mock
+from django.test import TestCase
+from django.core.management import call_command
+from victimes import rattrapages
+from victimes.models import Famille, MembreFamille, PointReprise
+
+
+class _Interrompu(rattrapages.VillesMembres):
+    nom = 'villes_interrompu'
+
+    def transformer(self, membre, rang):
+        if rang == 5 and not getattr(self, 'relance', False):
+            raise RuntimeError("arrêt")
+        return super().transformer(membre, rang)
+
+
+class RattrapageTest(TestCase):
+    def setUp(self):
+        famille = Famille.objects.create(nom_famille='Famille A')
+        MembreFamille.objects.bulk_create([
+            MembreFamille(famille=famille, nom='Zongo', prenom=f"M{i}", relation_victime='enfant')
+            for i in range(10)
+        ])
+        self.membres = list(MembreFamille.objects.order_by('pk'))
+
+    def test_villes_et_liens(self):
+        call_command('rattrapage', 'villes_membres', '--taille-lot', '3', '--debit', '0', stdout=StringIO())
+        valeurs = list(MembreFamille.objects.order_by('pk').values_list('ville', 'lien_parente', 'prenom'))
+        self.assertEqual(valeurs[0], ('Ouagadougou', 'Père', 'M0'))
+        self.assertEqual(valeurs[9], ('Bobo-Dioulasso', 'Mère', 'M9'))
+        point = PointReprise.objects.get(nom='villes_membres')
+        self.assertEqual((point.nb_lues, point.nb_modifiees, point.termine), (10, 10, True))
+        # Rien à réécrire au second passage
+        self.assertEqual(rattrapages.simuler(rattrapages.VillesMembres()), (10, 0))
+
+    def test_ages_premiers_membres(self):
+        MembreFamille.objects.update(date_naissance='2000-01-01')
+        MembreFamille.objects.filter(pk=self.membres[0].pk).update(date_naissance=None)
+        point = rattrapages.executer(rattrapages.AgesMembres(), debit=0)
+        self.assertEqual((point.nb_lues, point.nb_modifiees), (8, 8))
+        self.assertEqual(str(MembreFamille.objects.get(pk=self.membres[1].pk).date_naissance), '2016-03-15')
+        self.assertEqual(str(MembreFamille.objects.get(pk=self.membres[9].pk).date_naissance), '2000-01-01')
+
+    def test_reprise_apres_interruption(self):
+        rattrapage = _Interrompu()
+        with self.assertRaises(RuntimeError):
+            rattrapages.executer(rattrapage, taille_lot=3, debit=0)
+        point = PointReprise.objects.get(nom='villes_interrompu')
+        self.assertEqual((point.nb_lues, point.dernier_pk), (3, self.membres[2].pk))
+        self.assertEqual(MembreFamille.objects.filter(ville='').count(), 7)
+
+        rattrapage.relance = True
+        point = rattrapages.executer(rattrapage, taille_lot=3, debit=0)
+        self.assertEqual((point.nb_lues, point.nb_modifiees), (10, 10))
+        self.assertEqual(MembreFamille.objects.get(pk=self.membres[5].pk).ville, 'Dédougou')
+
+    def test_debit_limite(self):
+        with mock.patch('victimes.rattrapages.time.sleep') as attente:
+            rattrapages.executer(rattrapages.VillesMembres(), taille_lot=4, debit=10)
+        self.assertEqual(attente.call_count, 2)
+        self.assertGreater(attente.call_args_list[0].args[0], 0.3)
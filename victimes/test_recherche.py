@@ -0,0 +1,31 @@
+from django.test import TestCase
+from victimes.models import FicheVictime, TermeRechercheVictime
+from victimes.recherche import decouper, rechercher_victimes
+
+
+class RechercheVictimeTest(TestCase):
+    def setUp(self):
+        self.victime = FicheVictime.objects.create(nom='Ouédraogo', prenom='Aminata', matricule='GN-0042')
+        FicheVictime.objects.create(nom='Sawadogo', prenom='Issouf', matricule='GN-0043')
+
+    def test_normalisation(self):
+        self.assertEqual(decouper('Dédougou  OUÉDRAOGO-Aïcha'), ['dedougou', 'ouedraogo', 'aicha'])
+
+    def test_cle_persistee(self):
+        self.assertEqual(self.victime.cle_recherche, 'gn 0042 ouedraogo aminata gn0042')
+
+    def test_recherche_insensible_aux_accents(self):
+        resultats = rechercher_victimes(FicheVictime.objects.all(), 'ouedr')
+        self.assertEqual(list(resultats), [self.victime])
+
+    def test_recherche_multi_termes_et_inco(self):
+        self.assertEqual(list(rechercher_victimes(FicheVictime.objects.all(), 'ami OUE')), [self.victime])
+        self.assertEqual(list(rechercher_victimes(FicheVictime.objects.all(), 'gn0042')), [self.victime])
+        self.assertEqual(rechercher_victimes(FicheVictime.objects.all(), 'gn 004').count(), 2)
+
+    def test_reindexation_apres_modification(self):
+        self.victime.nom = 'Kaboré'
+        self.victime.save()
+        self.assertFalse(rechercher_victimes(FicheVictime.objects.all(), 'ouedraogo').exists())
+        self.assertTrue(rechercher_victimes(FicheVictime.objects.all(), 'kabore').exists())
+        self.assertFalse(TermeRechercheVictime.objects.filter(terme='ouedraogo').exists())
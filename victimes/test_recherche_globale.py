@@ -0,0 +1,90 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from victimes import recherche_globale
+from victimes.models import DemandeAide, Famille, FicheVictime, MembreFamille, TermeRecherche
+
+User = get_user_model()
+
+
+class RechercheGlobaleTest(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.autre_agent = User.objects.create_user(username='agent2', password='testpass123', role='agent')
+        self.assistant = User.objects.create_user(username='assistant1', password='testpass123', role='assistant')
+        self.famille = Famille.objects.create(nom_famille='Famille Sawadogo', telephone='70 12 34 56')
+        self.victime = FicheVictime.objects.create(
+            nom='Ouédraogo', prenom='Issouf', matricule='GN-0042', lieu_deces='Dédougou',
+            famille=self.famille, cree_par=self.agent,
+        )
+        self.membre = MembreFamille.objects.create(
+            famille=self.famille, nom='Ouédraogo', prenom='Awa', relation_victime='enfant', telephone='76 00 11 22',
+        )
+        self.demande = DemandeAide.objects.create(
+            famille=self.famille, type_demande='scolaire', description="Fournitures pour Awa", cree_par=self.assistant,
+        )
+
+    def ids(self, user, texte):
+        return {
+            groupe['type']: [resultat['id'] for resultat in groupe['resultats']]
+            for groupe in recherche_globale.rechercher(user, texte)
+        }
+
+    def test_index_mis_a_jour(self):
+        self.assertEqual(self.ids(self.agent, 'gn0042'), {'victime': [self.victime.pk]})
+        self.assertEqual(self.ids(self.agent, '70123456'), {'famille': [self.famille.pk]})
+        self.assertEqual(self.ids(self.agent, 'dedou'), {'victime': [self.victime.pk]})
+        self.victime.lieu_deces = 'Kaya'
+        self.victime.save()
+        self.assertEqual(self.ids(self.agent, 'dedou'), {})
+        self.membre.delete()
+        self.assertFalse(TermeRecherche.objects.filter(type_objet='membre').exists())
+
+    def test_classement_et_tous_les_termes(self):
+        FicheVictime.objects.create(nom='Ouédraogos', prenom='Issa', matricule='GN-0043', cree_par=self.agent)
+        groupes = recherche_globale.rechercher(self.agent, 'ouedraogo')
+        # Nom identique avant simple préfixe ; à score égal, les fiches avant les membres
+        self.assertEqual([groupe['type'] for groupe in groupes], ['victime', 'membre'])
+        self.assertEqual(groupes[0]['resultats'][0]['id'], self.victime.pk)
+        self.assertEqual(groupes[0]['total'], 2)
+        self.assertEqual(self.ids(self.agent, 'ouedraogo awa'), {'membre': [self.membre.pk]})
+        # Sans terme rare, toutes les lignes des termes saisis sont regroupées
+        with mock.patch.object(recherche_globale, 'SEUIL_PILOTE', 0):
+            self.assertEqual(self.ids(self.agent, 'ouedraogo awa'), {'membre': [self.membre.pk]})
+
+    def test_terme_courant_sans_plafond(self):
+        DemandeAide.objects.bulk_create(
+            DemandeAide(famille=self.famille, type_demande='medicale', description='Ouédraogo', cree_par=self.assistant)
+            for _ in range(1500)
+        )
+        recherche_globale.reconstruire()
+        FicheVictime.objects.create(nom='Ouédraogo', prenom='Issa', matricule='GN-0044', cree_par=self.agent)
+        groupes = {groupe['type']: groupe for groupe in recherche_globale.rechercher(self.assistant, 'ouedraogo')}
+        self.assertEqual(groupes['demande']['total'], 1500)
+        self.assertEqual(groupes['victime']['total'], 2)
+        # Le terme rare (issa) n'est pas noyé sous les lignes du terme courant
+        self.assertEqual(self.ids(self.assistant, 'ouedraogo issa'), {'victime': [FicheVictime.objects.get(matricule='GN-0044').pk]})
+        self.assertEqual(self.ids(self.autre_agent, 'ouedraogo issa'), {})
+
+    def test_portee_par_role(self):
+        self.assertEqual(self.ids(self.autre_agent, 'ouedraogo'), {})
+        # Les agents ne voient pas les demandes, les assistants si
+        self.assertNotIn('demande', self.ids(self.agent, 'awa'))
+        self.assertEqual(self.ids(self.assistant, 'fournitures'), {'demande': [self.demande.pk]})
+
+    def test_vue(self):
+        self.client.login(username='agent1', password='testpass123')
+        with self.assertNumQueries(7):
+            # session + utilisateur, correspondances, puis par type (victimes, membres) : périmètre de l'agent, affichage
+            response = self.client.get(reverse('recherche_globale'), {'q': 'Ouédraogo'})
+        groupes = response.json()['groupes']
+        self.assertEqual(groupes[0]['resultats'][0]['url'], reverse('victime_details_ajax', args=[self.victime.pk]))
+
+    def test_reconstruire_apres_ecriture_en_masse(self):
+        Famille.objects.bulk_create([Famille(nom_famille='Famille Zongo')])
+        self.assertEqual(recherche_globale.ecarts(), {'famille': 2})
+        recherche_globale.reconstruire()
+        self.assertEqual(recherche_globale.ecarts(), {})
+        self.assertEqual(len(self.ids(self.agent, 'zongo')), 0)
+        self.assertEqual(len(self.ids(self.assistant, 'zongo')['famille']), 1)
@@ -0,0 +1,74 @@
+import contextvars
+from unittest import mock
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.http import HttpResponse
+from victimes import replicas
+from victimes.models import FicheVictime
+
+routeur = replicas.RouteurReplicas()
+
+
+def dans_un_contexte(fonction):
+    """Exécute le test dans un contexte neuf (état du routeur isolé)."""
+    def _test(self):
+        return contextvars.copy_context().run(fonction, self)
+    return _test
+
+
+@override_settings(DATABASES_REPLICAS=['replica'], REPLICA_RETARD_MAX=5)
+class RouteurReplicasTest(SimpleTestCase):
+    def setUp(self):
+        replicas._retards.clear()
+        patcher = mock.patch.object(replicas, 'retard', return_value=0)
+        self.retard = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(replicas._retards.clear)
+
+    @dans_un_contexte
+    def test_lectures_designees_seulement(self):
+        self.assertIsNone(routeur.db_for_read(FicheVictime))
+        with replicas.sur_replica():
+            self.assertEqual(routeur.db_for_read(FicheVictime), 'replica')
+        self.assertEqual(routeur.db_for_write(FicheVictime), 'default')
+
+    @dans_un_contexte
+    def test_relecture_apres_ecriture(self):
+        with replicas.sur_replica():
+            routeur.db_for_write(FicheVictime)
+            self.assertIsNone(routeur.db_for_read(FicheVictime))
+
+    @dans_un_contexte
+    def test_replica_en_retard_ou_injoignable(self):
+        self.retard.return_value = 30
+        with replicas.sur_replica():
+            self.assertIsNone(routeur.db_for_read(FicheVictime))
+        replicas._retards.clear()
+        self.retard.return_value = None
+        with replicas.sur_replica():
+            self.assertIsNone(routeur.db_for_read(FicheVictime))
+
+    @dans_un_contexte
+    def test_retard_verifie_periodiquement(self):
+        with replicas.sur_replica():
+            for _ in range(5):
+                routeur.db_for_read(FicheVictime)
+        self.assertEqual(self.retard.call_count, 1)
+
+    @dans_un_contexte
+    def test_lecture_collante_apres_post(self):
+        lectures = []
+
+        @replicas.lecture_replica
+        def vue(request):
+            lectures.append(routeur.db_for_read(FicheVictime))
+            return HttpResponse()
+
+        middleware = replicas.ReplicaMiddleware(vue)
+        fabrique = RequestFactory()
+        middleware(fabrique.get('/'))
+        reponse = middleware(fabrique.post('/'))
+        self.assertIn(replicas.COOKIE_PRIMAIRE, reponse.cookies)
+        requete = fabrique.get('/')
+        requete.COOKIES[replicas.COOKIE_PRIMAIRE] = '1'
+        middleware(requete)
+        self.assertEqual(lectures, ['replica', None, None])
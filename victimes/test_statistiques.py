@@ -0,0 +1,58 @@
+from io import StringIO
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from victimes import statistiques
+from victimes.models import FicheVictime, DemandeAide, Famille
+
+User = get_user_model()
+
+
+class StatsSnapshotTest(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.assistant = User.objects.create_user(username='assist1', password='testpass123', role='assistant')
+        self.famille = Famille.objects.create(nom_famille='Famille A')
+        self.autre_famille = Famille.objects.create(nom_famille='Famille B')
+        FicheVictime.objects.create(nom='A', prenom='A', matricule='I1', famille=self.famille, cree_par=self.agent)
+        FicheVictime.objects.create(nom='B', prenom='B', matricule='I2', cree_par=self.agent)
+        self.demande = DemandeAide.objects.create(famille=self.famille, type_demande='scolaire', cree_par=self.assistant)
+        DemandeAide.objects.create(famille=self.famille, type_demande='logement', cree_par=self.assistant)
+        call_command('stats_snapshot', stdout=StringIO())
+
+    def test_reconstruction_identique_aux_agregations(self):
+        stats = statistiques.stats_responsable()
+        self.assertEqual(stats['total_victimes_resp'], 2)
+        self.assertEqual(stats['victimes_avec_famille'], 1)
+        self.assertEqual(stats['demandes_en_attente'], 2)
+        self.assertEqual(stats['familles_avec_demandes'], 1)
+
+    def test_mises_a_jour_incrementales(self):
+        self.demande.statut = 'validee'
+        self.demande.save()
+        victime = FicheVictime.objects.get(matricule='I2')
+        victime.famille = self.autre_famille
+        victime.save()
+        DemandeAide.objects.create(famille=self.autre_famille, type_demande='autre', cree_par=self.assistant)
+        self.assertEqual(statistiques.ecarts(), {})
+        stats = statistiques.stats_assistant(self.assistant)
+        self.assertEqual(stats['mes_demandes'], 3)
+        self.assertEqual(stats['demandes_validees'], 1)
+
+    def test_suppression_en_cascade(self):
+        # Deux demandes supprimées en lot avec la famille : un seul décrément
+        self.famille.delete()
+        self.assertEqual(statistiques.ecarts(), {})
+        self.assertEqual(statistiques.stats_responsable()['familles_avec_demandes'], 0)
+
+    def test_snapshot_lu_en_une_requete(self):
+        with self.assertNumQueries(1):
+            statistiques.stats_responsable()
+
+    def test_dashboard_responsable(self):
+        User.objects.create_user(username='resp1', password='testpass123', role='responsable')
+        self.client.login(username='resp1', password='testpass123')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_demandes'], 2)
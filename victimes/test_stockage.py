@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from victimes.stockage import StockageDedupliquant
+
+
+class StockageDedupliquantTest(SimpleTestCase):
+    def setUp(self):
+        self.racine = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.racine, ignore_errors=True)
+        self.stockage = StockageDedupliquant(location=self.racine)
+
+    def test_contenu_identique_stocke_une_fois(self):
+        a = self.stockage.save('actes_deces/acte.pdf', ContentFile(b'%PDF identique'))
+        b = self.stockage.save('actes_deces/acte.pdf', ContentFile(b'%PDF identique'))
+        c = self.stockage.save('documents_victimes/autre.pdf', ContentFile(b'%PDF different'))
+        self.assertNotEqual(a, b)
+        self.assertTrue(os.path.samefile(self.stockage.path(a), self.stockage.path(b)))
+        self.assertEqual(len(list(self.stockage.blobs())), 2)
+        with self.stockage.open(b) as fichier:
+            self.assertEqual(fichier.read(), b'%PDF identique')
+        self.assertFalse(os.path.samefile(self.stockage.path(a), self.stockage.path(c)))
+
+    def test_blob_supprime_avec_la_derniere_reference(self):
+        a = self.stockage.save('actes_deces/acte.pdf', ContentFile(b'contenu'))
+        b = self.stockage.save('photos_victimes/acte.pdf', ContentFile(b'contenu'))
+        self.stockage.delete(a)
+        self.assertEqual(len(list(self.stockage.blobs())), 1)
+        self.stockage.delete(b)
+        self.assertEqual(list(self.stockage.blobs()), [])
+
+    def test_commande_de_deduplication(self):
+        for nom in ('actes_deces/a.png', 'actes_deces/a_PhMCpFw.png', 'documents_victimes/a.png'):
+            os.makedirs(os.path.dirname(os.path.join(self.racine, nom)), exist_ok=True)
+            with open(os.path.join(self.racine, nom), 'wb') as fichier:
+                fichier.write(b'x' * 2048)
+        with override_settings(MEDIA_ROOT=self.racine):
+            sortie = StringIO()
+            call_command('media_dedupliquer', '--simulation', stdout=sortie)
+            self.assertIn('4.0 Ko récupérable', sortie.getvalue())
+            sortie = StringIO()
+            call_command('media_dedupliquer', stdout=sortie)
+            self.assertIn('2 doublon(s) fusionné(s)', sortie.getvalue())
+            self.assertIn('4.0 Ko récupéré', sortie.getvalue())
+        self.assertEqual(os.stat(os.path.join(self.racine, 'actes_deces/a.png')).st_nlink, 4)
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from victimes import cube, statistiques, synthetique
+from victimes.models import DemandeAide, Famille, FicheVictime, MembreFamille, User
+
+
+class GenerateurDonneesTest(TestCase):
+    def _instantane(self):
+        return (
+            list(FicheVictime.objects.order_by('matricule').values_list('matricule', 'nom', 'prenom', 'date_creation', 'famille__nom_famille')),
+            list(MembreFamille.objects.order_by('famille__nom_famille', 'prenom', 'date_naissance').values_list('famille__nom_famille', 'prenom', 'date_naissance')),
+            list(DemandeAide.objects.order_by('famille__nom_famille', 'date_creation').values_list('famille__nom_famille', 'type_demande', 'statut')),
+        )
+
+    def test_deterministe_et_coherent(self):
+        volumes = synthetique.GenerateurDonnees(60, graine=7, taille_lot=25).generer()
+        self.assertEqual(volumes['victimes'], 60)
+        self.assertEqual(FicheVictime.objects.count(), 60)
+        self.assertEqual(Famille.objects.count(), volumes['familles'])
+        premier = self._instantane()
+        # Agrégats dérivés reconstruits, termes de recherche indexés
+        self.assertEqual(cube.ecarts(), {})
+        self.assertEqual(statistiques.ecarts(), {})
+        victime = FicheVictime.objects.get(matricule='SYN-0000000')
+        self.assertTrue(victime.termes.exists())
+        self.assertFalse(Famille.objects.filter(agent_proprietaire__isnull=True).exists())
+
+        synthetique.purger()
+        self.assertFalse(FicheVictime.objects.exists())
+        self.assertFalse(Famille.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith='syn_').exists())
+
+        synthetique.GenerateurDonnees(60, graine=7, taille_lot=25).generer()
+        self.assertEqual(self._instantane(), premier)
+
+
+class BenchUrlsTest(TestCase):
+    def test_rapport_json(self):
+        synthetique.GenerateurDonnees(20).generer()
+        with tempfile.TemporaryDirectory() as dossier:
+            sortie = os.path.join(dossier, 'bench.json')
+            call_command('bench_urls', '--repetitions', '1', '--roles', 'agent,admin',
+                         '--urls', 'dashboard,famille_update,export_donnees', '--sortie', sortie, stdout=StringIO())
+            with open(sortie, encoding='utf-8') as fichier:
+                rapport = json.load(fichier)
+            resultats = rapport['resultats']
+            self.assertEqual(rapport['volumes']['FicheVictime'], 20)
+            self.assertEqual(resultats['dashboard[agent]']['statut'], 200)
+            self.assertGreater(resultats['dashboard[agent]']['requetes'], 0)
+            self.assertEqual(resultats['famille_update[admin]']['statut'], 200)
+            self.assertGreater(resultats['export_donnees[admin]']['octets'], 0)
+
+            sortie_comparaison = StringIO()
+            call_command('bench_urls', '--repetitions', '1', '--roles', 'agent,admin',
+                         '--urls', 'dashboard,famille_update,export_donnees', '--comparer', sortie,
+                         stdout=sortie_comparaison)
+            self.assertIn("dashboard[agent]", sortie_comparaison.getvalue().split("Comparaison", 1)[1])
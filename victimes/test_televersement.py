@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from victimes.models import DocumentVictime, FicheVictime
+
+User = get_user_model()
+
+PDF = b'%PDF-1.4\n' + b'0' * 200000
+PNG = b'\x89PNG\r\n\x1a\n' + b'0' * 1000
+
+
+class TeleversementDirectTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        User.objects.create_user(username='agent1', password='testpass123', role='agent')
+        self.client.login(username='agent1', password='testpass123')
+
+    def poster(self, matricule='INCO1', actes=(), rapports=()):
+        return self.client.post(reverse('victime_create'), {
+            'nom': 'Nom', 'prenom': 'Prenom', 'matricule': matricule, 'statut_victime': 'decede',
+            'actes_deces': [SimpleUploadedFile(nom, contenu) for nom, contenu in actes],
+            'rapports_medicaux': [SimpleUploadedFile(nom, contenu) for nom, contenu in rapports],
+        }, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def fichiers_ecrits(self):
+        dossier = os.path.join(self.media, 'documents_victimes')
+        return sorted(os.listdir(dossier)) if os.path.isdir(dossier) else []
+
+    def test_documents_en_une_insertion(self):
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.poster(
+                actes=[('acte.pdf', PDF), ('acte.pdf', PDF)],
+                rapports=[(f'rapport{i}.png', PNG) for i in range(10)],
+            )
+        self.assertTrue(response.json()['success'])
+        insertions = [q for q in requetes if q['sql'].startswith('INSERT INTO "victimes_documentvictime"')]
+        self.assertEqual(len(insertions), 1)
+        victime = FicheVictime.objects.get(matricule='INCO1')
+        self.assertEqual(victime.documents.filter(type_document='acte_deces').count(), 2)
+        self.assertEqual(victime.documents.filter(type_document='rapport_medical').count(), 10)
+        document = victime.documents.get(nom_fichier='rapport3.png')
+        with document.fichier.open('rb') as fichier:
+            self.assertEqual(fichier.read(), PNG)
+        # Les deux actes identiques partagent le même contenu sur disque
+        premier, second = victime.documents.filter(type_document='acte_deces')
+        self.assertTrue(os.path.samefile(premier.fichier.path, second.fichier.path))
+
+    def test_format_non_reconnu(self):
+        response = self.poster(actes=[('acte.pdf', PDF), ('virus.pdf', b'MZ\x90\x00')])
+        self.assertFalse(response.json()['success'])
+        self.assertIn('virus.pdf', response.json()['message'])
+        self.assertEqual(self.fichiers_ecrits(), [])
+        self.assertEqual(DocumentVictime.objects.count(), 0)
+
+    def test_formulaire_invalide_sans_fichier_orphelin(self):
+        FicheVictime.objects.create(nom='A', prenom='B', matricule='INCO1')
+        response = self.poster(rapports=[('rapport.png', PNG)])
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(self.fichiers_ecrits(), [])
+
+    def test_csrf_refuse_sans_fichier_orphelin(self):
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='agent1', password='testpass123')
+        # Cookie présent, jeton absent du formulaire : le corps est lu avant le refus
+        client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 32
+        response = client.post(reverse('victime_create'), {
+            'nom': 'Nom', 'prenom': 'Prenom', 'matricule': 'INCO1', 'statut_victime': 'decede',
+            'actes_deces': [SimpleUploadedFile('acte.pdf', PDF)],
+            'rapports_medicaux': [SimpleUploadedFile('rapport.png', PNG)],
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.fichiers_ecrits(), [])
+        self.assertFalse(FicheVictime.objects.exists())
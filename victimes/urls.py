@@ -23,6 +23,8 @@ urlpatterns = [
     path('demandes/<int:demande_id>/annuler/', views.demande_annuler_decision, name='demande_annuler_decision'),
     path('demandes/validation/', views.demandes_a_valider, name='demandes_a_valider'),
     path('rapport/', views.rapport_familles_aidees, name='rapport_familles_aidees'),
+    path('exports/<str:quoi>.<str:format_export>', views.export_donnees, name='export_donnees'),
+    path('metrics', views.metriques_prometheus, name='metriques'),
     # URLs AJAX pour ajouter famille et membres depuis la liste des victimes
     path('famille/ajouter/', views.ajouter_famille_ajax, name='ajouter_famille_ajax'),
     path('membre/ajouter/', views.ajouter_membre_ajax, name='ajouter_membre_ajax'),
@@ -32,6 +34,10 @@ urlpatterns = [
     path('victime/modifier/<int:victime_id>/', views.victime_modifier_ajax, name='victime_modifier_ajax'),
     # URL AJAX pour créer une demande d'aide
     path('demande/creer/', views.demande_create_ajax, name='demande_create_ajax'),
+    # URL AJAX de la recherche globale (?q=...)
+    path('recherche/', views.recherche_globale_ajax, name='recherche_globale'),
+    # URL AJAX des suggestions d'INCO pendant la saisie (?q=...&limite=...)
+    path('victime/inco/', views.inco_suggestions_ajax, name='inco_suggestions'),
     # URLs pour l'administration
     path('administration/utilisateurs/', views.gestion_utilisateurs, name='gestion_utilisateurs'),
     path('administration/journal/', views.journal_actions, name='journal_actions'),
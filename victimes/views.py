@@ -1,16 +1,28 @@
 # Imports nécessaires
-from django.http import HttpResponse, JsonResponse
-from django.shortcuts import render, redirect, get_object_or_404
+import hashlib
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from django.contrib.auth import authenticate, login, logout
-from django.db import models
-from django.db.models import Q
-from .decorators import role_required
+from django.db import models, transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from .acces import can_edit
+from .decorators import condition_etag, role_required
 from .models import Famille, MembreFamille, FicheVictime, DemandeAide, JournalAction, User, DocumentVictime
 from .forms import FamilleForm, MembreFamilleForm, FicheVictimeForm, DemandeAideForm
+from .listing import filtrer_journal, page_familles, page_journal, page_victimes
+from .recherche import rechercher_victimes
+from .replicas import base_lecture, lecture_replica
+from . import cartes, cube, inco, metriques, recherche_globale, statistiques
+from .journal import journaliser
+from .televersement import CHAMPS_DOCUMENTS, TeleversementDirect, documents_pour
+from .exports import EXPORTS, FORMATS, exports_visibles, reponse_export
 
 # Vue pour détail AJAX famille/victime/membres
 @login_required
@@ -30,11 +42,69 @@ def demandes_a_valider(request):
     demandes = DemandeAide.objects.filter(statut='soumise')
     return render(request, 'victimes/demandes_a_valider.html', {'demandes': demandes})
 
-# Rapport statistique simple
+# Rapport statistique : familles aidées et tableau croisé du cube des demandes
 @role_required(['responsable', 'admin', 'agent', 'assistant', 'admin'])
+@lecture_replica
 def rapport_familles_aidees(request):
-    nb_familles = Famille.objects.filter(demandes__statut='validee').distinct().count()
-    return render(request, 'victimes/rapport.html', {'nb_familles': nb_familles})
+    nb_familles = Famille.objects.filter(
+        Exists(DemandeAide.objects.filter(famille=OuterRef('pk'), statut='validee'))
+    ).count()
+    
+    # Axes du tableau croisé et filtres d'exploration (?ville=Kaya&mois=2025-03...)
+    lignes = request.GET.get('lignes') if request.GET.get('lignes') in cube.DIMENSIONS else 'mois'
+    colonnes = request.GET.get('colonnes') if request.GET.get('colonnes') in cube.DIMENSIONS else 'statut'
+    filtres = {}
+    for dimension in cube.DIMENSIONS:
+        if request.GET.get(dimension):
+            valeur = cube.valeur_filtre(dimension, request.GET[dimension])
+            if valeur is not None:
+                filtres[dimension] = valeur
+    tableau = cube.pivot(lignes, colonnes, filtres)
+    
+    def parametre(dimension, valeur):
+        return f"{valeur:%Y-%m}" if dimension == 'mois' else valeur
+    
+    # Cliquer sur une ligne fixe sa valeur et détaille selon la dimension suivante
+    suivante = cube.DIMENSION_SUIVANTE[lignes]
+    while suivante in filtres or suivante in (lignes, colonnes):
+        suivante = cube.DIMENSION_SUIVANTE[suivante]
+        if suivante == lignes:
+            break
+    rangees = []
+    for valeur in tableau['lignes']:
+        exploration = request.GET.copy()
+        exploration[lignes] = parametre(lignes, valeur)
+        exploration['lignes'] = suivante
+        exploration['colonnes'] = colonnes
+        rangees.append({
+            'libelle': cube.libelle(lignes, valeur),
+            'cellules': [tableau['valeurs'].get((valeur, c), 0) for c in tableau['colonnes']],
+            'total': tableau['totaux_lignes'][valeur],
+            'exploration': exploration.urlencode(),
+        })
+    filtres_actifs = []
+    for dimension, valeur in filtres.items():
+        sans_filtre = request.GET.copy()
+        sans_filtre.pop(dimension)
+        filtres_actifs.append({
+            'dimension': cube.LIBELLES_DIMENSIONS[dimension],
+            'libelle': cube.libelle(dimension, valeur),
+            'retrait': sans_filtre.urlencode(),
+        })
+    
+    context = {
+        'nb_familles': nb_familles,
+        'dimensions': cube.LIBELLES_DIMENSIONS.items(),
+        'lignes': lignes,
+        'colonnes': colonnes,
+        'entetes_colonnes': [cube.libelle(colonnes, c) for c in tableau['colonnes']],
+        'totaux_colonnes': [tableau['totaux_colonnes'][c] for c in tableau['colonnes']],
+        'rangees': rangees,
+        'total_demandes': tableau['total'],
+        'filtres_actifs': filtres_actifs,
+        'filtres': {dimension: parametre(dimension, valeur) for dimension, valeur in filtres.items()},
+    }
+    return render(request, 'victimes/rapport.html', context)
 
 # Validation des demandes (responsable/admin)
 @role_required(['responsable', 'admin'])
@@ -48,7 +118,7 @@ def demande_valider(request, demande_id):
             demande.date_validation = timezone.now()
             demande.save()
             # Journalisation
-            JournalAction.objects.create(
+            journaliser(
                 utilisateur=request.user,
                 action="Validation de demande",
                 details=f"Demande {demande.id} validée pour la famille {demande.famille.id}"
@@ -81,7 +151,7 @@ def demande_refuser(request, demande_id):
             demande.date_validation = timezone.now()
             demande.save()
             # Journalisation
-            JournalAction.objects.create(
+            journaliser(
                 utilisateur=request.user,
                 action="Refus de demande",
                 details=f"Demande {demande.id} refusée pour la famille {demande.famille.id}"
@@ -115,7 +185,7 @@ def demande_annuler_decision(request, demande_id):
             demande.date_validation = None
             demande.save()
             # Journalisation
-            JournalAction.objects.create(
+            journaliser(
                 utilisateur=request.user,
                 action="Annulation de décision",
                 details=f"Demande {demande.id} remise en attente (était {ancien_statut}) pour la famille {demande.famille.id}"
@@ -139,13 +209,17 @@ def demande_annuler_decision(request, demande_id):
 # Famille CRUD
 @role_required(['agent', 'responsable', 'admin'])
 def famille_list(request):
-    if request.user.role == 'agent':
-        # Les agents ne voient que les familles des victimes qu'ils ont créées
-        familles = Famille.objects.filter(victimes__cree_par=request.user).distinct()
-    else:
-        # Les responsables et admins voient toutes les familles
-        familles = Famille.objects.all()
-    return render(request, 'victimes/famille_list.html', {'familles': familles})
+    # Les agents ne voient que les familles des victimes qu'ils ont créées,
+    # les responsables et admins voient toutes les familles (pagination par curseur)
+    apres = request.GET.get('apres')
+    if apres and not apres.isdigit():
+        apres = None
+    familles, curseur_suivant = page_familles(request.user, apres=apres)
+    return render(request, 'victimes/famille_list.html', {
+        'familles': familles,
+        'curseur_suivant': curseur_suivant,
+        'apres': apres,
+    })
 
 @role_required(['agent', 'responsable', 'admin'])
 def famille_create(request, victime_id=None):
@@ -154,7 +228,7 @@ def famille_create(request, victime_id=None):
         if form.is_valid():
             famille = form.save()
             # Journalisation
-            JournalAction.objects.create(
+            journaliser(
                 utilisateur=request.user,
                 action="Création famille",
                 details=f"Famille créée à {famille.ville} ({famille.id})"
@@ -175,7 +249,7 @@ def famille_create(request, victime_id=None):
 def famille_update(request, pk):
     famille = get_object_or_404(Famille, pk=pk)
     # Vérifier que l'agent ne peut modifier que les familles de ses propres victimes
-    if request.user.role == 'agent' and not famille.victimes.filter(cree_par=request.user).exists():
+    if not can_edit(request.user, famille):
         raise PermissionDenied("Vous ne pouvez modifier que les familles des victimes que vous avez créées.")
     
     if request.method == 'POST':
@@ -203,64 +277,68 @@ def victime_list(request):
     # Récupération du paramètre de recherche
     search_query = request.GET.get('search', '').strip()
     
-    if request.user.role == 'agent':
-        # Les agents ne voient que leurs propres fiches victimes
-        victimes = FicheVictime.objects.filter(cree_par=request.user)
-    else:
-        # Les assistants, responsables et admins voient toutes les fiches
-        victimes = FicheVictime.objects.all()
+    # Les agents ne voient que leurs propres fiches victimes,
+    # les assistants, responsables et admins voient toutes les fiches
+    victimes = FicheVictime.objects.visible_to(request.user)
     
-    # Appliquer le filtre de recherche si présent
+    # Appliquer le filtre de recherche si présent (index de termes, insensible aux accents)
     if search_query:
-        victimes = victimes.filter(
-            Q(matricule__icontains=search_query) |
-            Q(nom__icontains=search_query) |
-            Q(prenom__icontains=search_query)
-        )
+        victimes = rechercher_victimes(victimes, search_query)
     
-    victimes = victimes.order_by('-date_creation')
+    # Une page par curseur ; les cartes sont servies depuis le cache (cartes.py)
+    victimes, curseur_suivant = page_victimes(victimes, request.GET.get('avant'))
     
     context = {
-        'victimes': victimes,
+        'cartes': cartes.cartes(victimes, request.user.role),
         'search_query': search_query,
+        'curseur_suivant': curseur_suivant,
+        'curseur_courant': request.GET.get('avant'),
     }
     return render(request, 'victimes/victime_list.html', context)
 
+@csrf_exempt
 @login_required  # Temporairement, on utilise juste login_required pour tester
 @login_required
 def victime_create(request):
+    # Les documents sont écrits à leur emplacement final pendant la lecture
+    # du corps ; le gestionnaire doit donc être installé avant que la
+    # vérification CSRF (faite ensuite par _victime_create) ne lise request.POST.
+    # Le jeton étant dans le corps, les fichiers sont déjà écrits quand elle
+    # échoue : tout fichier non rattaché à un DocumentVictime est supprimé ici.
+    televersement = TeleversementDirect(request)
+    request.upload_handlers.insert(0, televersement)
+    try:
+        return _victime_create(request, televersement)
+    finally:
+        televersement.abandonner()
+
+
+@csrf_protect
+def _victime_create(request, televersement):
     try:
         if request.method == 'POST':
             form = FicheVictimeForm(request.POST, request.FILES)
             if form.is_valid():
                 victime = form.save(commit=False)
                 victime.cree_par = request.user
-                victime.save()
-                
-                # Gérer les actes de décès multiples
-                actes_deces = request.FILES.getlist('actes_deces')
-                for acte in actes_deces:
-                    DocumentVictime.objects.create(
-                        victime=victime,
-                        type_document='acte_deces',
-                        fichier=acte
-                    )
-                
-                # Gérer les rapports médicaux multiples
-                rapports = request.FILES.getlist('rapports_medicaux')
-                for rapport in rapports:
-                    DocumentVictime.objects.create(
-                        victime=victime,
-                        type_document='rapport_medical',
-                        fichier=rapport
+                with transaction.atomic():
+                    victime.save()
+                    
+                    # Actes de décès et rapports médicaux multiples, déjà écrits
+                    # dans le stockage : une seule insertion pour tous
+                    documents = []
+                    for champ, type_document in CHAMPS_DOCUMENTS.items():
+                        documents += documents_pour(victime, request.FILES.getlist(champ), type_document)
+                    DocumentVictime.objects.bulk_create(documents)
+                    
+                    # Journalisation
+                    journaliser(
+                        utilisateur=request.user,
+                        action="Création fiche victime",
+                        details=f"Fiche victime créée pour {victime.prenom} {victime.nom}"
                     )
-                
-                # Journalisation
-                JournalAction.objects.create(
-                    utilisateur=request.user,
-                    action="Création fiche victime",
-                    details=f"Fiche victime créée pour {victime.prenom} {victime.nom}"
-                )
+                # Les fichiers appartiennent désormais aux documents enregistrés
+                televersement.conserver()
                 
                 # Si c'est une requête AJAX (depuis le modal), retourner JSON
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -315,7 +393,7 @@ def membre_create(request, famille_id):
     famille = get_object_or_404(Famille, pk=famille_id)
     
     # Vérifier que l'agent ne peut ajouter que des membres aux familles de ses propres victimes
-    if request.user.role == 'agent' and not famille.victimes.filter(cree_par=request.user).exists():
+    if not can_edit(request.user, famille):
         raise PermissionDenied("Vous ne pouvez ajouter des membres qu'aux familles des victimes que vous avez créées.")
     
     if request.method == 'POST':
@@ -325,7 +403,7 @@ def membre_create(request, famille_id):
             membre.famille = famille
             membre.save()
             # Journalisation
-            JournalAction.objects.create(
+            journaliser(
                 utilisateur=request.user,
                 action="Ajout membre famille",
                 details=f"Membre {membre.prenom} {membre.nom} ajouté à la famille {famille.id}"
@@ -355,6 +433,7 @@ def demande_list(request):
         return render(request, 'victimes/demande_list.html', {'demandes': demandes})
 
 @login_required
+@lecture_replica
 def suivi_aides(request):
     """Vue pour le suivi des aides avec filtrage par statut"""
     # Récupérer toutes les demandes triées par date de création
@@ -381,6 +460,28 @@ def suivi_aides(request):
     
     return render(request, 'victimes/suivi_aides.html', context)
 
+@role_required(['agent', 'assistant', 'responsable', 'admin'])
+@lecture_replica
+def export_donnees(request, quoi, format_export):
+    """Export CSV/XLSX en flux des victimes, membres ou demandes visibles par l'utilisateur"""
+    if quoi not in EXPORTS or format_export not in FORMATS:
+        raise Http404
+    donnees = exports_visibles(request.user, quoi)
+    if donnees is None:
+        raise PermissionDenied
+    # Même filtre par statut que le suivi des aides
+    statut = request.GET.get('statut')
+    if quoi == 'demandes' and statut in dict(DemandeAide.STATUT_CHOICES):
+        donnees = donnees.filter(statut=statut)
+    
+    journaliser(
+        utilisateur=request.user,
+        action="Export de données",
+        details=f"Export {quoi} ({format_export})"
+    )
+    # Réponse en flux lue après la fin de la vue : base de lecture fixée maintenant
+    return reponse_export(donnees.using(base_lecture()), quoi, format_export)
+
 # Vues administrateur
 @role_required(['admin'])
 def gestion_utilisateurs(request):
@@ -431,31 +532,41 @@ def gestion_utilisateurs(request):
     return render(request, 'victimes/gestion_utilisateurs.html', context)
 
 @role_required(['admin'])
+def metriques_prometheus(request):
+    """Métriques de performance par vue, au format texte Prometheus"""
+    return HttpResponse(metriques.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@role_required(['admin'])
+@lecture_replica
 def journal_actions(request):
     """Vue pour consulter le journal des actions"""
-    # Filtrage par utilisateur si demandé
-    utilisateur_filtre = request.GET.get('utilisateur')
-    if utilisateur_filtre:
-        actions = JournalAction.objects.filter(utilisateur_id=utilisateur_filtre)
-    else:
-        actions = JournalAction.objects.all()
-    
-    # Filtrage par date si demandé
-    date_debut = request.GET.get('date_debut')
-    date_fin = request.GET.get('date_fin')
-    if date_debut:
-        actions = actions.filter(date_action__date__gte=date_debut)
-    if date_fin:
-        actions = actions.filter(date_action__date__lte=date_fin)
+    # Filtres (l'ancien paramètre "utilisateur" reste accepté)
+    utilisateur_filtre = request.GET.get('user') or request.GET.get('utilisateur')
+    if utilisateur_filtre and not utilisateur_filtre.isdigit():
+        utilisateur_filtre = None
+    role_filtre = request.GET.get('role')
+    # Un jour précis ("date") ou une période (date_debut / date_fin)
+    date_debut = request.GET.get('date') or request.GET.get('date_debut')
+    date_fin = request.GET.get('date') or request.GET.get('date_fin')
+    actions = filtrer_journal(utilisateur_filtre, role_filtre, date_debut, date_fin)
     
-    actions = actions.select_related('utilisateur').order_by('-date_action')[:100]  # Limiter à 100 résultats
+    # Pagination par curseur sur tout l'historique
+    actions, curseur_suivant = page_journal(actions, request.GET.get('avant'))
     
     # Liste des utilisateurs pour le filtre
     utilisateurs = User.objects.all().order_by('first_name', 'last_name')
     
+    # Paramètres de filtre à conserver dans les liens de pagination
+    filtres = request.GET.copy()
+    filtres.pop('avant', None)
+    
     context = {
         'actions': actions,
+        'curseur_suivant': curseur_suivant,
+        'curseur_courant': request.GET.get('avant'),
+        'filtres_url': filtres.urlencode(),
         'utilisateurs': utilisateurs,
+        'all_users': utilisateurs,
         'utilisateur_filtre': utilisateur_filtre,
         'date_debut': date_debut,
         'date_fin': date_fin,
@@ -473,7 +584,7 @@ def toggle_user_status(request, user_id):
         
         # Journalisation
         action = "Activation" if user.is_active else "Désactivation"
-        JournalAction.objects.create(
+        journaliser(
             utilisateur=request.user,
             action=f"{action} utilisateur",
             details=f"{action} de l'utilisateur {user.username} ({user.get_full_name()})"
@@ -505,17 +616,17 @@ def demande_create(request):
     return render(request, 'victimes/demande_form.html', {'form': form})
 
 @role_required(['assistant'])
-def demande_create_ajax(request):
+async def demande_create_ajax(request):
     """Vue AJAX pour créer une demande d'aide"""
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Méthode non autorisée.'})
     
     try:
         famille_id = request.POST.get('famille_id')
-        famille = get_object_or_404(Famille, id=famille_id)
+        famille = await aget_object_or_404(Famille, id=famille_id)
         
         # Créer la demande d'aide
-        demande = DemandeAide.objects.create(
+        demande = await DemandeAide.objects.acreate(
             famille=famille,
             type_demande=request.POST.get('type_demande'),
             description=request.POST.get('description'),
@@ -524,7 +635,7 @@ def demande_create_ajax(request):
         )
         
         # Journalisation
-        JournalAction.objects.create(
+        await sync_to_async(journaliser)(
             utilisateur=request.user,
             action="Création demande d'aide",
             details=f"Demande {demande.get_type_demande_display()} créée pour la famille {famille.nom_famille} (ID: {demande.id})"
@@ -544,35 +655,24 @@ def demande_create_ajax(request):
 
 # Dashboard
 @login_required
+@lecture_replica
 def dashboard_view(request):
-    # Statistiques générales
-    total_victimes = FicheVictime.objects.count()
-    nouveaux_dossiers = FicheVictime.objects.filter(
-        date_creation__month=timezone.now().month,
-        date_creation__year=timezone.now().year
-    ).count()
-    affaires_resolues = DemandeAide.objects.filter(statut='validee').count()
-    
-    # Calcul du taux de résolution
-    total_demandes = DemandeAide.objects.count()
-    taux_resolution = (affaires_resolues / total_demandes * 100) if total_demandes > 0 else 0
-    
+    # Les compteurs viennent du snapshot statistique (une requête) ou, à défaut,
+    # d'une agrégation conditionnelle par modèle (voir statistiques.py)
+
     # Activités récentes (dernières actions du journal)
     activites_recentes = JournalAction.objects.order_by('-date_action')[:10]
     
     # Statistiques spécifiques par rôle
     if request.user.role == 'agent':
         # Statistiques agent
-        mes_fiches = FicheVictime.objects.filter(cree_par=request.user).count()
-        mes_familles = Famille.objects.filter(victimes__cree_par=request.user).distinct().count()
         mes_activites = JournalAction.objects.filter(utilisateur=request.user).order_by('-date_action')[:5]
         
         # Dernières victimes avec photos
         dernieres_victimes = FicheVictime.objects.filter(cree_par=request.user, photo__isnull=False).exclude(photo='').order_by('-date_creation')[:5]
         
         context = {
-            'mes_fiches': mes_fiches,
-            'mes_familles': mes_familles,
+            **statistiques.stats_agent(request.user),
             'mes_activites': mes_activites,
             'dernieres_victimes': dernieres_victimes,
             'en_attente': 3,  # Exemple
@@ -581,17 +681,11 @@ def dashboard_view(request):
         return render(request, 'victimes/dashboard_agent.html', context)
     
     elif request.user.role == 'assistant':
-        # Statistiques assistant social
-        mes_demandes = DemandeAide.objects.filter(cree_par=request.user).count()
-        demandes_validees = DemandeAide.objects.filter(cree_par=request.user, statut='validee').count()
-        demandes_en_attente = DemandeAide.objects.filter(cree_par=request.user, statut='soumise').count()
-        demandes_refusees = DemandeAide.objects.filter(cree_par=request.user, statut='refusee').count()
-        
-        # Familles suivies (familles pour lesquelles j'ai créé des demandes)
-        familles_suivies = Famille.objects.filter(demandes__cree_par=request.user).distinct().count()
+        # Statistiques assistant social (dont familles suivies : familles pour lesquelles j'ai créé des demandes)
+        stats = statistiques.stats_assistant(request.user)
         
         # Calcul du taux de validation de mes demandes
-        taux_validation = (demandes_validees / mes_demandes * 100) if mes_demandes > 0 else 0
+        taux_validation = (stats['demandes_validees'] / stats['mes_demandes'] * 100) if stats['mes_demandes'] > 0 else 0
         
         # Mes activités récentes
         mes_activites = JournalAction.objects.filter(utilisateur=request.user).order_by('-date_action')[:5]
@@ -600,11 +694,7 @@ def dashboard_view(request):
         demandes_recentes = DemandeAide.objects.filter(cree_par=request.user).order_by('-date_creation')[:5]
         
         context = {
-            'mes_demandes': mes_demandes,
-            'demandes_validees': demandes_validees,
-            'demandes_en_attente': demandes_en_attente,
-            'demandes_refusees': demandes_refusees,
-            'familles_suivies': familles_suivies,
+            **stats,
             'taux_validation': round(taux_validation, 1),
             'mes_activites': mes_activites,
             'demandes_recentes': demandes_recentes,
@@ -612,25 +702,15 @@ def dashboard_view(request):
         return render(request, 'victimes/dashboard_assistant.html', context)
     
     elif request.user.role == 'responsable' or request.user.role == 'admin':
-        # Statistiques responsable/admin
-        total_demandes = DemandeAide.objects.count()
-        demandes_en_attente = DemandeAide.objects.filter(statut='soumise').count()
-        demandes_validees = DemandeAide.objects.filter(statut='validee').count()
-        demandes_refusees = DemandeAide.objects.filter(statut='refusee').count()
+        # Statistiques responsable/admin (demandes, familles, victimes)
+        stats = statistiques.stats_responsable()
         
         # Demandes récentes à traiter
         demandes_a_traiter = DemandeAide.objects.filter(statut='soumise').order_by('-date_creation')[:5]
         
-        # Statistiques sur les familles
-        total_familles = Famille.objects.count()
-        familles_avec_demandes = Famille.objects.filter(demandes__isnull=False).distinct().count()
-        
-        # Statistiques sur les victimes
-        total_victimes_resp = FicheVictime.objects.count()
-        victimes_avec_famille = FicheVictime.objects.filter(famille__isnull=False).count()
-        
         # Calcul du taux de traitement
-        taux_traitement = ((demandes_validees + demandes_refusees) / total_demandes * 100) if total_demandes > 0 else 0
+        total_demandes = stats['total_demandes']
+        taux_traitement = ((stats['demandes_validees'] + stats['demandes_refusees']) / total_demandes * 100) if total_demandes > 0 else 0
         
         # Activités récentes - validations et refus
         activites_validation = JournalAction.objects.filter(
@@ -638,68 +718,24 @@ def dashboard_view(request):
         ).order_by('-date_action')[:5]
         
         context = {
-            'total_demandes': total_demandes,
-            'demandes_en_attente': demandes_en_attente,
-            'demandes_validees': demandes_validees,
-            'demandes_refusees': demandes_refusees,
+            **stats,
             'demandes_a_traiter': demandes_a_traiter,
-            'total_familles': total_familles,
-            'familles_avec_demandes': familles_avec_demandes,
-            'total_victimes_resp': total_victimes_resp,
-            'victimes_avec_famille': victimes_avec_famille,
             'taux_traitement': round(taux_traitement, 1),
             'activites_validation': activites_validation,
         }
         return render(request, 'victimes/dashboard_responsable.html', context)
     
-    elif request.user.role == 'admin':
-        # Statistiques administrateur
-        total_utilisateurs = User.objects.count()
-        utilisateurs_actifs = User.objects.filter(is_active=True).count()
-        actions_aujourd_hui = JournalAction.objects.filter(
-            date_action__date=timezone.now().date()
-        ).count()
-        actions_cette_semaine = JournalAction.objects.filter(
-            date_action__week=timezone.now().isocalendar()[1],
-            date_action__year=timezone.now().year
-        ).count()
-        
-        # Répartition par rôles
-        repartition_roles = {
-            'agents': User.objects.filter(role='agent').count(),
-            'assistants': User.objects.filter(role='assistant').count(),
-            'responsables': User.objects.filter(role='responsable').count(),
-            'admins': User.objects.filter(role='admin').count(),
-        }
-        
-        # Activités récentes du système
-        activites_systeme = JournalAction.objects.select_related('utilisateur').order_by('-date_action')[:10]
-        
-        # Utilisateurs les plus actifs
-        from django.db.models import Count
-        utilisateurs_actifs_stats = User.objects.annotate(
-            nb_actions=Count('journalaction')
-        ).filter(nb_actions__gt=0).order_by('-nb_actions')[:5]
-        
-        context = {
-            'total_utilisateurs': total_utilisateurs,
-            'utilisateurs_actifs': utilisateurs_actifs,
-            'actions_aujourd_hui': actions_aujourd_hui,
-            'actions_cette_semaine': actions_cette_semaine,
-            'repartition_roles': repartition_roles,
-            'activites_systeme': activites_systeme,
-            'utilisateurs_actifs_stats': utilisateurs_actifs_stats,
-            'total_victimes': total_victimes,
-            'total_demandes': total_demandes,
-            'affaires_resolues': affaires_resolues,
-        }
-        return render(request, 'victimes/dashboard_admin.html', context)
-    
     # Dashboard général pour autres rôles
+    stats = statistiques.stats_generales()
+    
+    # Calcul du taux de résolution
+    total_demandes = stats['total_demandes']
+    taux_resolution = (stats['affaires_resolues'] / total_demandes * 100) if total_demandes > 0 else 0
+    
     context = {
-        'total_victimes': total_victimes,
-        'nouveaux_dossiers': nouveaux_dossiers,
-        'affaires_resolues': affaires_resolues,
+        'total_victimes': stats['total_victimes'],
+        'nouveaux_dossiers': stats['nouveaux_dossiers'],
+        'affaires_resolues': stats['affaires_resolues'],
         'taux_resolution': round(taux_resolution, 1),
         'activites_recentes': activites_recentes,
     }
@@ -730,27 +766,52 @@ def logout_view(request):
     messages.info(request, "Déconnexion réussie.")
     return redirect('login')
 
+# Recherche globale (fiches, familles, membres, demandes) pour la barre de recherche
+@role_required(['agent', 'assistant', 'responsable', 'admin'])
+@lecture_replica
+def recherche_globale_ajax(request):
+    texte = request.GET.get('q', '').strip()
+    return JsonResponse({
+        'success': True,
+        'q': texte,
+        'groupes': recherche_globale.rechercher(request.user, texte),
+    })
+
+# Suggestions d'INCO pendant la saisie d'une nouvelle fiche
+@role_required(['agent', 'assistant', 'responsable', 'admin'])
+def inco_suggestions_ajax(request):
+    texte = request.GET.get('q', '').strip()
+    try:
+        limite = int(request.GET.get('limite', inco.LIMITE))
+    except ValueError:
+        limite = inco.LIMITE
+    return JsonResponse({
+        'success': True,
+        'q': texte,
+        'suggestions': inco.suggestions(request.user, texte, limite),
+    })
+
 # Vues AJAX pour ajouter famille et membres depuis la liste des victimes
 @role_required(['agent', 'assistant', 'responsable', 'admin'])
-def ajouter_famille_ajax(request):
+async def ajouter_famille_ajax(request):
     if request.method == 'POST':
         try:
             victime_id = request.POST.get('victime_id')
-            victime = get_object_or_404(FicheVictime, id=victime_id)
+            victime = await aget_object_or_404(FicheVictime, id=victime_id)
             
             # Vérifier que l'agent ne peut ajouter une famille qu'à ses propres victimes
             # Les assistants ne peuvent pas ajouter de familles
-            if request.user.role == 'agent' and victime.cree_par != request.user:
+            if not await sync_to_async(can_edit)(request.user, victime):
                 return JsonResponse({'success': False, 'message': 'Vous ne pouvez ajouter une famille qu\'aux victimes que vous avez créées.'})
             elif request.user.role == 'assistant':
                 return JsonResponse({'success': False, 'message': 'Les assistants sociaux ne peuvent pas créer de familles.'})
             
-            # Vérifier si la victime a déjà une famille
-            if victime.famille:
+            # Vérifier si la victime a déjà une famille (sans charger la famille)
+            if victime.famille_id:
                 return JsonResponse({'success': False, 'message': 'Cette victime a déjà une famille associée.'})
             
             # Créer la famille
-            famille = Famille.objects.create(
+            famille = await Famille.objects.acreate(
                 nom_famille=request.POST.get('nom_famille'),
                 adresse=request.POST.get('adresse', ''),
                 telephone=request.POST.get('telephone', ''),
@@ -760,10 +821,10 @@ def ajouter_famille_ajax(request):
             
             # Associer la famille à la victime
             victime.famille = famille
-            victime.save()
+            await victime.asave()
             
             # Journalisation
-            JournalAction.objects.create(
+            await sync_to_async(journaliser)(
                 utilisateur=request.user,
                 action="Création famille",
                 details=f"Famille {famille.nom_famille} créée pour la victime {victime.prenom} {victime.nom} (ID: {famille.id})"
@@ -777,21 +838,21 @@ def ajouter_famille_ajax(request):
     return JsonResponse({'success': False, 'message': 'Méthode non autorisée.'})
 
 @role_required(['agent', 'assistant', 'responsable', 'admin'])
-def ajouter_membre_ajax(request):
+async def ajouter_membre_ajax(request):
     if request.method == 'POST':
         try:
             famille_id = request.POST.get('famille_id')
-            famille = get_object_or_404(Famille, id=famille_id)
+            famille = await aget_object_or_404(Famille, id=famille_id)
             
             # Vérifier que l'agent ne peut ajouter un membre qu'aux familles de ses propres victimes
             # Les assistants ne peuvent pas ajouter de membres
-            if request.user.role == 'agent' and not famille.victimes.filter(cree_par=request.user).exists():
+            if not await sync_to_async(can_edit)(request.user, famille):
                 return JsonResponse({'success': False, 'message': 'Vous ne pouvez ajouter des membres qu\'aux familles des victimes que vous avez créées.'})
             elif request.user.role == 'assistant':
                 return JsonResponse({'success': False, 'message': 'Les assistants sociaux ne peuvent pas ajouter de membres aux familles.'})
             
             # Créer le membre
-            membre = MembreFamille.objects.create(
+            membre = await MembreFamille.objects.acreate(
                 famille=famille,
                 prenom=request.POST.get('prenom'),
                 nom=request.POST.get('nom'),
@@ -805,7 +866,7 @@ def ajouter_membre_ajax(request):
             )
             
             # Journalisation
-            JournalAction.objects.create(
+            await sync_to_async(journaliser)(
                 utilisateur=request.user,
                 action="Ajout membre famille",
                 details=f"Membre {membre.prenom} {membre.nom} ajouté à la famille {famille.nom_famille} (ID: {membre.id})"
@@ -818,11 +879,47 @@ def ajouter_membre_ajax(request):
     
     return JsonResponse({'success': False, 'message': 'Méthode non autorisée.'})
 
+def _nom_createur(user):
+    if user is None:
+        return ''
+    if user.first_name or user.last_name:
+        return f"{user.first_name} {user.last_name}"
+    return user.username
+
+
+def victime_details_etag(request, victime_id):
+    """
+    ETag des détails d'une victime, calculé en une requête à partir des dates
+    de modification de la fiche, de sa famille et des membres.
+    """
+    versions = FicheVictime.objects.filter(pk=victime_id).values(
+        'cree_par_id', 'date_modification', 'cree_par__first_name', 'cree_par__last_name',
+        'cree_par__username', 'famille_id', 'famille__date_modification',
+    ).annotate(
+        membres_maj=Max('famille__membres__date_modification'),
+        nb_membres=Count('famille__membres'),
+    ).order_by('pk').first()
+    if versions is None:
+        return None
+    # Pas de réponse conditionnelle pour un agent qui n'a pas accès à la fiche
+    if request.user.role == 'agent' and versions['cree_par_id'] != request.user.pk:
+        return None
+    empreinte = '|'.join(str(versions[cle]) for cle in sorted(versions))
+    return hashlib.sha1(f"{victime_id}|{empreinte}".encode()).hexdigest()
+
+
 @role_required(['agent', 'assistant', 'responsable', 'admin'])
-def victime_details_ajax(request, victime_id):
+@cache_control(private=True, no_cache=True)
+@condition_etag(victime_details_etag)
+async def victime_details_ajax(request, victime_id):
     """Vue AJAX pour récupérer les détails complets d'une victime"""
     try:
-        victime = get_object_or_404(FicheVictime, id=victime_id)
+        # Fiche, créateur et famille en une requête, membres en une seconde ;
+        # tout est chargé ici, la suite n'accède pas paresseusement à la base
+        victime = await aget_object_or_404(
+            FicheVictime.objects.select_related('cree_par', 'famille').prefetch_related('famille__membres'),
+            id=victime_id,
+        )
         
         # Vérifier les permissions : agent ne peut voir que ses propres victimes
         # Les assistants, responsables et admins peuvent voir toutes les victimes
@@ -854,7 +951,7 @@ def victime_details_ajax(request, victime_id):
             'date_incident': victime.date_incident.strftime('%d/%m/%Y') if victime.date_incident else None,
             'lieu_incident': victime.lieu_incident,
             'description_incident': victime.description_incident,
-            'cree_par': f"{victime.cree_par.first_name} {victime.cree_par.last_name}" if victime.cree_par.first_name or victime.cree_par.last_name else victime.cree_par.username,
+            'cree_par': _nom_createur(victime.cree_par),
             'date_creation': victime.date_creation.strftime('%d/%m/%Y à %H:%M') if victime.date_creation else None,
             'famille': None
         }
@@ -901,16 +998,16 @@ def victime_details_ajax(request, victime_id):
 
 
 @role_required(['agent', 'responsable', 'admin'])
-def victime_modifier_ajax(request, victime_id):
+async def victime_modifier_ajax(request, victime_id):
     """Vue AJAX pour modifier une victime"""
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Méthode non autorisée.'})
     
     try:
-        victime = get_object_or_404(FicheVictime, id=victime_id)
+        victime = await aget_object_or_404(FicheVictime, id=victime_id)
         
         # Vérifier les permissions : agent ne peut modifier que ses propres victimes
-        if request.user.role == 'agent' and victime.cree_par != request.user:
+        if not await sync_to_async(can_edit)(request.user, victime):
             return JsonResponse({'success': False, 'message': 'Vous n\'avez pas l\'autorisation de modifier cette victime.'})
         
         # Mettre à jour les champs d'identité
@@ -963,10 +1060,10 @@ def victime_modifier_ajax(request, victime_id):
         if 'acte_deces' in request.FILES:
             victime.acte_deces = request.FILES['acte_deces']
         
-        victime.save()
+        await victime.asave()
         
         # Journalisation
-        JournalAction.objects.create(
+        await sync_to_async(journaliser)(
             utilisateur=request.user,
             action="Modification fiche victime",
             details=f"Fiche victime {victime.prenom} {victime.nom} modifiée (ID: {victime.id})"